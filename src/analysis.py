@@ -0,0 +1,217 @@
+import argparse
+import json
+import multiprocessing
+import os
+import threading
+import chess
+import chess.pgn
+from src.engine import Engine
+
+# Depth used when only a time or node budget is given
+MAX_DEPTH = 64
+DEFAULT_DEPTH = 6
+
+# The engine of a worker process, created once by _init_worker
+_worker_engine = None
+
+
+def read_positions(path: str):
+    """
+    Yield (position_id, fen) for every position in a file, reading it lazily.
+
+    EPD and FEN files have one position per line; the EPD "id" operation is
+    used as the id if present, otherwise the line number. For PGN files the
+    position at the end of each game's mainline is used (the starting
+    position for games without moves, as in puzzle collections), with the
+    game number as id. Unreadable lines are yielded with a None FEN.
+    """
+    if path.lower().endswith(".pgn"):
+        with open(path, encoding="utf-8", errors="replace") as f:
+            number = 0
+            while True:
+                game = chess.pgn.read_game(f)
+                if game is None:
+                    return
+                number += 1
+                yield str(number), game.end().board().fen()
+        return
+
+    with open(path, encoding="utf-8", errors="replace") as f:
+        for number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            fields = line.split()
+            try:
+                if len(fields) == 6 and fields[4].isdigit() and fields[5].isdigit():
+                    yield str(number), chess.Board(line).fen()
+                else:
+                    board, operations = chess.Board.from_epd(line)
+                    yield str(operations.get("id", number)), board.fen()
+            except ValueError:
+                yield str(number), None
+
+
+def _init_worker(options):
+    """Create the worker's engine, which is kept for all its positions."""
+    global _worker_engine
+    _worker_engine = Engine(color_is_white=True, hash_mb=options["hash_mb"])
+
+
+def _analyse(job):
+    """
+    Search one position with the worker's engine. A position that fails is
+    reported in its result line instead of ending the whole run.
+
+    Returns:
+        dict: The result line, with the score in pawns from the side to move's view.
+    """
+    position_id, fen, depth, time_limit, node_limit = job
+    if fen is None:
+        return {"id": position_id, "error": "invalid position"}
+    try:
+        return _analyse_position(position_id, fen, depth, time_limit, node_limit)
+    except Exception as error:
+        return {"id": position_id, "error": "%s: %s" % (type(error).__name__, error)}
+
+
+def _analyse_position(position_id, fen, depth, time_limit, node_limit):
+    board = chess.Board(fen)
+    move, nodes, search_time = _worker_engine.find_best_move_with_stats(
+        board, depth, time_limit=time_limit, node_limit=node_limit)
+    stats = _worker_engine.get_search_statistics()
+    if move is None:
+        # Mate, stalemate or another finished game
+        score = _worker_engine.evaluate_board(board)
+        pv = []
+    else:
+        score = stats["score"]
+        pv = stats["principal_variation"]
+    if board.turn == chess.BLACK:
+        score = -score
+    return {
+        "id": position_id,
+        "fen": fen,
+        "bestmove": move.uci() if move is not None else None,
+        "score": score,
+        "depth": stats["depth"],
+        "nodes": nodes + stats["quiescence_nodes"],
+        "time": round(search_time, 4),
+        "pv": pv,
+    }
+
+
+def _drop_partial_line(path: str):
+    """Cut off a last line left unfinished by an interrupted run."""
+    with open(path, "rb+") as f:
+        data = f.read()
+        if data and not data.endswith(b"\n"):
+            f.truncate(data.rfind(b"\n") + 1)
+
+
+def completed_ids(output_path: str):
+    """Ids already in a results file, so an interrupted run can be resumed."""
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                done.add(json.loads(line)["id"])
+            except (ValueError, KeyError):
+                continue
+    return done
+
+
+def analyse_file(input_path: str, output_path: str, processes=None, depth=None, time_limit=None,
+                 node_limit=None, hash_mb=16, resume=False, max_pending=None):
+    """
+    Analyse every position of a file and write one JSON line per position.
+
+    Positions are read lazily and handed to a process pool whose workers each
+    keep one Engine (and its transposition table) for all their positions.
+    At most max_pending positions are in flight, so memory does not grow
+    with the input. Results are written in completion order and flushed one
+    by one; the results file is the checkpoint, and with resume=True the
+    positions already in it are skipped.
+
+    Args:
+        input_path (str): EPD, FEN or PGN file.
+        output_path (str): JSON lines file for the results.
+        processes (int): Worker processes (the number of CPUs if None).
+        depth (int): Depth per position (DEFAULT_DEPTH without other limits).
+        time_limit (float): Seconds per position.
+        node_limit (int): Nodes per position.
+        hash_mb (float): Transposition table size of each worker.
+        resume (bool): Append to output_path, skipping positions already in it.
+        max_pending (int): Positions queued at once (four per process if None).
+
+    Returns:
+        int: The number of positions analysed in this run.
+    """
+    if depth is None:
+        depth = MAX_DEPTH if time_limit or node_limit else DEFAULT_DEPTH
+    done = set()
+    if resume and os.path.exists(output_path):
+        _drop_partial_line(output_path)
+        done = completed_ids(output_path)
+    processes = processes or os.cpu_count() or 1
+    slots = threading.BoundedSemaphore(max_pending or 4 * processes)
+    # Set when the results are no longer read, so that jobs() stops waiting for a slot
+    aborted = threading.Event()
+
+    def jobs():
+        for position_id, fen in read_positions(input_path):
+            if position_id in done:
+                continue
+            # The pool's task handler thread runs this generator, and pool.terminate()
+            # joins that thread, so it must never wait for a slot indefinitely
+            while not slots.acquire(timeout=0.1):
+                if aborted.is_set():
+                    return
+            yield position_id, fen, depth, time_limit, node_limit
+
+    options = {"hash_mb": hash_mb}
+    count = 0
+    with open(output_path, "a" if resume else "w", encoding="utf-8") as out:
+        pool = None
+        if processes > 1:
+            pool = multiprocessing.Pool(processes, initializer=_init_worker, initargs=(options,))
+            results = pool.imap_unordered(_analyse, jobs())
+        else:
+            _init_worker(options)
+            results = map(_analyse, jobs())
+        try:
+            for result in results:
+                slots.release()
+                out.write(json.dumps(result) + "\n")
+                out.flush()
+                count += 1
+        finally:
+            aborted.set()
+            if pool is not None:
+                pool.terminate()
+                pool.join()
+    return count
+
+
+def main(argv=None):
+    """Command line entry point: python -m src.analysis positions.epd results.jsonl"""
+    parser = argparse.ArgumentParser(description="Analyse EPD, FEN or PGN positions in parallel.")
+    parser.add_argument("input")
+    parser.add_argument("output")
+    parser.add_argument("--processes", type=int, default=None, help="Worker processes (default: all CPUs).")
+    parser.add_argument("--depth", type=int, default=None, help="Depth per position.")
+    parser.add_argument("--movetime", type=float, default=None, help="Seconds per position.")
+    parser.add_argument("--nodes", type=int, default=None, help="Nodes per position.")
+    parser.add_argument("--hash-mb", type=float, default=16, help="Transposition table size per worker.")
+    parser.add_argument("--resume", action="store_true", help="Skip positions already in the output file.")
+    args = parser.parse_args(argv)
+
+    count = analyse_file(args.input, args.output, args.processes, args.depth, args.movetime,
+                         args.nodes, args.hash_mb, args.resume)
+    print("%s: %d positions analysed" % (args.output, count))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,279 @@
+import numpy as np
+from src.board_utils import (
+    WHITE, BLACK, PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING, KNIGHT_STEPS, KING_STEPS, Position
+)
+from src.evaluation import _popcount
+
+# Positions are (N, 64) int8 arrays of board_utils piece codes, indexed like
+# the compact board (row * 8 + col, row 0 being Black's back rank). Bitboards
+# are uint64 with bit i for square i of that numbering, and every operation
+# works on all N positions at once; per-square results are (N, 64) arrays.
+
+_ALL = (1 << 64) - 1
+_COL_0 = sum(1 << (row * 8) for row in range(8))
+SQUARE_BITS = np.array([1 << square for square in range(64)], dtype=np.uint64)
+_ZERO = np.uint64(0)
+# Squares a step with this column change can land on, so that steps do not wrap around the board
+_COLUMN_MASKS = {
+    -2: np.uint64(_ALL & ~(_COL_0 << 6 | _COL_0 << 7)),
+    -1: np.uint64(_ALL & ~(_COL_0 << 7)),
+    0: np.uint64(_ALL),
+    1: np.uint64(_ALL & ~_COL_0),
+    2: np.uint64(_ALL & ~(_COL_0 | _COL_0 << 1)),
+}
+# Rows that a double pawn push lands on, by color
+_DOUBLE_PUSH_ROWS = {WHITE: np.uint64(0xFF << 32), BLACK: np.uint64(0xFF << 24)}
+ROOK_DIRECTIONS = ((1, 0), (-1, 0), (0, 1), (0, -1))
+BISHOP_DIRECTIONS = ((1, 1), (1, -1), (-1, 1), (-1, -1))
+# Chunk of positions processed at once by the functions building (N, 64) arrays
+CHUNK_SIZE = 1 << 14
+
+
+def _step(bitboards, dr: int, dc: int):
+    """Move every bit by dr rows and dc columns, dropping those that leave the board."""
+    shift = dr * 8 + dc
+    if shift >= 0:
+        moved = bitboards << np.uint64(shift)
+    else:
+        moved = bitboards >> np.uint64(-shift)
+    return moved & _COLUMN_MASKS[dc]
+
+
+def _slide(generators, empty, dr: int, dc: int):
+    """
+    Squares attacked in one direction by the sliders in generators: every
+    square up to and including the first occupied one (Kogge-Stone occluded fill).
+    """
+    shift = dr * 8 + dc
+    mask = _COLUMN_MASKS[dc]
+    empty = empty & mask
+    for amount in (shift, 2 * shift, 4 * shift):
+        if amount >= 0:
+            generators = generators | (empty & (generators << np.uint64(amount)))
+            empty = empty & (empty << np.uint64(amount))
+        else:
+            generators = generators | (empty & (generators >> np.uint64(-amount)))
+            empty = empty & (empty >> np.uint64(-amount))
+    return _step(generators, dr, dc) & mask
+
+
+def _step_attacks(bitboards, steps):
+    attacks = np.zeros_like(bitboards)
+    for dr, dc in steps:
+        attacks |= _step(bitboards, dr, dc)
+    return attacks
+
+
+def _slider_attacks(bitboards, empty, directions):
+    attacks = np.zeros_like(bitboards)
+    for dr, dc in directions:
+        attacks |= _slide(bitboards, empty, dr, dc)
+    return attacks
+
+
+def _pawn_direction(color: int):
+    return -1 if color == WHITE else 1
+
+
+def positions_from_fens(fens):
+    """
+    Build a batch from FEN strings.
+
+    Returns:
+        (np.ndarray, np.ndarray): (N, 64) int8 positions and (N,) bool white_to_move.
+    """
+    squares = []
+    white_to_move = []
+    for fen in fens:
+        position = Position.from_fen(fen)
+        squares.append(bytes(position.squares))
+        white_to_move.append(position.turn == WHITE)
+    positions = np.frombuffer(b"".join(squares), dtype=np.int8).reshape(-1, 64)
+    return positions.copy(), np.array(white_to_move, dtype=bool)
+
+
+def piece_bitboards(positions):
+    """
+    Bitboards of every piece code.
+
+    Args:
+        positions (np.ndarray): (N, 64) int8 piece codes.
+
+    Returns:
+        np.ndarray: (N, 16) uint64; column c holds the squares of piece code c.
+    """
+    positions = np.asarray(positions, dtype=np.int8)
+    bitboards = np.zeros((len(positions), 16), dtype=np.uint64)
+    for code in (PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING):
+        for color in (WHITE, BLACK):
+            bitboards[:, color | code] = np.bitwise_or.reduce(
+                np.where(positions == (color | code), SQUARE_BITS, _ZERO), axis=1)
+    return bitboards
+
+
+def attack_maps(positions):
+    """
+    Squares attacked by each side.
+
+    Args:
+        positions (np.ndarray): (N, 64) int8 piece codes.
+
+    Returns:
+        np.ndarray: (N, 2) uint64; column 0 for White's attacks, 1 for Black's.
+    """
+    return _attack_maps(piece_bitboards(positions))
+
+
+def _attack_maps(bitboards):
+    empty = ~np.bitwise_or.reduce(bitboards, axis=1)
+    attacks = np.zeros((len(bitboards), 2), dtype=np.uint64)
+    for column, color in enumerate((WHITE, BLACK)):
+        attacks[:, column] = _side_attacks(bitboards, color, empty)
+    return attacks
+
+
+def _side_attacks(bitboards, color: int, empty):
+    """Squares attacked by the pieces of one color, sliders stopping at the first square not in empty."""
+    forward = _pawn_direction(color)
+    pawns = bitboards[:, color | PAWN]
+    queens = bitboards[:, color | QUEEN]
+    return (_step(pawns, forward, -1) | _step(pawns, forward, 1)
+            | _step_attacks(bitboards[:, color | KNIGHT], KNIGHT_STEPS)
+            | _step_attacks(bitboards[:, color | KING], KING_STEPS)
+            | _slider_attacks(bitboards[:, color | ROOK] | queens, empty, ROOK_DIRECTIONS)
+            | _slider_attacks(bitboards[:, color | BISHOP] | queens, empty, BISHOP_DIRECTIONS))
+
+
+def in_check(positions, white_to_move):
+    """
+    Args:
+        positions (np.ndarray): (N, 64) int8 piece codes.
+        white_to_move (np.ndarray): (N,) bool, or one bool for the whole batch.
+
+    Returns:
+        np.ndarray: (N,) bool, True where the side to move's king is attacked.
+    """
+    bitboards = piece_bitboards(positions)
+    attacks = _attack_maps(bitboards)
+    white_to_move = np.broadcast_to(np.asarray(white_to_move, dtype=bool), (len(bitboards),))
+    king = np.where(white_to_move, bitboards[:, KING], bitboards[:, BLACK | KING])
+    enemy_attacks = np.where(white_to_move, attacks[:, 1], attacks[:, 0])
+    return (king & enemy_attacks) != _ZERO
+
+
+def _color_move_masks(positions, color, own, enemy, empty):
+    """Pseudo-legal move_masks of the pieces of one color, for every position of the batch."""
+    def origins(*codes):
+        selected = np.zeros(positions.shape, dtype=bool)
+        for code in codes:
+            selected |= positions == (color | code)
+        return np.where(selected, SQUARE_BITS, _ZERO)
+
+    masks = _step_attacks(origins(KNIGHT), KNIGHT_STEPS)
+    masks |= _step_attacks(origins(KING), KING_STEPS)
+    masks |= _slider_attacks(origins(ROOK, QUEEN), empty, ROOK_DIRECTIONS)
+    masks |= _slider_attacks(origins(BISHOP, QUEEN), empty, BISHOP_DIRECTIONS)
+    masks &= ~own
+
+    # Each pawn's pushes stay in its origin's column of the array, so a
+    # double push is a single push stepped once more
+    forward = _pawn_direction(color)
+    pawns = origins(PAWN)
+    single = _step(pawns, forward, 0) & empty
+    double = _step(single, forward, 0) & empty & _DOUBLE_PUSH_ROWS[color]
+    masks |= single | double
+    masks |= (_step(pawns, forward, -1) | _step(pawns, forward, 1)) & enemy
+    return masks
+
+
+def _legal_targets(positions, bitboards, color: int):
+    """
+    Targets the pieces of one color may move to without leaving their king in
+    check, per origin square: the king avoids attacked squares, the other
+    pieces must capture or block a single checker (nothing against a double
+    check), and pinned pieces stay on the line between their king and the pinner.
+
+    Returns:
+        np.ndarray: (N, 64) uint64 masks to AND with the pseudo-legal targets.
+    """
+    enemy_color = BLACK if color == WHITE else WHITE
+    own = np.bitwise_or.reduce(bitboards[:, color:color + 8], axis=1)
+    empty = ~np.bitwise_or.reduce(bitboards, axis=1)
+    king = bitboards[:, color | KING]
+    enemy_queens = bitboards[:, enemy_color | QUEEN]
+
+    # Checkers; a slider checking along a line can be blocked anywhere on it
+    forward = _pawn_direction(color)
+    checkers = ((_step(king, forward, -1) | _step(king, forward, 1)) & bitboards[:, enemy_color | PAWN]
+                | _step_attacks(king, KNIGHT_STEPS) & bitboards[:, enemy_color | KNIGHT])
+    evasions = np.zeros_like(king)
+    pinned_to = np.full(positions.shape, _ALL, dtype=np.uint64)
+    for directions, slider in ((ROOK_DIRECTIONS, ROOK), (BISHOP_DIRECTIONS, BISHOP)):
+        sliders = bitboards[:, enemy_color | slider] | enemy_queens
+        for dr, dc in directions:
+            ray = _slide(king, empty, dr, dc)
+            checking = (ray & sliders) != _ZERO
+            checkers |= ray & sliders
+            evasions |= np.where(checking, ray, _ZERO)
+            # Past the first own piece on the ray: a slider there pins it
+            blocker = ray & own
+            xray = _slide(king, empty | blocker, dr, dc)
+            pinned = np.where((xray & sliders & ~ray) != _ZERO, blocker, _ZERO)
+            pinned_to &= np.where((pinned[:, None] & SQUARE_BITS) != _ZERO, xray[:, None], np.uint64(_ALL))
+
+    check_count = _popcount(checkers)
+    evasions = np.where(check_count == 0, np.uint64(_ALL), np.where(check_count == 1, evasions | checkers, _ZERO))
+    targets = pinned_to & evasions[:, None]
+    # The king cannot hide behind itself from a slider
+    king_moves = ~_side_attacks(bitboards, enemy_color, empty | king)
+    return np.where(positions == (color | KING), king_moves[:, None], targets)
+
+
+def move_masks(positions, white_to_move):
+    """
+    Legal moves of the side to move, as a target bitboard per origin
+    square. The array holds no castling rights or en passant square, so
+    those moves are not included, and a promotion counts once; otherwise
+    the moves are those of chess.Board.legal_moves, pins and checks included.
+
+    Args:
+        positions (np.ndarray): (N, 64) int8 piece codes.
+        white_to_move (np.ndarray): (N,) bool, or one bool for the whole batch.
+
+    Returns:
+        np.ndarray: (N, 64) uint64; element [n, s] holds the target squares of
+        the piece on square s of position n (0 for empty squares and the
+        opponent's pieces).
+    """
+    positions = np.asarray(positions, dtype=np.int8)
+    white_to_move = np.broadcast_to(np.asarray(white_to_move, dtype=bool), (len(positions),))
+    bitboards = piece_bitboards(positions)
+    white = np.bitwise_or.reduce(bitboards[:, :8], axis=1)[:, None]
+    black = np.bitwise_or.reduce(bitboards[:, 8:], axis=1)[:, None]
+    empty = ~(white | black)
+
+    result = np.zeros(positions.shape, dtype=np.uint64)
+    for color, own, enemy, selected in ((WHITE, white, black, white_to_move), (BLACK, black, white, ~white_to_move)):
+        if not selected.any():
+            continue
+        result[selected] = (_color_move_masks(positions[selected], color, own[selected], enemy[selected],
+                                              empty[selected])
+                            & _legal_targets(positions[selected], bitboards[selected], color))
+    return result
+
+
+def mobility(positions, white_to_move, chunk_size=CHUNK_SIZE):
+    """
+    Number of legal moves of the side to move (see move_masks), in
+    chunks of chunk_size positions so that memory stays bounded.
+
+    Returns:
+        np.ndarray: (N,) int64 move counts.
+    """
+    positions = np.asarray(positions, dtype=np.int8)
+    white_to_move = np.broadcast_to(np.asarray(white_to_move, dtype=bool), (len(positions),))
+    counts = np.zeros(len(positions), dtype=np.int64)
+    for start in range(0, len(positions), chunk_size):
+        end = start + chunk_size
+        counts[start:end] = _popcount(move_masks(positions[start:end], white_to_move[start:end])).sum(axis=1)
+    return counts
@@ -0,0 +1,328 @@
+import argparse
+import json
+import platform
+import sys
+import time
+import chess
+from src.board_utils import generate_pseudo_legal_moves, generate_compact_moves, make_move, to_compact, Position
+from src.engine import Engine
+from src.rules import Rules
+
+BENCH_VERSION = 1
+DEFAULT_SEARCH_DEPTH = 3
+DEFAULT_PERFT_DEPTH = 4
+# Relative slowdown of a speed metric reported as a regression
+DEFAULT_THRESHOLD = 0.05
+
+# Standard perft positions with their known node counts at depths 1, 2, ...
+PERFT_POSITIONS = [
+    ("startpos", chess.STARTING_FEN, (20, 400, 8902, 197281)),
+    ("kiwipete", "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1", (48, 2039, 97862)),
+    ("position3", "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1", (14, 191, 2812, 43238)),
+    ("position4", "r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1", (6, 264, 9467)),
+    ("position5", "rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8", (44, 1486, 62379)),
+    ("position6", "r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10", (46, 2079, 89890)),
+]
+
+# Reference positions of the search benchmark: openings after eight moves,
+# middlegames and endgames
+SEARCH_POSITIONS = [
+    "r1bq1rk1/2p1bppp/p1np1n2/1p2p3/4P3/1BP2N2/PP1P1PPP/RNBQR1K1 w - - 1 9",
+    "rn1qk2r/1p2bppp/p2pbn2/4p3/4P3/1NN1BP2/PPP3PP/R2QKB1R w KQkq - 1 9",
+    "r1bq1rk1/pp3ppp/2n1pn2/2p5/1bBP4/2N1PN2/PP3PPP/R1BQ1RK1 w - - 1 9",
+    "rn1q1rk1/pp3ppp/2p1pn2/5b2/PbBP4/2N1PN2/1P3PPP/R1BQ1RK1 w - - 3 9",
+    "rnb2rk1/pp1nqppp/4p3/2ppP3/3P1P2/2N2N2/PPP3PP/R2QKB1R w KQ - 0 9",
+    "r2qkbnr/pp1npppb/2p4p/7P/3P4/5NN1/PPP2PP1/R1BQKB1R w KQkq - 1 9",
+    "r1bq1rk1/ppp1npbp/3p1np1/3Pp3/2P1P3/2N2N2/PP2BPPP/R1BQ1RK1 w - - 1 9",
+    "r1bq1rk1/ppp1bppp/1nn5/4p3/8/2NP1NP1/PP2PPBP/R1BQ1RK1 w - - 1 9",
+    "r1bq1rk1/bpp2ppp/p1np1n2/4p3/P1B1P3/2PP1N1P/1P3PP1/RNBQ1RK1 w - - 1 9",
+    "r1bqk2r/ppp1bppp/8/3p4/1nPPn3/3B1N2/PP3PPP/RNBQ1RK1 w kq - 1 9",
+    "r1bq1rk1/pp2ppbp/2np1np1/8/2PNP3/2N1B3/PP2BPPP/R2QK2R w KQ - 0 9",
+    "rnbq1rk1/p1p1bpp1/1p2p2p/3n4/3P3B/2N1PN2/PP3PPP/R2QKB1R w KQ - 0 9",
+    "rn2k2r/pp3ppp/2p1pn2/q4b2/1bBP4/2N2N2/PPPBQPPP/R3K2R w KQkq - 2 9",
+    "r1bq1rk1/p3bppp/2n1pn2/1ppp4/4P3/3P1NP1/PPPN1PBP/R1BQR1K1 w - - 0 9",
+    "rnbqk2r/ppp2p1p/3b4/3PN2n/2BP1ppP/8/PPP3P1/RNBQK2R w KQkq - 1 9",
+    "rnb1qrk1/1pp1p1bp/3p1np1/p2P1p2/2P5/2N2NP1/PP2PPBP/R1BQ1RK1 w - - 0 9",
+    "r1b1k2r/1pqp1ppp/p1n1pn2/8/1b1NP3/2N1B3/PPPQ1PPP/2KR1B1R w kq - 4 9",
+    "r1b1k2r/ppppnppp/6q1/2b1n3/3NP3/2P1B3/PP2BPPP/RN1QK2R w KQkq - 5 9",
+    "rn1qk2r/p3bppp/bpp1pn2/3p4/2PP4/1PB2NP1/P3PPBP/RN1QK2R w KQkq - 0 9",
+    "1rbq1rk1/pp2ppbp/n2p1np1/2pP4/4PP2/2NB1N2/PPP3PP/R1BQ1RK1 w - - 1 9",
+    "r1bk1b1r/ppp2ppp/2p5/4Pn2/8/5N2/PPP2PPP/RNB2RK1 w - - 0 9",
+    "r1bq1rk1/p4ppp/1pnbpn2/2pp4/3P4/2PBPNB1/PP1N1PPP/R2QK2R w KQ - 0 9",
+    "r1bqkb1r/pp2pppp/1nn5/1B2p3/3P4/5N2/PP3PPP/RNBQK2R w KQkq - 0 9",
+    "r1b1k2r/ppp1q1pp/2nb1p1n/1B1pp3/2P2P2/1P2PNP1/PB1P3P/RN1QK2R w KQkq - 1 9",
+    "r1bqk2r/pp2bppp/2n5/2ppP3/3P4/2P2N2/P1P3PP/R1BQKB1R w KQkq - 1 9",
+    "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+    "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1",
+    "r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1",
+    "rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8",
+    "r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10",
+    "8/k7/3p4/p2P1p2/P2P1P2/8/8/K7 w - - 0 1",
+    "1K1k4/1P6/8/8/8/8/r7/2R5 w - - 0 1",
+    "4k3/8/8/3PK3/8/8/r7/7R b - - 0 1",
+    "6k1/5ppp/8/8/8/8/5PPP/3R2K1 w - - 0 1",
+    "8/8/8/4k3/8/8/3QK3/8 w - - 0 1",
+    "8/8/8/8/4k3/8/4P3/4K3 w - - 0 1",
+    "2r3k1/pp3ppp/8/3R4/8/8/PP3PPP/6K1 w - - 0 1",
+    "r1bq1rk1/pp2bppp/2n2n2/3p4/3N4/2N1B3/PP2BPPP/R2Q1RK1 w - - 0 10",
+    "2rq1rk1/pp1bppbp/2np1np1/8/3NP3/1BN1BP2/PPPQ2PP/2KR3R w - - 0 11",
+    "r2qr1k1/1b1nbppp/p2p1n2/1pp1p3/4P3/1BPP1N1P/PP1N1PP1/R1BQR1K1 w - - 0 12",
+    "3r1rk1/pp3ppp/2n1b3/q1pp4/8/2PBPN2/P1Q2PPP/R4RK1 w - - 0 15",
+    "r1b2rk1/2q1bppp/p2p1n2/np2p3/3PP3/5N1P/PPBN1PP1/R1BQR1K1 w - - 0 13",
+    "2kr3r/ppp2ppp/2n5/2b1p3/4P1b1/2NP1N2/PPP2PPP/R1B1KB1R w KQ - 2 8",
+    "6k1/pp3pp1/2p4p/8/3P4/2P3P1/PP3PKP/8 w - - 0 30",
+    "8/5pk1/6p1/3R4/7P/6P1/r4PK1/8 b - - 0 40",
+    "5rk1/1p3ppp/p7/8/2P5/1P4P1/P4P1P/3R2K1 w - - 0 25",
+    "8/8/4kpp1/3p1b2/p6P/2B5/6P1/6K1 b - - 0 47",
+    "r1bqk2r/pppp1ppp/2n2n2/2b1p3/2B1P3/3P1N2/PPP2PPP/RNBQK2R w KQkq - 1 5",
+    "rnbqkb1r/pp2pppp/5n2/2pp4/3P1B2/4P3/PPP2PPP/RN1QKBNR w KQkq - 0 4",
+    "r2q1rk1/ppp2ppp/2n1bn2/2b1p3/3pP3/3P1NPP/PPP1NPB1/R1BQ1RK1 b - - 0 9",
+]
+
+
+def perft(board: chess.Board, depth: int):
+    """Count the leaf nodes of the legal move tree of the given depth."""
+    if depth == 0:
+        return 1
+    moves = list(board.legal_moves)
+    if depth == 1:
+        return len(moves)
+    nodes = 0
+    for move in moves:
+        board.push(move)
+        nodes += perft(board, depth - 1)
+        board.pop()
+    return nodes
+
+
+def board_utils_perft(grid, player: str, depth: int):
+    """
+    Perft over board_utils.generate_pseudo_legal_moves on a 2D list board.
+
+    That generator has no castling, en passant, promotion or check test, so
+    the counts only measure its throughput and do not match the standard ones.
+    """
+    if depth == 0:
+        return 1
+    moves = generate_pseudo_legal_moves(grid, player)
+    if depth == 1:
+        return len(moves)
+    opponent = "black" if player == "white" else "white"
+    nodes = 0
+    for start, end in moves:
+        captured = grid[end[0]][end[1]]
+        make_move(grid, start, end)
+        nodes += board_utils_perft(grid, opponent, depth - 1)
+        make_move(grid, end, start)
+        grid[end[0]][end[1]] = captured
+    return nodes
+
+
+def compact_perft(squares, player: str, depth: int):
+    """board_utils_perft on the compact board, with board_utils.generate_compact_moves."""
+    if depth == 0:
+        return 1
+    moves = generate_compact_moves(squares, player)
+    if depth == 1:
+        return len(moves)
+    opponent = "black" if player == "white" else "white"
+    nodes = 0
+    for start, end in moves:
+        captured = squares[end]
+        squares[end] = squares[start]
+        squares[start] = 0
+        nodes += compact_perft(squares, opponent, depth - 1)
+        squares[start] = squares[end]
+        squares[end] = captured
+    return nodes
+
+
+def _fen_to_grid(fen: str):
+    """The board_utils 2D list (row 0 = rank 8) and side to move of a FEN."""
+    placement, turn = fen.split()[:2]
+    grid = []
+    for rank in placement.split("/"):
+        row = []
+        for char in rank:
+            row.extend("." * int(char) if char.isdigit() else char)
+        grid.append(row)
+    return grid, "white" if turn == "w" else "black"
+
+
+def _speed(nodes: int, seconds: float):
+    return nodes / seconds if seconds > 0 else 0.0
+
+
+def run_perft(max_depth=DEFAULT_PERFT_DEPTH):
+    """
+    Run perft on the standard positions with python-chess (through Rules),
+    with the pseudo-legal board_utils generators on its list and compact
+    boards, and with the legal board_utils.Position, each to min(max_depth,
+    deepest known count).
+
+    Returns:
+        dict: Per generator, total "nodes", "time", "nps" and the "positions";
+        for the legal generators, the positions whose counts differ from the
+        known ones are listed in "mismatches".
+    """
+    results = {}
+    for generator in ("python-chess", "board_utils", "board_utils_compact", "board_utils_legal"):
+        positions = []
+        for name, fen, counts in PERFT_POSITIONS:
+            depth = min(max_depth, len(counts))
+            start = time.perf_counter()
+            if generator == "python-chess":
+                nodes = perft(Rules(fen).board, depth)
+            elif generator == "board_utils":
+                nodes = board_utils_perft(*_fen_to_grid(fen), depth)
+            elif generator == "board_utils_compact":
+                grid, player = _fen_to_grid(fen)
+                nodes = compact_perft(to_compact(grid), player, depth)
+            else:
+                nodes = Position.from_fen(fen).perft(depth)
+            positions.append({"name": name, "depth": depth, "nodes": nodes,
+                              "time": time.perf_counter() - start})
+        nodes = sum(position["nodes"] for position in positions)
+        seconds = sum(position["time"] for position in positions)
+        results[generator] = {"nodes": nodes, "time": seconds, "nps": _speed(nodes, seconds),
+                              "positions": positions}
+    counts = {name: counts for name, _, counts in PERFT_POSITIONS}
+    for generator in ("python-chess", "board_utils_legal"):
+        results[generator]["mismatches"] = [
+            position["name"] for position in results[generator]["positions"]
+            if position["nodes"] != counts[position["name"]][position["depth"] - 1]]
+    return results
+
+
+def run_search(fens=None, depth=DEFAULT_SEARCH_DEPTH, hash_mb=16):
+    """
+    Search every reference position to a fixed depth with one engine, clearing
+    its transposition table between positions so each search is reproducible.
+
+    Returns:
+        dict: Total "nodes" (main and quiescence search), "time" and "nps",
+        "tt_hit_rate" over all probes, and "time_to_depth", the summed time at
+        which each depth was completed.
+    """
+    fens = SEARCH_POSITIONS if fens is None else fens
+    engine = Engine(color_is_white=True, hash_mb=hash_mb)
+    time_to_depth = [0.0] * depth
+
+    def record_iteration(stats, seconds):
+        time_to_depth[stats["depth"] - 1] += seconds
+
+    engine.info_callback = record_iteration
+    nodes = tt_probes = tt_hits = 0
+    seconds = 0.0
+    try:
+        for fen in fens:
+            engine.transposition_table.clear()
+            _, _, search_time = engine.find_best_move_with_stats(chess.Board(fen), depth)
+            stats = engine.get_search_statistics()
+            nodes += stats["nodes_searched"] + stats["quiescence_nodes"]
+            seconds += search_time
+            tt_probes += engine.tt_probes
+            tt_hits += engine.tt_hits
+    finally:
+        engine.close()
+    return {
+        "depth": depth,
+        "positions": len(fens),
+        "nodes": nodes,
+        "time": seconds,
+        "nps": _speed(nodes, seconds),
+        "tt_hit_rate": tt_hits / tt_probes if tt_probes else 0.0,
+        "time_to_depth": {str(d + 1): t for d, t in enumerate(time_to_depth)},
+    }
+
+
+def run_bench(perft_depth=DEFAULT_PERFT_DEPTH, search_depth=DEFAULT_SEARCH_DEPTH, fens=None):
+    """Run the whole suite and return its results, ready to be written as JSON."""
+    return {
+        "version": BENCH_VERSION,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "perft": run_perft(perft_depth),
+        "search": run_search(fens, search_depth),
+    }
+
+
+def compare_results(current, baseline, threshold=DEFAULT_THRESHOLD):
+    """
+    Compare a bench run with a baseline.
+
+    Speeds (nodes per second) that dropped by more than threshold are
+    regressions. Node counts are compared too: a different search node count
+    means the search itself changed, so its speeds are not like for like.
+
+    Returns:
+        list: One dict per metric with "metric", "baseline", "current", the
+        relative "change" and whether it is a "regression".
+    """
+    metrics = [
+        ("perft.python-chess.nps", ("perft", "python-chess", "nps"), True),
+        ("perft.board_utils.nps", ("perft", "board_utils", "nps"), True),
+        ("perft.board_utils_compact.nps", ("perft", "board_utils_compact", "nps"), True),
+        ("perft.board_utils_legal.nps", ("perft", "board_utils_legal", "nps"), True),
+        ("search.nps", ("search", "nps"), True),
+        ("search.nodes", ("search", "nodes"), False),
+        ("search.tt_hit_rate", ("search", "tt_hit_rate"), False),
+    ]
+    comparison = []
+    for name, path, is_speed in metrics:
+        old, new = baseline, current
+        try:
+            for field in path:
+                old, new = old[field], new[field]
+        except (KeyError, TypeError):
+            continue
+        change = (new - old) / old if old else 0.0
+        comparison.append({"metric": name, "baseline": old, "current": new, "change": change,
+                           "regression": is_speed and change < -threshold})
+    if current.get("search", {}).get("depth") != baseline.get("search", {}).get("depth"):
+        # Different depths measure different searches
+        comparison = [entry for entry in comparison if not entry["metric"].startswith("search.")]
+    return comparison
+
+
+def main(argv=None):
+    """Command line entry point: python -m src.bench --output bench.json --baseline baseline.json"""
+    parser = argparse.ArgumentParser(description="Perft and search benchmark.")
+    parser.add_argument("--output", default=None, help="Write the results to this JSON file.")
+    parser.add_argument("--baseline", default=None, help="Compare with the results in this JSON file.")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Relative slowdown reported as a regression.")
+    parser.add_argument("--perft-depth", type=int, default=DEFAULT_PERFT_DEPTH)
+    parser.add_argument("--depth", type=int, default=DEFAULT_SEARCH_DEPTH, help="Search depth per position.")
+    args = parser.parse_args(argv)
+
+    results = run_bench(args.perft_depth, args.depth)
+    for generator, perft_results in results["perft"].items():
+        print("perft %-19s %10d nodes %8.2f s %10.0f nps"
+              % (generator, perft_results["nodes"], perft_results["time"], perft_results["nps"]))
+    search = results["search"]
+    print("search depth %-12d %10d nodes %8.2f s %10.0f nps   tt hit rate %.1f%%"
+          % (search["depth"], search["nodes"], search["time"], search["nps"], search["tt_hit_rate"] * 100))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    failed = False
+    for generator, perft_results in results["perft"].items():
+        if perft_results.get("mismatches"):
+            print("%s perft count mismatch: %s" % (generator, ", ".join(perft_results["mismatches"])))
+            failed = True
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        for entry in compare_results(results, baseline, args.threshold):
+            print("%-24s %14.6g -> %14.6g  %+6.1f%%%s"
+                  % (entry["metric"], entry["baseline"], entry["current"], entry["change"] * 100,
+                     "  REGRESSION" if entry["regression"] else ""))
+            failed = failed or entry["regression"]
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,304 @@
+import argparse
+import mmap
+import os
+import chess
+import numpy as np
+
+# Endgames with a lone king against king and one piece, generated in this
+# order because the pawn ending looks up its promotions in the other two
+ENDGAMES = ("KQK", "KRK", "KPK")
+_PIECE_TYPES = {"KQK": chess.QUEEN, "KRK": chess.ROOK, "KPK": chess.PAWN}
+
+# A position is indexed by the squares of the strong king, the weak king and
+# the piece, with the strong side playing White: sk * 4096 + wk * 64 + piece.
+# A file holds a header, then one bit per position with the strong side to
+# move, then one bit per position with the weak side to move. A set bit means
+# the strong side wins; illegal positions are 0.
+POSITIONS = 64 * 64 * 64
+FILE_MAGIC = b"BITBASE1"
+FILE_HEADER_SIZE = 16
+FILE_SIZE = FILE_HEADER_SIZE + 2 * POSITIONS // 8
+
+DEFAULT_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bitbases")
+
+_KING_STEPS = ((1, 0), (1, 1), (0, 1), (-1, 1), (-1, 0), (-1, -1), (0, -1), (1, -1))
+_SLIDER_STEPS = {
+    chess.ROOK: ((1, 0), (0, 1), (-1, 0), (0, -1)),
+    chess.QUEEN: _KING_STEPS,
+}
+
+
+def _step(square: int, file_step: int, rank_step: int):
+    """The square one step away, or -1 off the board."""
+    file = chess.square_file(square) + file_step
+    rank = chess.square_rank(square) + rank_step
+    if 0 <= file < 8 and 0 <= rank < 8:
+        return chess.square(file, rank)
+    return -1
+
+
+def _rays(piece_type: int):
+    """For each direction, the arrays of the squares 1, 2, ... 7 steps from every square (-1 off the board)."""
+    rays = []
+    for step in _SLIDER_STEPS[piece_type]:
+        current = np.arange(64)
+        steps = []
+        for _ in range(7):
+            current = np.array([_step(sq, *step) if sq >= 0 else -1 for sq in current])
+            steps.append(current)
+        rays.append(steps)
+    return rays
+
+
+def _piece_attacks(piece_type: int):
+    """
+    attacks[sk, piece]: bitboard of the squares the strong piece attacks when
+    the strong king stands on sk (the weak king does not block: it is the target).
+    """
+    attacks = np.zeros((64, 64), dtype=np.uint64)
+    for piece in chess.SQUARES:
+        if piece_type == chess.PAWN:
+            pawn_attacks = chess.BB_PAWN_ATTACKS[chess.WHITE][piece]
+            attacks[:, piece] = pawn_attacks
+            continue
+        for file_step, rank_step in _SLIDER_STEPS[piece_type]:
+            for sk in chess.SQUARES:
+                square = _step(piece, file_step, rank_step)
+                while square >= 0:
+                    attacks[sk, piece] |= np.uint64(chess.BB_SQUARES[square])
+                    if square == sk:
+                        break
+                    square = _step(square, file_step, rank_step)
+    return attacks
+
+
+def generate(endgame: str, solved=None):
+    """
+    Solve an endgame by retrograde analysis.
+
+    Starting from nothing won, a strong-side position is won if one of its
+    moves reaches a won position, and a weak-side position if it is mate or
+    every move reaches a won position; this is repeated until nothing
+    changes. Moves are precomputed once as (from, to) index arrays, so each
+    pass is a few NumPy gathers and scatters over all positions.
+
+    Args:
+        endgame (str): "KQK", "KRK" or "KPK".
+        solved (dict): Already generated tables by endgame name, as returned
+            by this function. KPK needs KQK and KRK for its promotions.
+
+    Returns:
+        (np.ndarray, np.ndarray): Boolean arrays of shape (64, 64, 64), indexed
+        [sk, wk, piece], for the strong side and the weak side to move.
+    """
+    piece_type = _PIECE_TYPES[endgame]
+    squares = np.arange(64)
+    sk = squares[:, None, None]
+    wk = squares[None, :, None]
+    piece = squares[None, None, :]
+    files, ranks = squares % 8, squares // 8
+    distance = np.maximum(np.abs(files[:, None] - files[None, :]), np.abs(ranks[:, None] - ranks[None, :]))
+    adjacent = distance <= 1
+
+    piece_valid = np.ones(64, dtype=bool)
+    if piece_type == chess.PAWN:
+        piece_valid[:8] = piece_valid[56:] = False
+    distinct = (sk != wk) & (sk != piece) & (wk != piece)
+    attacks = _piece_attacks(piece_type)
+    attacked = ((attacks[:, None, :] >> wk.astype(np.uint64)) & np.uint64(1)).astype(bool)
+    legal = distinct & ~adjacent[:, :, None] & piece_valid[None, None, :]
+    legal_strong = legal & ~attacked
+    legal_weak = legal
+    in_check = legal_weak & attacked
+
+    index = (sk * 4096 + wk * 64 + piece) + np.zeros((64, 64, 64), dtype=np.int64)
+    strong_from, strong_to = [], []
+    weak_from, weak_to = [], []
+    promotion_win = np.zeros((64, 64, 64), dtype=bool)
+
+    def add_moves(sources, targets, valid, into_from, into_to):
+        into_from.append(sources[valid])
+        into_to.append(targets[valid])
+
+    king_targets = [np.array([_step(sq, *step) for sq in chess.SQUARES]) for step in _KING_STEPS]
+    for targets in king_targets:
+        # Strong king moves
+        to_sk = targets[:, None, None] + np.zeros((64, 64, 64), dtype=np.int64)
+        on_board = to_sk >= 0
+        target_index = np.where(on_board, to_sk * 4096 + wk * 64 + piece, 0)
+        valid = legal_strong & on_board & legal_weak.reshape(-1)[target_index]
+        add_moves(index, target_index, valid, strong_from, strong_to)
+        # Weak king moves (captures are handled below)
+        to_wk = targets[None, :, None] + np.zeros((64, 64, 64), dtype=np.int64)
+        on_board = to_wk >= 0
+        target_index = np.where(on_board, sk * 4096 + to_wk * 64 + piece, 0)
+        valid = legal_weak & on_board & legal_strong.reshape(-1)[target_index]
+        add_moves(index, target_index, valid, weak_from, weak_to)
+
+    # The weak king takes a piece the strong king does not guard: a draw
+    weak_captures = np.zeros((64, 64, 64), dtype=bool)
+    for targets in king_targets:
+        weak_captures |= legal_weak & (targets[None, :, None] == piece) & ~adjacent[:, None, :]
+
+    if piece_type == chess.PAWN:
+        one_step = np.where(squares + 8 < 64, squares + 8, 0)
+        free = (one_step[None, None, :] != sk) & (one_step[None, None, :] != wk)
+        pushes = legal_strong & piece_valid[None, None, :] & free
+        promotes = pushes & (one_step[None, None, :] >= 56)
+        # Promoting to a queen or a rook, with the weak side to move
+        promoted_index = sk * 4096 + wk * 64 + one_step[None, None, :]
+        for table in (solved["KQK"][1], solved["KRK"][1]):
+            promotion_win |= promotes & table.reshape(-1)[np.where(promotes, promoted_index, 0)]
+        target_index = np.where(pushes, promoted_index, 0)
+        valid = pushes & ~promotes & legal_weak.reshape(-1)[target_index]
+        add_moves(index, target_index, valid, strong_from, strong_to)
+        two_steps = np.where(squares + 16 < 64, squares + 16, 0)
+        free_two = free & (two_steps[None, None, :] != sk) & (two_steps[None, None, :] != wk)
+        double = pushes & free_two & (ranks == 1)[None, None, :]
+        target_index = np.where(double, sk * 4096 + wk * 64 + two_steps[None, None, :], 0)
+        valid = double & legal_weak.reshape(-1)[target_index]
+        add_moves(index, target_index, valid, strong_from, strong_to)
+    else:
+        for steps in _rays(piece_type):
+            blocked = np.zeros((64, 64, 64), dtype=bool)
+            for targets in steps:
+                to_piece = targets[None, None, :] + np.zeros((64, 64, 64), dtype=np.int64)
+                blocked |= (to_piece < 0) | (to_piece == sk) | (to_piece == wk)
+                target_index = np.where(blocked, 0, sk * 4096 + wk * 64 + to_piece)
+                valid = legal_strong & ~blocked & legal_weak.reshape(-1)[target_index]
+                add_moves(index, target_index, valid, strong_from, strong_to)
+
+    strong_from, strong_to = np.concatenate(strong_from), np.concatenate(strong_to)
+    weak_from, weak_to = np.concatenate(weak_from), np.concatenate(weak_to)
+    has_move = np.zeros(POSITIONS, dtype=bool)
+    has_move[weak_from] = True
+    has_move |= weak_captures.reshape(-1)
+    can_lose = legal_weak.reshape(-1) & (has_move | in_check.reshape(-1)) & ~weak_captures.reshape(-1)
+
+    strong_win = np.zeros(POSITIONS, dtype=bool)
+    weak_win = np.zeros(POSITIONS, dtype=bool)
+    while True:
+        reached = promotion_win.reshape(-1).copy()
+        reached[strong_from[weak_win[strong_to]]] = True
+        new_strong = legal_strong.reshape(-1) & reached
+        escape = np.zeros(POSITIONS, dtype=bool)
+        escape[weak_from[~new_strong[weak_to]]] = True
+        new_weak = can_lose & ~escape
+        if np.array_equal(new_strong, strong_win) and np.array_equal(new_weak, weak_win):
+            break
+        strong_win, weak_win = new_strong, new_weak
+    return strong_win.reshape(64, 64, 64), weak_win.reshape(64, 64, 64)
+
+
+def save(path: str, endgame: str, tables):
+    """Write the two tables of an endgame as packed bits."""
+    strong_win, weak_win = tables
+    with open(path, "wb") as f:
+        f.write((FILE_MAGIC + endgame.encode("ascii")).ljust(FILE_HEADER_SIZE, b"\0"))
+        f.write(np.packbits(strong_win.reshape(-1), bitorder="little").tobytes())
+        f.write(np.packbits(weak_win.reshape(-1), bitorder="little").tobytes())
+
+
+def generate_all(directory=DEFAULT_DIRECTORY):
+    """Generate every endgame into directory; returns the paths written."""
+    os.makedirs(directory, exist_ok=True)
+    solved = {}
+    paths = []
+    for endgame in ENDGAMES:
+        solved[endgame] = generate(endgame, solved)
+        path = os.path.join(directory, endgame + ".bb")
+        save(path, endgame, solved[endgame])
+        paths.append(path)
+    return paths
+
+
+class Bitbases:
+    """
+    Win/draw bitbases for KQK, KRK and KPK.
+
+    Each file is mapped with mmap the first time a position of its endgame is
+    probed, so unused endgames cost nothing and the tables are shared between
+    processes through the page cache. Missing files are generated (about a
+    second each) and saved if generate_missing is set.
+    """
+
+    def __init__(self, directory=DEFAULT_DIRECTORY, generate_missing=True):
+        """
+        Args:
+            directory (str): Where the .bb files are kept.
+            generate_missing (bool): Generate and save endgames whose file is missing.
+        """
+        self.directory = directory
+        self.generate_missing = generate_missing
+        self._maps = {}
+
+    def _table(self, endgame: str):
+        mapped = self._maps.get(endgame)
+        if mapped is None:
+            path = os.path.join(self.directory, endgame + ".bb")
+            if not os.path.exists(path):
+                if not self.generate_missing:
+                    return None
+                generate_all(self.directory)
+            with open(path, "rb") as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            if len(mapped) != FILE_SIZE or mapped[:8] != FILE_MAGIC:
+                mapped.close()
+                raise ValueError("%s is not a bitbase file." % path)
+            self._maps[endgame] = mapped
+        return mapped
+
+    def copy(self):
+        """A new instance on the same files, with nothing mapped yet (so it can be sent to another process)."""
+        return Bitbases(self.directory, self.generate_missing)
+
+    def close(self):
+        for mapped in self._maps.values():
+            mapped.close()
+        self._maps = {}
+
+    def probe(self, board: chess.Board):
+        """
+        Look up a position with two kings and one queen, rook or pawn.
+
+        Returns:
+            int or None: 1 if the side to move wins, -1 if it loses, 0 for a
+            draw, None if the position is not covered.
+        """
+        if chess.popcount(board.occupied) != 3:
+            return None
+        non_kings = board.occupied & ~board.kings
+        piece_type = board.piece_type_at(chess.lsb(non_kings))
+        endgame = {chess.QUEEN: "KQK", chess.ROOK: "KRK", chess.PAWN: "KPK"}.get(piece_type)
+        if endgame is None:
+            return 0 if piece_type in (chess.KNIGHT, chess.BISHOP) else None
+        strong = chess.WHITE if board.occupied_co[chess.WHITE] & non_kings else chess.BLACK
+        table = self._table(endgame)
+        if table is None:
+            return None
+
+        # Put the strong side on White by mirroring the ranks
+        flip = 0 if strong == chess.WHITE else 56
+        sk = board.king(strong) ^ flip
+        wk = board.king(not strong) ^ flip
+        index = sk * 4096 + wk * 64 + (chess.lsb(non_kings) ^ flip)
+        strong_to_move = board.turn == strong
+        if not strong_to_move:
+            index += POSITIONS
+        won = table[FILE_HEADER_SIZE + (index >> 3)] >> (index & 7) & 1
+        if not won:
+            return 0
+        return 1 if strong_to_move else -1
+
+
+def main(argv=None):
+    """Command line entry point: python -m src.bitbase [directory]"""
+    parser = argparse.ArgumentParser(description="Generate the KQK, KRK and KPK bitbases.")
+    parser.add_argument("directory", nargs="?", default=DEFAULT_DIRECTORY)
+    args = parser.parse_args(argv)
+    for path in generate_all(args.directory):
+        print(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -58,107 +58,233 @@ def generate_pawn_moves(board, position, player):
 
     return moves
 
-def generate_rook_moves(board, position, player):
+# Compact board: a 64-byte bytearray indexed by row * 8 + col, in the same
+# orientation as the list board (row 0 is Black's back rank). A square holds
+# the piece type in its low three bits, with BLACK set for Black's pieces.
+EMPTY = 0
+PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING = range(1, 7)
+WHITE = 0
+BLACK = 8
+PIECE_CODES = {
+    '.': EMPTY,
+    'P': PAWN, 'N': KNIGHT, 'B': BISHOP, 'R': ROOK, 'Q': QUEEN, 'K': KING,
+    'p': BLACK | PAWN, 'n': BLACK | KNIGHT, 'b': BLACK | BISHOP,
+    'r': BLACK | ROOK, 'q': BLACK | QUEEN, 'k': BLACK | KING,
+}
+PIECE_CHARS = {code: char for char, code in PIECE_CODES.items()}
+
+KNIGHT_STEPS = ((2, 1), (2, -1), (-2, 1), (-2, -1), (1, 2), (1, -2), (-1, 2), (-1, -2))
+KING_STEPS = ((-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1))
+ROOK_DIRECTIONS = ((1, 0), (-1, 0), (0, 1), (0, -1))
+BISHOP_DIRECTIONS = ((1, 1), (1, -1), (-1, 1), (-1, -1))
+
+# (row, col) of every square index
+SQUARE_COORDS = tuple((square >> 3, square & 7) for square in range(64))
+
+
+def _step_targets(steps):
+    """Per square, the squares one step away, in the order of steps."""
+    return tuple(
+        tuple((row + dr) * 8 + col + dc for dr, dc in steps if 0 <= row + dr < 8 and 0 <= col + dc < 8)
+        for row, col in SQUARE_COORDS)
+
+
+def _rays(directions):
+    """Per square, the squares along each direction (nearest first), leaving out empty rays."""
+    table = []
+    for row, col in SQUARE_COORDS:
+        rays = []
+        for dr, dc in directions:
+            ray = []
+            r, c = row + dr, col + dc
+            while 0 <= r < 8 and 0 <= c < 8:
+                ray.append(r * 8 + c)
+                r += dr
+                c += dc
+            if ray:
+                rays.append(tuple(ray))
+        table.append(tuple(rays))
+    return tuple(table)
+
+
+def _pawn_tables(color):
+    """Per square, a pawn's (single push, double push or -1) and its capture targets, left first."""
+    direction = -1 if color == WHITE else 1
+    start_row = 6 if color == WHITE else 1
+    pushes, captures = [], []
+    for row, col in SQUARE_COORDS:
+        r = row + direction
+        if 0 <= r < 8:
+            double = (row + 2 * direction) * 8 + col if row == start_row else -1
+            pushes.append((r * 8 + col, double))
+            captures.append(tuple(r * 8 + c for c in (col - 1, col + 1) if 0 <= c < 8))
+        else:
+            pushes.append((-1, -1))
+            captures.append(())
+    return tuple(pushes), tuple(captures)
+
+
+# Built once at import
+KNIGHT_TARGETS = _step_targets(KNIGHT_STEPS)
+KING_TARGETS = _step_targets(KING_STEPS)
+ROOK_RAYS = _rays(ROOK_DIRECTIONS)
+BISHOP_RAYS = _rays(BISHOP_DIRECTIONS)
+QUEEN_RAYS = tuple(rook + bishop for rook, bishop in zip(ROOK_RAYS, BISHOP_RAYS))
+PAWN_PUSHES = {}
+PAWN_CAPTURES = {}
+for _color in (WHITE, BLACK):
+    PAWN_PUSHES[_color], PAWN_CAPTURES[_color] = _pawn_tables(_color)
+SLIDER_RAYS = {BISHOP: BISHOP_RAYS, ROOK: ROOK_RAYS, QUEEN: QUEEN_RAYS}
+
+
+def to_compact(board):
+    """
+    Converts a list board to a compact board.
+    Args:
+        board (list): The 2D list representing the chess board.
+    Returns:
+        bytearray: 64 piece codes, indexed by row * 8 + col.
+    """
+    codes = PIECE_CODES
+    return bytearray(codes[piece] for row in board for piece in row)
+
+
+def from_compact(squares):
+    """
+    Converts a compact board back to the 2D list format.
+    Args:
+        squares (bytearray): 64 piece codes.
+    Returns:
+        list: A 2D list representing the chess board.
+    """
+    chars = PIECE_CHARS
+    return [[chars[code] for code in squares[row * 8:row * 8 + 8]] for row in range(8)]
+
+
+def generate_compact_moves(squares, player):
+    """
+    Generates the pseudo-legal moves of a compact board, in the same order as
+    generate_pseudo_legal_moves does for the list format.
+    Args:
+        squares (bytearray): 64 piece codes.
+        player (str): "white" or "black".
+    Returns:
+        list: (start_square, end_square) pairs of square indexes.
+    """
+    own = WHITE if player == "white" else BLACK
+    pushes = PAWN_PUSHES[own]
+    pawn_captures = PAWN_CAPTURES[own]
     moves = []
-    row, col = position
-    directions = [(1, 0), (-1, 0), (0, 1), (0, -1)]
-    for dr, dc in directions:
-        r, c = row, col
-        while True:
-            r += dr
-            c += dc
-            if 0 <= r < 8 and 0 <= c < 8:
-                if board[r][c] == '.':
-                    moves.append((r, c))
-                elif (player == "white" and board[r][c].islower()) or (player == "black" and board[r][c].isupper()):
-                    moves.append((r, c))
-                    break
-                else:
+    append = moves.append
+    for square in range(64):
+        code = squares[square]
+        if not code or code & BLACK != own:
+            continue
+        kind = code & 7
+        if kind == PAWN:
+            single, double = pushes[square]
+            if single >= 0 and not squares[single]:
+                append((square, single))
+                if double >= 0 and not squares[double]:
+                    append((square, double))
+            for target in pawn_captures[square]:
+                victim = squares[target]
+                if victim and victim & BLACK != own:
+                    append((square, target))
+        elif kind == KNIGHT or kind == KING:
+            for target in (KNIGHT_TARGETS if kind == KNIGHT else KING_TARGETS)[square]:
+                victim = squares[target]
+                if not victim or victim & BLACK != own:
+                    append((square, target))
+        else:
+            for ray in SLIDER_RAYS[kind][square]:
+                for target in ray:
+                    victim = squares[target]
+                    if not victim:
+                        append((square, target))
+                        continue
+                    if victim & BLACK != own:
+                        append((square, target))
                     break
-            else:
-                break
     return moves
 
-def generate_knight_moves(board, position, player):
+
+def _slider_moves(board, position, player, rays):
+    """Moves of a sliding piece of the list board along precomputed rays."""
     moves = []
-    row, col = position
-    knight_moves = [
-        (2, 1), (2, -1), (-2, 1), (-2, -1),
-        (1, 2), (1, -2), (-1, 2), (-1, -2)
-    ]
-    for dr, dc in knight_moves:
-        r, c = row + dr, col + dc
-        if 0 <= r < 8 and 0 <= c < 8:
-            if board[r][c] == '.' or (player == "white" and board[r][c].islower()) or (player == "black" and board[r][c].isupper()):
+    is_opponent = str.islower if player == "white" else str.isupper
+    coords = SQUARE_COORDS
+    for ray in rays[position[0] * 8 + position[1]]:
+        for square in ray:
+            r, c = coords[square]
+            piece = board[r][c]
+            if piece == '.':
                 moves.append((r, c))
+                continue
+            if is_opponent(piece):
+                moves.append((r, c))
+            break
     return moves
 
-def generate_bishop_moves(board, position, player):
+
+def _step_moves(board, position, player, targets):
+    """Moves of a knight or king of the list board to precomputed target squares."""
     moves = []
-    row, col = position
-    directions = [(1, 1), (1, -1), (-1, 1), (-1, -1)]
-    for dr, dc in directions:
-        r, c = row, col
-        while True:
-            r += dr
-            c += dc
-            if 0 <= r < 8 and 0 <= c < 8:
-                if board[r][c] == '.':
-                    moves.append((r, c))
-                elif (player == "white" and board[r][c].islower()) or (player == "black" and board[r][c].isupper()):
-                    moves.append((r, c))
-                    break
-                else:
-                    break
-            else:
-                break
+    is_opponent = str.islower if player == "white" else str.isupper
+    coords = SQUARE_COORDS
+    for square in targets[position[0] * 8 + position[1]]:
+        r, c = coords[square]
+        piece = board[r][c]
+        if piece == '.' or is_opponent(piece):
+            moves.append((r, c))
     return moves
 
+def generate_rook_moves(board, position, player):
+    return _slider_moves(board, position, player, ROOK_RAYS)
+
+def generate_knight_moves(board, position, player):
+    return _step_moves(board, position, player, KNIGHT_TARGETS)
+
+def generate_bishop_moves(board, position, player):
+    return _slider_moves(board, position, player, BISHOP_RAYS)
+
 def generate_queen_moves(board, position, player):
-    rook_moves_list = generate_rook_moves(board, position, player)
-    bishop_moves_list = generate_bishop_moves(board, position, player)
-    return rook_moves_list + bishop_moves_list
+    return _slider_moves(board, position, player, QUEEN_RAYS)
 
 def generate_king_moves(board, position, player):
-    moves = []
-    row, col = position
-    directions = [
-        (-1, -1), (-1, 0), (-1, 1),
-        (0, -1),          (0, 1),
-        (1, -1),  (1, 0),  (1, 1)
-    ]
-    for dr, dc in directions:
-        r, c = row + dr, col + dc
-        if 0 <= r < 8 and 0 <= c < 8:
-            if board[r][c] == '.' or (player == "white" and board[r][c].islower()) or (player == "black" and board[r][c].isupper()):
-                moves.append((r, c))
-    return moves
+    return _step_moves(board, position, player, KING_TARGETS)
 
-def generate_legal_moves(board, player):
-    moves = []
-    for row in range(8):
-        for col in range(8):
-            piece = board[row][col]
-            if (player == "white" and piece.isupper()) or (player == "black" and piece.islower()):
-                position = (row, col)
-                if piece.lower() == 'p':
-                    piece_moves = generate_pawn_moves(board, position, player)
-                elif piece.lower() == 'r':
-                    piece_moves = generate_rook_moves(board, position, player)
-                elif piece.lower() == 'n':
-                    piece_moves = generate_knight_moves(board, position, player)
-                elif piece.lower() == 'b':
-                    piece_moves = generate_bishop_moves(board, position, player)
-                elif piece.lower() == 'q':
-                    piece_moves = generate_queen_moves(board, position, player)
-                elif piece.lower() == 'k':
-                    piece_moves = generate_king_moves(board, position, player)
-                else:
-                    piece_moves = []
+def generate_pseudo_legal_moves(board, player):
+    """
+    Generates the moves of a player on a list board, through the compact board,
+    without testing whether they leave the king in check.
+    Args:
+        board (list): The 2D list representing the chess board.
+        player (str): "white" or "black".
+    Returns:
+        list: ((start_row, start_col), (end_row, end_col)) pairs.
+    """
+    coords = SQUARE_COORDS
+    return [(coords[start], coords[end]) for start, end in generate_compact_moves(to_compact(board), player)]
 
-                for move in piece_moves:
-                    moves.append((position, move))
-    return moves
+def generate_legal_moves(board, player):
+    """
+    Generates the legal moves of a player on a list board: the moves of
+    generate_pseudo_legal_moves that Position.legal_moves allows, so pinned
+    pieces stay on their line and a king in check must be saved. The list
+    format has no castling rights or en passant square, so those moves are
+    not generated, and a promotion is a single move.
+    Args:
+        board (list): The 2D list representing the chess board.
+        player (str): "white" or "black".
+    Returns:
+        list: ((start_row, start_col), (end_row, end_col)) pairs.
+    """
+    position = Position.from_board(board, player)
+    legal = {(start, end) for start, end, _ in position.legal_moves()}
+    coords = SQUARE_COORDS
+    return [(coords[start], coords[end]) for start, end in generate_compact_moves(position.squares, player)
+            if (start, end) in legal]
 
 def make_move(board, start_pos, end_pos):
     start_row, start_col = start_pos
@@ -168,83 +294,420 @@ def make_move(board, start_pos, end_pos):
     return board
 
 #----------------------------------------------------------------
-def is_move_legal(board, move, player_color):
+# Full rules on the compact board: castling, en passant, promotion and check.
+
+# Castling rights
+WHITE_KINGSIDE, WHITE_QUEENSIDE, BLACK_KINGSIDE, BLACK_QUEENSIDE = 1, 2, 4, 8
+CASTLING_CHARS = ((WHITE_KINGSIDE, 'K'), (WHITE_QUEENSIDE, 'Q'), (BLACK_KINGSIDE, 'k'), (BLACK_QUEENSIDE, 'q'))
+# Rights kept when a move starts or ends on a square (a rook or king moving or being captured)
+CASTLING_MASKS = [15] * 64
+CASTLING_MASKS[56] &= ~WHITE_QUEENSIDE
+CASTLING_MASKS[63] &= ~WHITE_KINGSIDE
+CASTLING_MASKS[60] &= ~(WHITE_KINGSIDE | WHITE_QUEENSIDE)
+CASTLING_MASKS[0] &= ~BLACK_QUEENSIDE
+CASTLING_MASKS[7] &= ~BLACK_KINGSIDE
+CASTLING_MASKS[4] &= ~(BLACK_KINGSIDE | BLACK_QUEENSIDE)
+# (right, king square, king target, squares that must be empty, squares the king crosses)
+CASTLING_MOVES = {
+    WHITE: ((WHITE_KINGSIDE, 60, 62, (61, 62), (61, 62)),
+            (WHITE_QUEENSIDE, 60, 58, (59, 58, 57), (59, 58))),
+    BLACK: ((BLACK_KINGSIDE, 4, 6, (5, 6), (5, 6)),
+            (BLACK_QUEENSIDE, 4, 2, (3, 2, 1), (3, 2))),
+}
+PROMOTIONS = (QUEEN, ROOK, BISHOP, KNIGHT)
+_FILES = "abcdefgh"
+
+
+def square_name(square):
+    """Algebraic name of a square index, e.g. 52 -> "e2"."""
+    return _FILES[square & 7] + str(8 - (square >> 3))
+
+
+def parse_square(name):
+    """Square index of an algebraic name, e.g. "e2" -> 52."""
+    return (8 - int(name[1])) * 8 + _FILES.index(name[0])
+
+
+class Position:
     """
-    Check if a given move is legal according to chess rules.
-    This placeholder just demonstrates where you'd implement logic for:
-    - Piece movement rules
-    - Checks and checkmates
-    - Castling conditions
-    - En passant
-    - Pawn promotion
+    A position with the full rules on the compact board: side to move,
+    castling rights, en passant square and move clocks.
+
+    Moves are (start_square, end_square, promotion) tuples, promotion being
+    a piece type or 0. make_move changes the position in place and pushes
+    what it needs to restore on an undo stack, so unmake_move takes it back
+    without any copying; a tree of any depth can be walked on one Position.
+
+    Legal moves are found without trying them: the checkers of the king and
+    the pieces pinned to it are computed once per position, and moves are
+    filtered against them. Only en passant captures, which can uncover a
+    check along the rank, are verified by making them.
     """
 
-    start_pos, end_pos = move
+    def __init__(self, squares=None, turn=WHITE, castling=0, ep_square=-1, halfmove_clock=0,
+                 fullmove_number=1):
+        """
+        Args:
+            squares (bytearray): 64 piece codes (the starting position if None).
+            turn (int): WHITE or BLACK.
+            castling (int): Castling rights, a combination of WHITE_KINGSIDE ... BLACK_QUEENSIDE.
+            ep_square (int): Square behind a pawn that just advanced two squares, or -1.
+            halfmove_clock (int): Half-moves since the last capture or pawn move.
+            fullmove_number (int): Number of the current move.
+        """
+        if squares is None:
+            squares = to_compact(generate_initial_board())
+            castling = WHITE_KINGSIDE | WHITE_QUEENSIDE | BLACK_KINGSIDE | BLACK_QUEENSIDE
+        self.squares = bytearray(squares)
+        self.turn = turn
+        self.castling = castling
+        self.ep_square = ep_square
+        self.halfmove_clock = halfmove_clock
+        self.fullmove_number = fullmove_number
+        # King squares, indexed by color >> 3
+        self.kings = [self.squares.find(KING), self.squares.find(BLACK | KING)]
+        self._undo = []
 
-    if start_pos == end_pos:
-        return False
+    @classmethod
+    def from_fen(cls, fen):
+        """Create a position from a FEN string."""
+        fields = fen.split()
+        squares = bytearray()
+        for rank in fields[0].split("/"):
+            for char in rank:
+                if char.isdigit():
+                    squares.extend(bytes(int(char)))
+                else:
+                    squares.append(PIECE_CODES[char])
+        if len(squares) != 64:
+            raise ValueError("Invalid FEN placement: %s" % fields[0])
+        turn = BLACK if len(fields) > 1 and fields[1] == "b" else WHITE
+        castling = 0
+        if len(fields) > 2:
+            for right, char in CASTLING_CHARS:
+                if char in fields[2]:
+                    castling |= right
+        ep_square = parse_square(fields[3]) if len(fields) > 3 and fields[3] != "-" else -1
+        halfmove_clock = int(fields[4]) if len(fields) > 4 else 0
+        fullmove_number = int(fields[5]) if len(fields) > 5 else 1
+        return cls(squares, turn, castling, ep_square, halfmove_clock, fullmove_number)
+
+    @classmethod
+    def from_board(cls, board, player):
+        """
+        Create a position from a list board. The list format has no castling
+        rights or en passant square, so the position has none either.
+        """
+        return cls(to_compact(board), WHITE if player == "white" else BLACK)
 
-    piece = board.get(start_pos, '.')
-    if piece == '.' or not _piece_color_matches(piece, player_color):
-        # No piece of the current player at start_pos
+    def to_board(self):
+        """The position's pieces as a list board."""
+        return from_compact(self.squares)
+
+    def fen(self):
+        """The position as a FEN string."""
+        ranks = []
+        for row in range(8):
+            rank = ""
+            empty = 0
+            for code in self.squares[row * 8:row * 8 + 8]:
+                if code:
+                    if empty:
+                        rank += str(empty)
+                        empty = 0
+                    rank += PIECE_CHARS[code]
+                else:
+                    empty += 1
+            if empty:
+                rank += str(empty)
+            ranks.append(rank)
+        castling = "".join(char for right, char in CASTLING_CHARS if self.castling & right) or "-"
+        ep = square_name(self.ep_square) if self.ep_square >= 0 else "-"
+        return "%s %s %s %s %d %d" % ("/".join(ranks), "b" if self.turn else "w", castling, ep,
+                                      self.halfmove_clock, self.fullmove_number)
+
+    def is_attacked(self, square, by):
+        """True if a piece of color by attacks square."""
+        squares = self.squares
+        pawn = by | PAWN
+        # A pawn of color by attacks square from where a pawn of the other color would capture
+        for origin in PAWN_CAPTURES[by ^ BLACK][square]:
+            if squares[origin] == pawn:
+                return True
+        knight = by | KNIGHT
+        for origin in KNIGHT_TARGETS[square]:
+            if squares[origin] == knight:
+                return True
+        king = by | KING
+        for origin in KING_TARGETS[square]:
+            if squares[origin] == king:
+                return True
+        rook, bishop, queen = by | ROOK, by | BISHOP, by | QUEEN
+        for ray in ROOK_RAYS[square]:
+            for origin in ray:
+                code = squares[origin]
+                if code:
+                    if code == rook or code == queen:
+                        return True
+                    break
+        for ray in BISHOP_RAYS[square]:
+            for origin in ray:
+                code = squares[origin]
+                if code:
+                    if code == bishop or code == queen:
+                        return True
+                    break
         return False
 
-    # Placeholder logic:
-    # Here you would call functions to verify:
-    # - The piece can move in that pattern
-    # - The path is not blocked (for sliding pieces)
-    # - The king is not left in check after the move
-    # - Special moves like castling, en passant, promotion, etc.
+    def in_check(self):
+        """True if the side to move is in check."""
+        return self.is_attacked(self.kings[self.turn >> 3], self.turn ^ BLACK)
 
-    # For now, return True as a placeholder if start!=end and piece belongs to player
-    return True
+    def _checks_and_pins(self):
+        """
+        Checkers and pins of the side to move's king.
 
-def apply_move(board, move, player_color):
-    """
-    Update the board state according to the given move.
-    Implement logic for:
-    - Regular moves
-    - Captures
-    - Castling: move both king and rook
-    - En passant: remove captured pawn
-    - Pawn promotion: replace pawn with chosen piece
-    """
+        Returns:
+            (list, dict): The squares of the checking pieces (each with the
+            squares between it and the king, which a blocker may move to), and
+            the pinned pieces' squares, each with the squares it may move to
+            (along the pin ray, up to and including the pinning piece).
+        """
+        squares = self.squares
+        us = self.turn
+        them = us ^ BLACK
+        king = self.kings[us >> 3]
+        checks = []
+        pins = {}
+        for origin in PAWN_CAPTURES[us][king]:
+            if squares[origin] == them | PAWN:
+                checks.append((origin,))
+        for origin in KNIGHT_TARGETS[king]:
+            if squares[origin] == them | KNIGHT:
+                checks.append((origin,))
+        for rays, slider in ((ROOK_RAYS, them | ROOK), (BISHOP_RAYS, them | BISHOP)):
+            for ray in rays[king]:
+                pinned = -1
+                for index, square in enumerate(ray):
+                    code = squares[square]
+                    if not code:
+                        continue
+                    if code & BLACK == us:
+                        if pinned >= 0:
+                            break
+                        pinned = square
+                        continue
+                    if code == slider or code == them | QUEEN:
+                        line = ray[:index + 1]
+                        if pinned >= 0:
+                            pins[pinned] = line
+                        else:
+                            checks.append(line)
+                    break
+        return checks, pins
 
-    start_pos, end_pos = move
-    piece = board.get(start_pos, '.')
-    board[start_pos] = '.'
+    def _king_moves(self, king, us, moves):
+        """Append the legal king moves (including castling)."""
+        squares = self.squares
+        them = us ^ BLACK
+        # The king must not hide from a slider behind its own square
+        squares[king] = EMPTY
+        for target in KING_TARGETS[king]:
+            code = squares[target]
+            if (not code or code & BLACK != us) and not self.is_attacked(target, them):
+                moves.append((king, target, 0))
+        squares[king] = us | KING
+        if self.castling and not self.is_attacked(king, them):
+            for right, start, end, between, crossed in CASTLING_MOVES[us]:
+                rook = start + 3 if end > start else start - 4
+                if (self.castling & right and start == king and squares[rook] == us | ROOK
+                        and not any(squares[square] for square in between)
+                        and not any(self.is_attacked(square, them) for square in crossed)):
+                    moves.append((king, end, 0))
 
-    # Placeholder: Check if this is a promotion (just a naive check)
-    if piece.upper() == 'P' and (end_pos[1] == '8' and player_color == 'white'):
-        # Promote to a queen by default
-        board[end_pos] = 'Q'
-    elif piece.upper() == 'P' and (end_pos[1] == '1' and player_color == 'black'):
-        # Promote to a queen by default for black
-        board[end_pos] = 'q'
-    else:
-        board[end_pos] = piece
+    def legal_moves(self):
+        """
+        Generate the legal moves of the side to move.
 
-    # For castling (as an example):
-    # If the move is king side castling (e1 -> g1) for white:
-    # you'd also move the rook from h1 to f1.
-    # Similar logic for black and queen side castling.
+        Returns:
+            list: (start_square, end_square, promotion) tuples.
+        """
+        squares = self.squares
+        us = self.turn
+        them = us ^ BLACK
+        king = self.kings[us >> 3]
+        moves = []
+        self._king_moves(king, us, moves)
+        checks, pins = self._checks_and_pins()
+        if len(checks) > 1:
+            # Double check: only the king can move
+            return moves
+        # In check, other pieces must capture the checker or block
+        allowed = set(checks[0]) if checks else None
 
-    # For en passant:
-    # If a pawn moves diagonally into an empty square (e.g., e5), remove the captured pawn behind it.
+        pushes = PAWN_PUSHES[us]
+        pawn_captures = PAWN_CAPTURES[us]
+        last_row = 0 if us == WHITE else 7
+        candidates = []
+        add = candidates.append
+        for square in range(64):
+            code = squares[square]
+            if not code or code & BLACK != us:
+                continue
+            kind = code & 7
+            if kind == PAWN:
+                single, double = pushes[square]
+                if single >= 0 and not squares[single]:
+                    add((square, single))
+                    if double >= 0 and not squares[double]:
+                        add((square, double))
+                for target in pawn_captures[square]:
+                    victim = squares[target]
+                    if (victim and victim & BLACK != us) or target == self.ep_square:
+                        add((square, target))
+            elif kind == KNIGHT:
+                for target in KNIGHT_TARGETS[square]:
+                    victim = squares[target]
+                    if not victim or victim & BLACK != us:
+                        add((square, target))
+            elif kind != KING:
+                for ray in SLIDER_RAYS[kind][square]:
+                    for target in ray:
+                        victim = squares[target]
+                        if not victim:
+                            add((square, target))
+                            continue
+                        if victim & BLACK != us:
+                            add((square, target))
+                        break
 
-    return board
+        for start, end in candidates:
+            pawn = squares[start] & 7 == PAWN
+            if pawn and end == self.ep_square:
+                # The captured pawn leaves its rank too: verify by making the move
+                move = (start, end, 0)
+                self.make_move(move)
+                legal = not self.is_attacked(king, them)
+                self.unmake_move()
+                if legal:
+                    moves.append(move)
+                continue
+            if allowed is not None and end not in allowed:
+                continue
+            if start in pins and end not in pins[start]:
+                continue
+            if pawn and end >> 3 == last_row:
+                for promotion in PROMOTIONS:
+                    moves.append((start, end, promotion))
+            else:
+                moves.append((start, end, 0))
+        return moves
+
+    def make_move(self, move):
+        """Make a legal move, remembering how to take it back with unmake_move."""
+        start, end, promotion = move
+        squares = self.squares
+        us = self.turn
+        piece = squares[start]
+        kind = piece & 7
+        captured_square = end
+        if kind == PAWN and end == self.ep_square:
+            captured_square = end + 8 if us == WHITE else end - 8
+        captured = squares[captured_square]
+        self._undo.append((move, captured, captured_square, self.castling, self.ep_square,
+                           self.halfmove_clock))
+
+        squares[captured_square] = EMPTY
+        squares[end] = us | promotion if promotion else piece
+        squares[start] = EMPTY
+        if kind == KING:
+            self.kings[us >> 3] = end
+            if end - start == 2:
+                squares[start + 1] = squares[start + 3]
+                squares[start + 3] = EMPTY
+            elif start - end == 2:
+                squares[start - 1] = squares[start - 4]
+                squares[start - 4] = EMPTY
+        self.castling &= CASTLING_MASKS[start] & CASTLING_MASKS[end]
+        self.ep_square = (start + end) >> 1 if kind == PAWN and abs(end - start) == 16 else -1
+        self.halfmove_clock = 0 if kind == PAWN or captured else self.halfmove_clock + 1
+        if us == BLACK:
+            self.fullmove_number += 1
+        self.turn = us ^ BLACK
+
+    def unmake_move(self):
+        """Take back the last move made with make_move."""
+        move, captured, captured_square, self.castling, self.ep_square, self.halfmove_clock = self._undo.pop()
+        start, end, promotion = move
+        squares = self.squares
+        us = self.turn ^ BLACK
+        self.turn = us
+        if us == BLACK:
+            self.fullmove_number -= 1
+        piece = us | PAWN if promotion else squares[end]
+        squares[start] = piece
+        squares[end] = EMPTY
+        squares[captured_square] = captured
+        if piece & 7 == KING:
+            self.kings[us >> 3] = start
+            if end - start == 2:
+                squares[start + 3] = squares[start + 1]
+                squares[start + 1] = EMPTY
+            elif start - end == 2:
+                squares[start - 4] = squares[start - 1]
+                squares[start - 1] = EMPTY
 
-def _piece_color_matches(piece, color):
+    def perft(self, depth):
+        """Count the leaf nodes of the legal move tree of the given depth."""
+        if depth == 0:
+            return 1
+        moves = self.legal_moves()
+        if depth == 1:
+            return len(moves)
+        nodes = 0
+        for move in moves:
+            self.make_move(move)
+            nodes += self.perft(depth - 1)
+            self.unmake_move()
+        return nodes
+
+
+def is_move_legal(board, move, player_color):
+    """
+    Check if a move is legal on a list board, including check rules.
+    The list format has no castling rights or en passant square, so those
+    moves are never legal through it; use Position for the complete rules.
+    Args:
+        board (list): The 2D list representing the chess board.
+        move (tuple): ((start_row, start_col), (end_row, end_col)).
+        player_color (str): "white" or "black".
+    Returns:
+        bool: True if the move is legal.
     """
-    Return True if piece matches the color:
-    - White pieces: Uppercase
-    - Black pieces: Lowercase
+    (start_row, start_col), (end_row, end_col) = move
+    start, end = start_row * 8 + start_col, end_row * 8 + end_col
+    return any(legal[0] == start and legal[1] == end
+               for legal in Position.from_board(board, player_color).legal_moves())
+
+def apply_move(board, move, player_color):
     """
-    if color == 'white' and piece.isupper():
-        return True
-    if color == 'black' and piece.islower():
-        return True
-    return False
+    Update a list board with a move, promoting pawns to queens.
+    Args:
+        board (list): The 2D list representing the chess board.
+        move (tuple): ((start_row, start_col), (end_row, end_col)).
+        player_color (str): "white" or "black".
+    Returns:
+        list: The updated board.
+    """
+    (start_row, start_col), (end_row, end_col) = move
+    piece = board[start_row][start_col]
+    board[start_row][start_col] = '.'
+    if piece == 'P' and end_row == 0 and player_color == 'white':
+        piece = 'Q'
+    elif piece == 'p' and end_row == 7 and player_color == 'black':
+        piece = 'q'
+    board[end_row][end_col] = piece
+    return board
 #----------------------------------------------------------------
 
 
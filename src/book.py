@@ -0,0 +1,159 @@
+import mmap
+import os
+import random
+import struct
+import chess
+from src.transposition import zobrist_key
+
+# A Polyglot entry: key, move, weight, learn (big-endian, sorted by key)
+_ENTRY = struct.Struct(">QHHI")
+ENTRY_SIZE = 16
+
+
+def decode_polyglot_move(board: chess.Board, code: int):
+    """
+    Convert a Polyglot move to a chess.Move for the given position.
+
+    Polyglot packs to | from << 6 | promotion << 12 (1 = knight ... 4 = queen)
+    and writes castling as the king capturing its own rook.
+    """
+    to_square = code & 63
+    from_square = (code >> 6) & 63
+    promotion = (code >> 12) & 7
+    if (from_square == board.king(board.turn) and board.rooks & board.occupied_co[board.turn]
+            & chess.BB_SQUARES[to_square]):
+        file = 6 if to_square > from_square else 2
+        to_square = chess.square(file, chess.square_rank(from_square))
+    return chess.Move(from_square, to_square, promotion + 1 if promotion else None)
+
+
+def encode_polyglot_move(board: chess.Board, move: chess.Move):
+    """Inverse of decode_polyglot_move."""
+    to_square = move.to_square
+    if board.is_castling(move):
+        file = 7 if to_square > move.from_square else 0
+        to_square = chess.square(file, chess.square_rank(move.from_square))
+    promotion = move.promotion - 1 if move.promotion else 0
+    return to_square | (move.from_square << 6) | (promotion << 12)
+
+
+def write_book(path: str, entries, presorted=False):
+    """
+    Write a Polyglot book.
+
+    Args:
+        path (str): The file to write.
+        entries (iterable): (key, move_code, weight, learn) tuples.
+        presorted (bool): If True the entries are already sorted by key and are
+            written as they come, without holding them in memory.
+
+    Returns:
+        int: The number of entries written.
+    """
+    if not presorted:
+        entries = sorted(entries)
+    count = 0
+    with open(path, "wb") as f:
+        for entry in entries:
+            f.write(_ENTRY.pack(*entry))
+            count += 1
+    return count
+
+
+class OpeningBook:
+    """
+    A Polyglot opening book (.bin) probed through mmap.
+
+    The file is never read as a whole: a probe binary-searches the sorted
+    16-byte entries for the position's Zobrist key, so only the few pages it
+    touches are loaded, and the book can be shared by every process on the
+    machine through the page cache.
+    """
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path (str): The Polyglot book file.
+        """
+        self.path = path
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size % ENTRY_SIZE:
+                raise ValueError("%s is not a Polyglot book." % path)
+            # An empty file cannot be mapped, but is a valid (empty) book
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+        self.num_entries = size // ENTRY_SIZE
+
+    def close(self):
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return self.num_entries
+
+    def _first_index(self, key: int):
+        """Index of the first entry whose key is not below key."""
+        low, high = 0, self.num_entries
+        unpack_from = _ENTRY.unpack_from
+        while low < high:
+            middle = (low + high) // 2
+            if unpack_from(self._mmap, middle * ENTRY_SIZE)[0] < key:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def find_all(self, board: chess.Board):
+        """
+        All book moves for the position.
+
+        Returns:
+            list: (move, weight) pairs of legal moves, in file order.
+        """
+        key = zobrist_key(board)
+        entries = []
+        index = self._first_index(key)
+        while index < self.num_entries:
+            entry_key, code, weight, _ = _ENTRY.unpack_from(self._mmap, index * ENTRY_SIZE)
+            if entry_key != key:
+                break
+            move = decode_polyglot_move(board, code)
+            if board.is_legal(move):
+                entries.append((move, weight))
+            index += 1
+        return entries
+
+    def choose_move(self, board: chess.Board, mode="weighted", rng=None):
+        """
+        Pick a book move.
+
+        Args:
+            board (chess.Board): The position.
+            mode (str): "weighted" picks at random in proportion to the weights,
+                "best" always picks the heaviest move.
+            rng (random.Random): Random source for "weighted" (the module's by default).
+
+        Returns:
+            chess.Move or None: The move, or None if the position is not in the book.
+        """
+        entries = [(move, weight) for move, weight in self.find_all(board) if weight > 0]
+        if not entries:
+            return None
+        if mode == "best":
+            return max(entries, key=lambda entry: entry[1])[0]
+        if mode != "weighted":
+            raise ValueError("Unknown book mode: %s" % mode)
+        rng = rng or random
+        choice = rng.randrange(sum(weight for _, weight in entries))
+        for move, weight in entries:
+            choice -= weight
+            if choice < 0:
+                return move
+        return entries[-1][0]
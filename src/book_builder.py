@@ -0,0 +1,240 @@
+import argparse
+import heapq
+import io
+import itertools
+import multiprocessing
+import os
+import struct
+import tempfile
+import chess
+import chess.pgn
+from src.book import write_book, encode_polyglot_move
+from src.transposition import zobrist_key, push_with_key
+
+# Sorted run files: key, Polyglot move, games, score (2 per win, 1 per draw)
+_RUN_RECORD = struct.Struct("<QHII")
+_RUN_CHUNK_RECORDS = 4096
+_MAX_WEIGHT = 0xFFFF
+_RESULT_SCORES = {"1-0": (2, 0), "0-1": (0, 2), "1/2-1/2": (1, 1)}
+
+
+class _BookVisitor(chess.pgn.BaseVisitor):
+    """
+    Collects the (position key, move) pairs of a game's first max_ply mainline
+    moves. Variations and the moves after max_ply are skipped without being
+    parsed, which is where most of the time of a full read_game would go.
+    """
+
+    def __init__(self, max_ply: int):
+        self.max_ply = max_ply
+        self.moves = []
+        self.result_header = "*"
+        self._key = None
+
+    def visit_header(self, tagname, tagvalue):
+        if tagname == "Result":
+            self.result_header = tagvalue
+
+    def begin_variation(self):
+        return chess.pgn.SKIP
+
+    def begin_parse_san(self, board, san):
+        if len(self.moves) >= self.max_ply:
+            return chess.pgn.SKIP
+
+    def visit_move(self, board, move):
+        if self._key is None:
+            self._key = zobrist_key(board)
+        self.moves.append((self._key, encode_polyglot_move(board, move), board.turn))
+        # read_game makes the move itself; only the key update is wanted here
+        self._key = push_with_key(board, move, self._key)
+        board.pop()
+
+    def handle_error(self, error):
+        # The game is used up to the first illegal or unreadable move
+        self.max_ply = len(self.moves)
+
+    def result(self):
+        return self.result_header, self.moves
+
+
+def _game_texts(path: str, start: int, end: int):
+    """
+    Yield the text of each game whose "[Event" tag starts in the byte range
+    [start, end) of a PGN file, reading line by line.
+    """
+    with open(path, "rb") as f:
+        if start > 0:
+            # Finish the line that straddles the shard boundary
+            f.seek(start - 1)
+            f.readline()
+        offset = f.tell()
+        lines = None
+        for line in f:
+            if line.startswith(b"[Event "):
+                if lines:
+                    yield b"".join(lines).decode("utf-8", errors="replace")
+                if offset >= end:
+                    return
+                lines = [line]
+            elif lines is not None:
+                lines.append(line)
+            offset += len(line)
+        if lines:
+            yield b"".join(lines).decode("utf-8", errors="replace")
+
+
+def _write_run(counts, directory: str):
+    """Write aggregated counts, sorted by key and move, to a new run file."""
+    handle, path = tempfile.mkstemp(suffix=".run", dir=directory)
+    with os.fdopen(handle, "wb") as f:
+        pack = _RUN_RECORD.pack
+        f.write(b"".join(pack(key, move, games, score)
+                         for (key, move), (games, score) in sorted(counts.items())))
+    return path
+
+
+def _build_shard(job):
+    """
+    Worker: aggregate one byte range of the PGN file into sorted run files,
+    spilling to disk whenever max_entries distinct (key, move) pairs are held.
+
+    Returns:
+        (list, int): The run files and the number of games used.
+    """
+    path, start, end, max_ply, max_entries, directory = job
+    counts = {}
+    runs = []
+    games = 0
+    for text in _game_texts(path, start, end):
+        result, moves = chess.pgn.read_game(io.StringIO(text), Visitor=lambda: _BookVisitor(max_ply))
+        scores = _RESULT_SCORES.get(result)
+        if scores is None or not moves:
+            continue
+        games += 1
+        for key, move, turn in moves:
+            entry = counts.get((key, move))
+            score = scores[0] if turn == chess.WHITE else scores[1]
+            if entry is None:
+                counts[(key, move)] = [1, score]
+            else:
+                entry[0] += 1
+                entry[1] += score
+        if len(counts) >= max_entries:
+            runs.append(_write_run(counts, directory))
+            counts = {}
+    if counts:
+        runs.append(_write_run(counts, directory))
+    return runs, games
+
+
+def _read_run(path: str):
+    """Yield the records of a run file, reading it in chunks."""
+    chunk_size = _RUN_CHUNK_RECORDS * _RUN_RECORD.size
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                return
+            yield from _RUN_RECORD.iter_unpack(chunk)
+
+
+def _summed_records(runs):
+    """Merge sorted run files into one sorted stream, summing the counts of equal (key, move) pairs."""
+    merged = heapq.merge(*(_read_run(path) for path in runs))
+    for (key, move), records in itertools.groupby(merged, key=lambda record: record[:2]):
+        games = score = 0
+        for _, _, record_games, record_score in records:
+            games += record_games
+            score += record_score
+        yield key, move, games, score
+
+
+def _book_entries(runs, min_games: int):
+    """
+    Yield the Polyglot entries of the merged runs, in key order. Each position's
+    weights are its moves' scores, scaled down together if the largest does
+    not fit in 16 bits.
+    """
+    for key, records in itertools.groupby(_summed_records(runs), key=lambda record: record[0]):
+        kept = [(move, score) for _, move, games, score in records if games >= min_games]
+        if not kept:
+            continue
+        largest = max(score for _, score in kept)
+        scale = _MAX_WEIGHT / largest if largest > _MAX_WEIGHT else 1
+        for move, score in kept:
+            yield key, move, int(score * scale), 0
+
+
+def _shards(path: str, chunk_mb: float):
+    """Split a file into byte ranges of about chunk_mb megabytes."""
+    size = os.path.getsize(path)
+    chunk = max(1, int(chunk_mb * 1024 * 1024))
+    return [(start, min(start + chunk, size)) for start in range(0, size, chunk)] or [(0, 0)]
+
+
+def build_book(pgn_path: str, book_path: str, processes=None, max_ply=24, min_games=1,
+               chunk_mb=64.0, max_entries=1_000_000, temp_dir=None):
+    """
+    Build a Polyglot opening book from a PGN file.
+
+    The file is cut into chunks of chunk_mb that a process pool reads in
+    parallel, each game going to the chunk its "[Event" tag starts in. Workers
+    spill sorted (key, move) counts to temporary run files, which are merged
+    into the book with a streaming k-way merge, so memory stays bounded by
+    max_entries per worker regardless of the size of the archive.
+
+    Args:
+        pgn_path (str): The games.
+        book_path (str): The Polyglot .bin file to write.
+        processes (int): Worker processes (the number of CPUs if None).
+        max_ply (int): Only the first max_ply moves of each game go into the book.
+        min_games (int): Moves played in fewer games are left out.
+        chunk_mb (float): Size of the pieces of the PGN file given to the workers.
+        max_entries (int): Distinct (position, move) pairs a worker holds before spilling to disk.
+        temp_dir (str): Directory for the run files (the system default if None).
+
+    Returns:
+        dict: "games" used, "entries" written and "runs" merged.
+    """
+    with tempfile.TemporaryDirectory(dir=temp_dir) as directory:
+        jobs = [(pgn_path, start, end, max_ply, max_entries, directory)
+                for start, end in _shards(pgn_path, chunk_mb)]
+        runs = []
+        games = 0
+        pool = multiprocessing.Pool(processes) if processes != 1 and len(jobs) > 1 else None
+        try:
+            results = pool.imap_unordered(_build_shard, jobs) if pool else map(_build_shard, jobs)
+            for shard_runs, shard_games in results:
+                runs.extend(shard_runs)
+                games += shard_games
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+
+        entries = write_book(book_path, _book_entries(runs, min_games), presorted=True)
+    return {"games": games, "entries": entries, "runs": len(runs)}
+
+
+def main(argv=None):
+    """Command line entry point: python -m src.book_builder games.pgn book.bin"""
+    parser = argparse.ArgumentParser(description="Build a Polyglot opening book from a PGN file.")
+    parser.add_argument("pgn")
+    parser.add_argument("book")
+    parser.add_argument("--processes", type=int, default=None, help="Worker processes (default: all CPUs).")
+    parser.add_argument("--max-ply", type=int, default=24, help="Book depth in half-moves.")
+    parser.add_argument("--min-games", type=int, default=1, help="Leave out moves played in fewer games.")
+    parser.add_argument("--chunk-mb", type=float, default=64.0, help="Size of the pieces of the PGN given to workers.")
+    parser.add_argument("--max-entries", type=int, default=1_000_000,
+                        help="Entries a worker keeps in memory before spilling to disk.")
+    parser.add_argument("--temp-dir", default=None, help="Directory for temporary run files.")
+    args = parser.parse_args(argv)
+
+    stats = build_book(args.pgn, args.book, args.processes, args.max_ply, args.min_games,
+                       args.chunk_mb, args.max_entries, args.temp_dir)
+    print("%s: %d entries from %d games" % (args.book, stats["entries"], stats["games"]))
+
+
+if __name__ == "__main__":
+    main()
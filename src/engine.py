@@ -1,6 +1,15 @@
 import chess
 import math
+import threading
 import time
+import numpy as np
+from src.transposition import (
+    TranspositionTable, zobrist_key, push_with_key, EXACT, LOWERBOUND, UPPERBOUND
+)
+from src.move_ordering import MoveOrderer
+from src.time_manager import TimeManager
+from src.instrumentation import SearchInstrumentation
+from src.evaluation import PIECE_VALUES, CENTER_SQUARES, EvaluationCache, pack_boards, evaluate_bitboards
 
 class Engine:
     """
@@ -9,31 +18,139 @@ class Engine:
     It also tries to detect tactical motifs like forks, pins, and skewers to prioritize moves.
     """
 
-    def __init__(self, color_is_white=True):
+    # Margin (in pawns) for delta pruning in the quiescence search
+    DELTA_MARGIN = 2.0
+    # Width of the null window used by principal variation search
+    NULL_WINDOW = 0.01
+    # Initial half-width of the aspiration window, and the width beyond which it is dropped
+    ASPIRATION_WINDOW = 0.5
+    MAX_ASPIRATION_WINDOW = 8.0
+    MAX_PLY = 128
+    # Score of being mated at the root; the search scores mate in n plies as MATE_SCORE - n,
+    # so any score beyond MATE_BOUND is a mate and says how far away it is
+    MATE_SCORE = 9999
+    MATE_BOUND = MATE_SCORE - MAX_PLY
+    # Bound flags as seen from the other side
+    _FLIPPED_BOUNDS = {EXACT: EXACT, LOWERBOUND: UPPERBOUND, UPPERBOUND: LOWERBOUND}
+    # Score of a position the bitbases say is won, below any mate score
+    BITBASE_WIN_SCORE = 100.0
+    # Entries in the evaluation hash and the pawn hash
+    EVAL_CACHE_SIZE = 1 << 16
+    PAWN_HASH_SIZE = 1 << 14
+    # Selective search: futility and razoring margins by remaining depth
+    FUTILITY_MARGINS = (0.0, 1.5, 3.5)
+    RAZOR_MARGINS = (0.0, 3.0, 5.0)
+
+    def __init__(self, color_is_white=True, hash_mb=16, quiescence_checks=False,
+                 null_move=True, late_move_reductions=True, futility_pruning=True, razoring=True,
+                 threads=1, transposition_table=None, evaluator=None, bitbases=None, instrument=False,
+                 profile=False):
         """
         Initialize the engine.
 
         Args:
             color_is_white (bool): True if engine plays as White, False if Black.
+            hash_mb (float): Size of the transposition table in megabytes.
+            quiescence_checks (bool): Also search quiet checking moves at the
+                first ply of the quiescence search.
+            null_move (bool): Enable null-move pruning.
+            late_move_reductions (bool): Search late quiet moves at reduced depth.
+            futility_pruning (bool): Skip quiet moves at frontier nodes whose
+                static evaluation is far outside the window.
+            razoring (bool): Drop straight into quiescence at frontier nodes
+                whose static evaluation is far below the window.
+            threads (int): Number of search processes. With more than one, helper
+                processes search the same root (Lazy SMP) and share the
+                transposition table through shared memory.
+            transposition_table (TranspositionTable): Use this table instead of
+                creating one of hash_mb megabytes, e.g. one mapped from a file with
+                TranspositionTable.load for a warm start.
+            evaluator (BitboardEvaluator): Evaluator to use instead of the built-in
+                material, centre, king safety and pawn structure terms. Its piece
+                values and centre bonus are adopted for incremental updates.
+            bitbases (Bitbases): Endgame bitbases probed below the root, which end
+                the search in KQK, KRK and KPK positions with their exact result.
+            instrument (bool): Count TT cutoffs, cutoffs by move index and
+                iterations, and time move generation, ordering and evaluation
+                (see SearchInstrumentation). Off, the search is not slowed down.
+            profile (bool): Also run every search under cProfile (implies instrument).
         """
         self.color_is_white = color_is_white
-        self.piece_values = {
-            chess.PAWN: 1,
-            chess.KNIGHT: 3,
-            chess.BISHOP: 3.25,
-            chess.ROOK: 5,
-            chess.QUEEN: 9,
-            chess.KING: 0
-        }
+        self.quiescence_checks = quiescence_checks
+        self.null_move = null_move
+        self.late_move_reductions = late_move_reductions
+        self.futility_pruning = futility_pruning
+        self.razoring = razoring
+        self.threads = max(1, threads)
+        self.evaluator = evaluator
+        self.bitbases = bitbases
+        # Counters of the last search of this process (not of SMP helpers), if switched on
+        self.instrumentation = SearchInstrumentation(profile) if instrument or profile else None
+        if evaluator is not None:
+            self.piece_values = dict(evaluator.piece_values)
+            self.center_squares = list(evaluator.center_squares)
+            self.center_bonus = evaluator.center_bonus
+        else:
+            self.piece_values = dict(PIECE_VALUES)
+            self.center_squares = list(CENTER_SQUARES)
+            self.center_bonus = 0.1
 
-        self.center_squares = [chess.D4, chess.D5, chess.E4, chess.E5]
+        # Material plus centre control per [color][piece_type][square], from White's view,
+        # so that the search can update both terms incrementally
+        self._piece_square_values = self._build_piece_square_values()
+        # Material and centre control of the positions on the current search path
+        self._material_stack = []
 
-        # Transposition table: key: board hash, value: (depth, score, flag, best_move)
+        # Static evaluations by Zobrist key, and pawn-structure scores by pawn bitboards
+        self.eval_cache = EvaluationCache(self.EVAL_CACHE_SIZE)
+        self.pawn_hash = EvaluationCache(self.PAWN_HASH_SIZE)
+
+        # Fixed-size transposition table keyed on Zobrist hash: (key, depth, score, flag, best_move),
+        # scores and bounds from White's point of view
         # flag: exact, lowerbound, upperbound
-        self.transposition_table = {}
+        if transposition_table is None:
+            if self.threads > 1:
+                transposition_table = TranspositionTable.create_shared(hash_mb)
+            else:
+                transposition_table = TranspositionTable(hash_mb)
+        self.transposition_table = transposition_table
+
+        # Helper processes for parallel search, started on first use
+        self._helpers = None
+        # Set to a non-zero value to make the running search return
+        self._stop_signal = bytearray(1)
+        self._time_manager = None
+        self._node_limit = None
+        # Called with (statistics, seconds) after every completed iteration
+        self.info_callback = None
+
+        # Background search of the position after the opponent's expected reply
+        self._ponder_thread = None
+        self._ponder_board = None
+        self._ponder_depth = None
+        self._ponder_manager = None
+        self._ponder_result = None
+        self.ponder_move = None
+
+        # Killer moves and history heuristic
+        self.move_orderer = MoveOrderer()
+
+        # Zobrist keys of the positions on the current search path
+        self._key_stack = []
+        self._timed_out = False
+
+        # Triangular principal variation table, one line per ply
+        self._pv_table = [[] for _ in range(self.MAX_PLY + 1)]
+        self.principal_variation = []
+        self.best_score = 0.0
+        self.completed_depth = 0
 
         # Statistics for nodes
         self.nodes_searched = 0
+        self.quiescence_nodes = 0
+        self.bitbase_hits = 0
+        self.tt_probes = 0
+        self.tt_hits = 0
 
     def evaluate_board(self, board: chess.Board):
         """
@@ -45,18 +162,143 @@ class Engine:
                 return -9999 if board.turn == self.color_is_white else 9999
             return 0
 
-        material_score = self._material_score(board)
-        center_score = self._center_control_score(board)
-        king_safety_score = self._king_safety_score(board)
-        pawn_structure_score = self._pawn_structure_score(board)
+        if self.evaluator is not None:
+            score = self.evaluator.evaluate(board)
+        else:
+            material_score = self._material_score(board)
+            center_score = self._center_control_score(board)
+            king_safety_score = self._king_safety_score(board)
+            pawn_structure_score = self._pawn_structure_score(board)
+
+            score = material_score + center_score + king_safety_score + pawn_structure_score
+
+        if not self.color_is_white:
+            score = -score
+
+        return score
+
+    def evaluate_many(self, boards, check_game_over=True):
+        """
+        Evaluate a batch of positions at once with NumPy.
+
+        Gives the same scores as calling evaluate_board on each position, at a
+        fraction of the cost per position. With a custom evaluator the
+        positions are evaluated one by one.
+
+        Args:
+            boards (list of chess.Board): The positions.
+            check_game_over (bool): Detect checkmate and draws like evaluate_board.
+                Turn off for positions known not to be terminal; this is the
+                only per-position Python work left apart from packing.
+
+        Returns:
+            np.ndarray: (N,) float64 scores from the engine's point of view.
+        """
+        boards = list(boards)
+        if self.evaluator is not None:
+            return np.array([self.evaluate_board(board) for board in boards], dtype=np.float64)
+
+        scores = evaluate_bitboards(pack_boards(boards), self.piece_values, self.center_squares, self.center_bonus)
+        if not self.color_is_white:
+            scores = -scores
+        if check_game_over:
+            for i, board in enumerate(boards):
+                if board.is_game_over():
+                    if board.is_checkmate():
+                        scores[i] = -9999 if board.turn == self.color_is_white else 9999
+                    else:
+                        scores[i] = 0
+        return scores
+
+    def _evaluate_incremental(self, board: chess.Board):
+        """
+        Same as evaluate_board, but takes material and centre control from the
+        sum kept up to date by _push/_pop instead of scanning the board.
+        Only valid for positions reached inside the current search.
 
-        score = material_score + center_score + king_safety_score + pawn_structure_score
+        Checkmate is scored MATE_SCORE minus the distance from the root, so
+        that nearer mates score higher and the distance can be reported.
+        """
+        if board.is_game_over():
+            if board.is_checkmate():
+                mate_score = self.MATE_SCORE - (len(self._key_stack) - 1)
+                return -mate_score if board.turn == self.color_is_white else mate_score
+            return 0
+
+        key = self._key_stack[-1]
+        score = self.eval_cache.get(key)
+        if score is None:
+            if self.evaluator is not None:
+                placement_score = self.evaluator.piece_placement_score(board)
+            else:
+                placement_score = self._king_safety_score(board)
+            score = self._material_stack[-1] + placement_score + self._cached_pawn_structure_score(board)
+            self.eval_cache.put(key, score)
 
         if not self.color_is_white:
             score = -score
 
         return score
 
+    def _cached_pawn_structure_score(self, board: chess.Board):
+        """Pawn-structure score, looked up in the pawn hash by the two pawn bitboards."""
+        white_pawns = board.pawns & board.occupied_co[chess.WHITE]
+        pawn_key = white_pawns | ((board.pawns ^ white_pawns) << 64)
+        score = self.pawn_hash.get(pawn_key)
+        if score is None:
+            if self.evaluator is not None:
+                score = self.evaluator.pawn_structure_score(board)
+            else:
+                score = self._pawn_structure_score(board)
+            self.pawn_hash.put(pawn_key, score)
+        return score
+
+    def _build_piece_square_values(self):
+        """Table of material plus centre bonus for every piece on every square."""
+        table = []
+        for color in (chess.BLACK, chess.WHITE):
+            sign = 1 if color == chess.WHITE else -1
+            by_type = [[0.0] * 64]
+            for piece_type in chess.PIECE_TYPES:
+                values = []
+                for sq in chess.SQUARES:
+                    value = self.piece_values.get(piece_type, 0)
+                    if sq in self.center_squares:
+                        value += self.center_bonus
+                    values.append(sign * value)
+                by_type.append(values)
+            table.append(by_type)
+        return table
+
+    def _move_delta(self, board: chess.Board, move: chess.Move):
+        """Change in material plus centre control caused by a move, computed before it is made."""
+        if not move:
+            return 0.0
+        from_square, to_square = move.from_square, move.to_square
+        us = self._piece_square_values[board.turn]
+        them = self._piece_square_values[not board.turn]
+        piece_type = board.piece_type_at(from_square)
+
+        if board.is_castling(move):
+            rank = chess.square_rank(from_square)
+            if board.is_kingside_castling(move):
+                king_to, rook_from, rook_to = chess.square(6, rank), chess.square(7, rank), chess.square(5, rank)
+            else:
+                king_to, rook_from, rook_to = chess.square(2, rank), chess.square(0, rank), chess.square(3, rank)
+            if board.rooks & chess.BB_SQUARES[to_square]:
+                rook_from = to_square
+            return (us[chess.KING][king_to] - us[chess.KING][from_square]
+                    + us[chess.ROOK][rook_to] - us[chess.ROOK][rook_from])
+
+        delta = us[move.promotion or piece_type][to_square] - us[piece_type][from_square]
+        victim = board.piece_type_at(to_square)
+        if victim:
+            delta -= them[victim][to_square]
+        elif piece_type == chess.PAWN and to_square == board.ep_square:
+            captured = chess.square(chess.square_file(to_square), chess.square_rank(from_square))
+            delta -= them[chess.PAWN][captured]
+        return delta
+
     def _material_score(self, board: chess.Board):
         score = 0.0
         for sq in chess.SQUARES:
@@ -74,7 +316,7 @@ class Engine:
         for sq in self.center_squares:
             p = board.piece_at(sq)
             if p:
-                score += 0.1 if p.color else -0.1
+                score += self.center_bonus if p.color else -self.center_bonus
         return score
 
     def _king_safety_score(self, board: chess.Board):
@@ -122,11 +364,17 @@ class Engine:
         """
         # Simple call to minimax with alpha-beta
         self.nodes_searched = 0
+        self._stop_signal[0] = 0
+        self._start_search(board)
         maximizing = (board.turn == self.color_is_white)
         score, move = self._minimax(board, depth, -math.inf, math.inf, maximizing)
+        self.best_score = score
+        self.completed_depth = depth
+        self.principal_variation = list(self._pv_table[0])
         return move
 
-    def find_best_move_with_stats(self, board: chess.Board, max_depth: int, time_limit: float):
+    def find_best_move_with_stats(self, board: chess.Board, max_depth: int, time_limit=None, time_manager=None,
+                                  node_limit=None):
         """
         Find the best move using iterative deepening until time runs out or max_depth is reached.
         Also return stats: nodes searched, and the time spent.
@@ -134,32 +382,280 @@ class Engine:
         Args:
             board (chess.Board): Current board state.
             max_depth (int): Maximum depth to search.
-            time_limit (float): Time allowed for this move in seconds.
+            time_limit (float): Time allowed for this move in seconds (ignored if time_manager is given).
+            time_manager (TimeManager): A manager already started for this move, whose
+                soft and hard limits decide when to stop.
+            node_limit (int): Stop after about this many nodes (main and quiescence search).
+
+        Returns:
+            (move: chess.Move, nodes: int, search_time: float)
+        """
+        self.stop_pondering()
+        if time_manager is None:
+            time_manager = TimeManager()
+            time_manager.start(move_time=time_limit)
+        self._node_limit = node_limit
+        try:
+            return self._search(board, max_depth, time_manager)
+        finally:
+            self._node_limit = None
+
+    def _search(self, board: chess.Board, max_depth: int, time_manager: TimeManager):
+        """Run the search in this process, or with helper processes if threads > 1."""
+        if self.threads > 1:
+            return self._parallel_search(board, max_depth, time_manager)
+        self._stop_signal[0] = 0
+        return self._iterative_deepening(board, max_depth, time_manager)
+
+    def start_pondering(self, board: chess.Board, ponder_move: chess.Move, max_depth=MAX_PLY):
+        """
+        Search the position after the opponent's expected reply in a background
+        thread, without a time limit, while the opponent thinks.
+
+        The engine must not be used for anything else until ponder_hit or
+        stop_pondering is called (find_best_move_with_stats calls the latter).
+
+        Args:
+            board (chess.Board): The position with the opponent to move.
+            ponder_move (chess.Move): The expected reply, usually the second move of the principal variation.
+            max_depth (int): Maximum depth of the background search.
+        """
+        self.stop_pondering()
+        ponder_board = board.copy()
+        ponder_board.push(ponder_move)
+        self.ponder_move = ponder_move
+        self._ponder_board = ponder_board
+        self._ponder_depth = max_depth
+        self._ponder_manager = TimeManager()
+        self._ponder_manager.start()
+        self._ponder_result = None
+        self._ponder_thread = threading.Thread(
+            target=self._ponder_main, args=(ponder_board.copy(), max_depth, self._ponder_manager), daemon=True)
+        self._ponder_thread.start()
+
+    def _ponder_main(self, board: chess.Board, max_depth: int, time_manager: TimeManager):
+        self._ponder_result = self._search(board, max_depth, time_manager)
+
+    @property
+    def pondering(self):
+        """True while a ponder search is running or waiting for ponder_hit / stop_pondering."""
+        return self._ponder_thread is not None
+
+    def is_ponder_hit(self, board: chess.Board):
+        """True if the engine is pondering exactly this position."""
+        return self._ponder_board is not None and board == self._ponder_board
+
+    def ponder_hit(self, time_left=None, increment=0.0, moves_to_go=None, move_time=None):
+        """
+        The opponent played the expected reply: the running ponder search becomes
+        the real search. It gets a time budget counted from now (see
+        TimeManager.restart) and keeps everything it has found so far. If the
+        ponder search failed, the position is searched now in that budget.
+
+        Returns:
+            (move: chess.Move, nodes: int, search_time: float), as find_best_move_with_stats.
+        """
+        self._ponder_manager.restart(time_left, increment, moves_to_go, move_time)
+        self._ponder_thread.join()
+        result = self._ponder_result
+        board, max_depth, time_manager = self._ponder_board, self._ponder_depth, self._ponder_manager
+        self._clear_ponder_state()
+        if result is None:
+            result = self._search(board, max_depth, time_manager)
+        return result
+
+    def stop_pondering(self):
+        """Abandon the ponder search (after a different reply). The transposition table keeps what it learned."""
+        if self._ponder_thread is None:
+            return
+        self._ponder_manager.restart(move_time=0.0)
+        self.stop()
+        self._ponder_thread.join()
+        self._clear_ponder_state()
+
+    def _clear_ponder_state(self):
+        self._ponder_thread = None
+        self._ponder_board = None
+        self._ponder_depth = None
+        self._ponder_manager = None
+        self._ponder_result = None
+        self.ponder_move = None
+
+    def _iterative_deepening(self, board: chess.Board, max_depth: int, time_manager: TimeManager, new_generation=True):
+        """
+        Iterative deepening search in this process. A new depth is only started
+        if the time manager expects it to finish in time.
 
         Returns:
             (move: chess.Move, nodes: int, search_time: float)
         """
+        if self.instrumentation is not None and not self.instrumentation.attached:
+            board = self.instrumentation.attach(self, board)
+            try:
+                return self._iterative_deepening(board, max_depth, time_manager, new_generation)
+            finally:
+                self.instrumentation.detach(self)
+
         start_time = time.time()
         self.nodes_searched = 0
+        self._start_search(board, new_generation)
+        self._time_manager = time_manager
         best_move = None
         best_score = -math.inf if board.turn == self.color_is_white else math.inf
+        maximizing = (board.turn == self.color_is_white)
 
         # Iterative deepening:
         for depth in range(1, max_depth + 1):
-            if time.time() - start_time >= time_limit:
+            if depth > 1 and not time_manager.can_start_iteration():
                 break
-            maximizing = (board.turn == self.color_is_white)
-            score, move = self._minimax(board, depth, -math.inf, math.inf, maximizing, start_time, time_limit)
-            if move is not None:
+            iteration_start_nodes = self.nodes_searched
+            score, move = self._aspiration_search(board, depth, best_score, maximizing)
+            # An interrupted iteration only counts if nothing better is known
+            if move is not None and (best_move is None or not self._timed_out):
                 best_move = move
                 best_score = score
-            if time.time() - start_time >= time_limit:
+                if not self._timed_out:
+                    self.best_score = score
+                    self.completed_depth = depth
+                    self.principal_variation = list(self._pv_table[0])
+            if self._timed_out:
                 break
+            time_manager.iteration_finished(self.nodes_searched - iteration_start_nodes)
+            if self.instrumentation is not None:
+                self.instrumentation.record_iteration(depth, time.time() - start_time,
+                                                      self.nodes_searched + self.quiescence_nodes)
+            if self.info_callback is not None:
+                self.info_callback(self.get_search_statistics(), time.time() - start_time)
 
+        self._time_manager = None
         search_time = time.time() - start_time
         return best_move, self.nodes_searched, search_time
 
-    def _minimax(self, board: chess.Board, depth: int, alpha: float, beta: float, maximizingPlayer: bool, start_time=None, time_limit=None):
+    def _parallel_search(self, board: chess.Board, max_depth: int, time_manager: TimeManager):
+        """
+        Lazy SMP: helper processes run the same iterative deepening on the root,
+        some of them one ply deeper, sharing the transposition table. When this
+        process finishes its own search it stops the helpers and keeps the
+        deepest completed result.
+
+        Returns:
+            (move: chess.Move, nodes: int, search_time: float)
+        """
+        from src.smp import HelperPool
+
+        start_time = time.time()
+        if self._helpers is None:
+            self._helpers = HelperPool(self, self.threads - 1)
+            self._stop_signal = self._helpers.stop_signal
+        self._stop_signal[0] = 0
+        self.transposition_table.new_search()
+        # Helpers get the hard limit; this process stops them earlier if it finishes first
+        self._helpers.start(board, max_depth, time_manager.remaining(), self.transposition_table.generation)
+
+        best_move, nodes, _ = self._iterative_deepening(board, max_depth, time_manager, new_generation=False)
+        self._stop_signal[0] = 1
+        for depth, score, pv, helper_nodes in self._helpers.collect():
+            nodes += helper_nodes
+            if depth > self.completed_depth and pv:
+                move = chess.Move.from_uci(pv[0])
+                if board.is_legal(move):
+                    best_move = move
+                    self.completed_depth = depth
+                    self.best_score = score
+                    self.principal_variation = [chess.Move.from_uci(uci) for uci in pv]
+        self._stop_signal[0] = 0
+        self.nodes_searched = nodes
+        return best_move, nodes, time.time() - start_time
+
+    def stop(self):
+        """Ask a running search (and its helper processes) to return as soon as possible."""
+        self._stop_signal[0] = 1
+
+    def close(self):
+        """Stop pondering, shut down helper processes and release a shared transposition table."""
+        self.stop_pondering()
+        if self._helpers is not None:
+            self._helpers.close()
+            self._helpers = None
+            self._stop_signal = bytearray(1)
+        self.transposition_table.close()
+
+    def _aspiration_search(self, board: chess.Board, depth: int, previous_score: float, maximizing: bool):
+        """
+        Search the root with a narrow window around the previous iteration's score,
+        widening it on the failing side until the score falls inside.
+
+        Returns:
+            (float, chess.Move): (score, best_move)
+        """
+        delta = self.ASPIRATION_WINDOW
+        if depth < 3 or math.isinf(previous_score):
+            alpha, beta = -math.inf, math.inf
+        else:
+            alpha, beta = previous_score - delta, previous_score + delta
+
+        while True:
+            score, move = self._minimax(board, depth, alpha, beta, maximizing)
+            if self._timed_out:
+                # A fail-high move is still an improvement; a fail-low one is not
+                if score <= alpha:
+                    move = None
+                return score, move
+            if alpha < score < beta:
+                return score, move
+            delta *= 2
+            if delta > self.MAX_ASPIRATION_WINDOW:
+                alpha, beta = -math.inf, math.inf
+            elif score <= alpha:
+                alpha = score - delta
+            else:
+                beta = score + delta
+
+    def _start_search(self, board: chess.Board, new_generation=True):
+        """Reset the per-search state for a new root position."""
+        self._key_stack = [zobrist_key(board)]
+        # The only full material scan of the search
+        self._material_stack = [self._material_score(board) + self._center_control_score(board)]
+        self._timed_out = False
+        self.quiescence_nodes = 0
+        self.bitbase_hits = 0
+        self.tt_probes = 0
+        self.tt_hits = 0
+        self.eval_cache.reset_statistics()
+        self.pawn_hash.reset_statistics()
+        self.completed_depth = 0
+        self.best_score = 0.0
+        self.principal_variation = []
+        if new_generation:
+            self.transposition_table.new_search()
+        self.move_orderer.new_search()
+
+    def _should_stop(self):
+        """
+        True once the time manager's hard limit or the node limit is reached or a stop was requested;
+        the search then unwinds without trusting or storing what it finds on the way.
+        Called at every node of _minimax and _quiescence, which also advances the
+        time manager's clock countdown.
+        """
+        if self._timed_out:
+            return True
+        if (self._stop_signal[0] or (self._time_manager is not None and self._time_manager.out_of_time())
+                or (self._node_limit is not None and self.nodes_searched + self.quiescence_nodes >= self._node_limit)):
+            self._timed_out = True
+        return self._timed_out
+
+    def _push(self, board: chess.Board, move: chess.Move):
+        """Make a move and keep the Zobrist key and material of the search path up to date."""
+        self._material_stack.append(self._material_stack[-1] + self._move_delta(board, move))
+        self._key_stack.append(push_with_key(board, move, self._key_stack[-1]))
+
+    def _pop(self, board: chess.Board):
+        """Unmake the last move made with _push."""
+        board.pop()
+        self._key_stack.pop()
+        self._material_stack.pop()
+
+    def _minimax(self, board: chess.Board, depth: int, alpha: float, beta: float, maximizingPlayer: bool):
         """
         Minimax search with Alpha-Beta pruning and Transposition Table.
         Also uses a simple move ordering by prioritizing tactical moves.
@@ -170,105 +666,359 @@ class Engine:
             alpha (float): Alpha for pruning.
             beta (float): Beta for pruning.
             maximizingPlayer (bool): True if engine's turn.
-            start_time (float): start time of the search for time control (optional).
-            time_limit (float): time limit for the move (optional).
 
         Returns:
             (float, chess.Move): (score, best_move)
         """
-        if start_time and time_limit and (time.time() - start_time >= time_limit):
+        if self._should_stop():
             # Out of time, return evaluation immediately
-            return self.evaluate_board(board), None
+            return self._evaluate_incremental(board), None
 
-        if depth == 0 or board.is_game_over():
-            self.nodes_searched += 1
-            return self.evaluate_board(board), None
+        # Every position the main search visits is one node, whatever ends it
+        self.nodes_searched += 1
+        ply = len(self._key_stack) - 1
+        if ply < self.MAX_PLY:
+            self._pv_table[ply] = []
 
-        board_key = (board.fen(), depth, maximizingPlayer)
-        if board_key in self.transposition_table:
-            # Use transposition table result if available and at least same depth
-            stored = self.transposition_table[board_key]
-            # You could use flag to decide exact or bound
-            # For simplicity, assume exact storage
-            return stored[0], stored[1]
+        # Known endgames end the search here; mate and stalemate are still scored as usual
+        if (self.bitbases is not None and ply > 0 and chess.popcount(board.occupied) == 3
+                and not board.is_game_over()):
+            result = self.bitbases.probe(board)
+            if result is not None:
+                self.bitbase_hits += 1
+                return self._bitbase_score(board, result), None
 
-        self.nodes_searched += 1
+        if depth == 0:
+            return self._quiescence(board, alpha, beta, maximizingPlayer), None
 
-        legal_moves = list(board.legal_moves)
-        if not legal_moves:
-            return self.evaluate_board(board), None
+        if board.is_game_over():
+            return self._evaluate_incremental(board), None
+
+        key = self._key_stack[-1]
+        entry = self.transposition_table.probe(key)
+        self.tt_probes += 1
+        tt_move = None
+        if entry is not None:
+            self.tt_hits += 1
+            _, entry_depth, entry_score, entry_flag, tt_move = entry
+            entry_score, entry_flag = self._from_table(entry_score, entry_flag, ply)
+            # Only a search at least as deep as this one can answer it, and
+            # the root is always searched so that it has a principal variation
+            if entry_depth >= depth and ply > 0:
+                if entry_flag == EXACT:
+                    if self.instrumentation is not None:
+                        self.instrumentation.record_tt_cutoff()
+                    return entry_score, tt_move
+                if entry_flag == LOWERBOUND:
+                    alpha = max(alpha, entry_score)
+                else:
+                    beta = min(beta, entry_score)
+                if alpha >= beta:
+                    if self.instrumentation is not None:
+                        self.instrumentation.record_tt_cutoff()
+                    return entry_score, tt_move
+
+        in_check = board.is_check()
+
+        # Null-move pruning: if passing still fails high, a real move will too.
+        # Not in check, not twice in a row, and not with only pawns left (zugzwang).
+        if (self.null_move and ply > 0 and depth >= 3 and not in_check
+                and board.move_stack and board.move_stack[-1]
+                and self._has_non_pawn_material(board, board.turn)):
+            reduction = 3 if depth >= 6 else 2
+            if maximizingPlayer and not math.isinf(beta):
+                self._push(board, chess.Move.null())
+                null_score, _ = self._minimax(board, depth - 1 - reduction, beta - self.NULL_WINDOW, beta, False)
+                self._pop(board)
+                if null_score >= beta:
+                    return null_score, None
+            elif not maximizingPlayer and not math.isinf(alpha):
+                self._push(board, chess.Move.null())
+                null_score, _ = self._minimax(board, depth - 1 - reduction, alpha, alpha + self.NULL_WINDOW, True)
+                self._pop(board)
+                if null_score <= alpha:
+                    return null_score, None
+
+        # Frontier nodes: razoring and futility pruning against the static evaluation
+        futile = False
+        if (self.futility_pruning or self.razoring) and ply > 0 and depth <= 2 and not in_check:
+            static_eval = self._evaluate_incremental(board)
+            if self.razoring:
+                margin = self.RAZOR_MARGINS[depth]
+                if maximizingPlayer and static_eval + margin <= alpha:
+                    score = self._quiescence(board, alpha, beta, True)
+                    if score <= alpha:
+                        return score, None
+                elif not maximizingPlayer and static_eval - margin >= beta:
+                    score = self._quiescence(board, alpha, beta, False)
+                    if score >= beta:
+                        return score, None
+            if self.futility_pruning:
+                margin = self.FUTILITY_MARGINS[depth]
+                if maximizingPlayer:
+                    futile = static_eval + margin <= alpha
+                else:
+                    futile = static_eval - margin >= beta
 
-        # Move ordering: sort moves by tactical potential (e.g., captures first, checks, etc.)
-        legal_moves = self._order_moves(board, legal_moves)
+        # Moves are generated in stages: TT move, captures, killers, quiet moves
+        moves = self.move_orderer.pick_moves(board, ply, tt_move)
 
+        alpha_orig, beta_orig = alpha, beta
         best_move = None
-        if maximizingPlayer:
-            max_eval = -math.inf
-            for move in legal_moves:
-                if start_time and time_limit and (time.time() - start_time >= time_limit):
-                    break
-                board.push(move)
-                eval_score, _ = self._minimax(board, depth - 1, alpha, beta, False, start_time, time_limit)
-                board.pop()
-                if eval_score > max_eval:
-                    max_eval = eval_score
+        best_score = -math.inf if maximizingPlayer else math.inf
+        for index, move in enumerate(moves):
+            if self._timed_out:
+                break
+            quiet = not move.promotion and not board.is_capture(move)
+            self._push(board, move)
+            gives_check = board.is_check()
+            if futile and quiet and not gives_check and best_move is not None:
+                # This move cannot raise the score to the window
+                self._pop(board)
+                continue
+            if index == 0:
+                eval_score, _ = self._minimax(board, depth - 1, alpha, beta, not maximizingPlayer)
+            else:
+                # Late move reductions: quiet moves ordered late are searched
+                # shallower first and only searched fully if they look good
+                reduction = 0
+                if (self.late_move_reductions and depth >= 3 and index >= 3
+                        and quiet and not in_check and not gives_check):
+                    reduction = 1 if index < 8 or depth < 5 else 2
+                # Principal variation search: prove with a null window that the move
+                # is no better than the best one so far, re-search if that fails
+                eval_score = self._null_window_search(board, depth - 1 - reduction, alpha, beta, maximizingPlayer)
+                if reduction and (eval_score > alpha if maximizingPlayer else eval_score < beta):
+                    eval_score = self._null_window_search(board, depth - 1, alpha, beta, maximizingPlayer)
+                if alpha < eval_score < beta and beta - alpha > self.NULL_WINDOW:
+                    eval_score, _ = self._minimax(board, depth - 1, alpha, beta, not maximizingPlayer)
+            self._pop(board)
+
+            if maximizingPlayer:
+                if eval_score > best_score:
+                    best_score = eval_score
                     best_move = move
-                alpha = max(alpha, eval_score)
-                if beta <= alpha:
-                    break
-            self.transposition_table[board_key] = (max_eval, best_move)
-            return max_eval, best_move
-        else:
-            min_eval = math.inf
-            for move in legal_moves:
-                if start_time and time_limit and (time.time() - start_time >= time_limit):
-                    break
-                board.push(move)
-                eval_score, _ = self._minimax(board, depth - 1, alpha, beta, True, start_time, time_limit)
-                board.pop()
-                if eval_score < min_eval:
-                    min_eval = eval_score
+                improved = eval_score > alpha
+                if improved:
+                    alpha = eval_score
+            else:
+                if eval_score < best_score:
+                    best_score = eval_score
                     best_move = move
-                beta = min(beta, eval_score)
-                if beta <= alpha:
-                    break
-            self.transposition_table[board_key] = (min_eval, best_move)
-            return min_eval, best_move
+                improved = eval_score < beta
+                if improved:
+                    beta = eval_score
+            if improved and ply < self.MAX_PLY:
+                self._pv_table[ply] = [move] + self._pv_table[ply + 1]
+            if beta <= alpha:
+                self.move_orderer.record_cutoff(board, move, ply, depth)
+                if self.instrumentation is not None:
+                    self.instrumentation.record_beta_cutoff(index)
+                break
 
-    def _order_moves(self, board: chess.Board, moves):
+        if best_move is None:
+            return self._evaluate_incremental(board), None
+
+        # Results of an interrupted search are not trustworthy enough to keep
+        if not self._timed_out:
+            if best_score <= alpha_orig:
+                flag = UPPERBOUND
+            elif best_score >= beta_orig:
+                flag = LOWERBOUND
+            else:
+                flag = EXACT
+            score, flag = self._to_table(best_score, flag, ply)
+            self.transposition_table.store(key, depth, score, flag, best_move)
+        return best_score, best_move
+
+    def _to_table(self, score: float, flag: int, ply: int):
         """
-        Order moves to prioritize tactical and forcing moves:
-        - Checks
-        - Captures of high-value pieces
-        - Other tactical motifs (fork, pin, skewer) - simplified as giving bonus to moves that are captures or checks.
+        Turn a search score and its bound into the form kept in the table.
+        Scores are stored from White's point of view, so that a table saved or
+        merged from engines of either colour means the same thing; a bound
+        flips with the sign. Mate scores are stored as the distance from the
+        position instead of from the root, so that an entry stays right
+        wherever the position recurs.
 
-        We can give a simple scoring:
-        - +2 for delivering check
-        - +1 * (value_of_captured_piece) for a capture
+        Returns:
+            (float, int): (score, flag)
         """
-        scored_moves = []
+        if score >= self.MATE_BOUND:
+            score += ply
+        elif score <= -self.MATE_BOUND:
+            score -= ply
+        if not self.color_is_white:
+            score, flag = -score, self._FLIPPED_BOUNDS[flag]
+        return score, flag
+
+    def _from_table(self, score: float, flag: int, ply: int):
+        """
+        Turn a score and bound read from the table back into the engine's
+        point of view and a mate distance from the root (see _to_table).
+
+        Returns:
+            (float, int): (score, flag)
+        """
+        if not self.color_is_white:
+            score, flag = -score, self._FLIPPED_BOUNDS[flag]
+        if score >= self.MATE_BOUND:
+            score -= ply
+        elif score <= -self.MATE_BOUND:
+            score += ply
+        return score, flag
+
+    def _null_window_search(self, board: chess.Board, depth: int, alpha: float, beta: float, maximizingPlayer: bool):
+        """
+        Search the position after a move of the maximizing (or minimizing) player
+        with a null window at alpha (or beta), just to learn whether the move improves on it.
+        """
+        if maximizingPlayer:
+            score, _ = self._minimax(board, depth, alpha, alpha + self.NULL_WINDOW, False)
+        else:
+            score, _ = self._minimax(board, depth, beta - self.NULL_WINDOW, beta, True)
+        return score
+
+    def _bitbase_score(self, board: chess.Board, result: int):
+        """
+        Score of a bitbase result (1, 0 or -1 for the side to move). A won
+        position also gets a small bonus for progress: the losing king near
+        the edge, the kings close together and the pawn advanced, so that the
+        search heads for mate instead of shuffling between won positions.
+        """
+        if result == 0:
+            return 0.0
+        winner = board.turn if result > 0 else not board.turn
+        losing_king = board.king(not winner)
+        file, rank = chess.square_file(losing_king), chess.square_rank(losing_king)
+        edge = max(3 - file, file - 4) + max(3 - rank, rank - 4)
+        closeness = 7 - chess.square_distance(losing_king, board.king(winner))
+        pawns = board.pawns & board.occupied_co[winner]
+        advance = 0
+        if pawns:
+            pawn_rank = chess.square_rank(chess.lsb(pawns))
+            advance = pawn_rank if winner == chess.WHITE else 7 - pawn_rank
+        score = self.BITBASE_WIN_SCORE + 0.1 * edge + 0.05 * closeness + 0.1 * advance
+        if winner != self.color_is_white:
+            score = -score
+        return score
+
+    def _has_non_pawn_material(self, board: chess.Board, color: chess.Color):
+        """True if the side has a knight, bishop, rook or queen."""
+        return bool(board.occupied_co[color] & ~board.pawns & ~board.kings)
+
+    def _quiescence(self, board: chess.Board, alpha: float, beta: float, maximizingPlayer: bool, ply=0):
+        """
+        Quiescence search: keep searching captures and promotions (and, if enabled,
+        checks at the first ply) until the position is quiet, so that leaves are
+        not scored in the middle of an exchange.
+
+        The side to move may "stand pat" on the static evaluation unless it is in
+        check, in which case all evasions are searched. Captures that cannot
+        bring the score back to the window even with DELTA_MARGIN are skipped.
+        Like _minimax, it returns the static evaluation at once when the search
+        has to stop, so that long capture sequences cannot overrun the limits.
+
+        Returns:
+            float: The score of the position.
+        """
+        stand_pat = self._evaluate_incremental(board)
+        if self._should_stop():
+            return stand_pat
+        in_check = board.is_check()
+
+        if in_check:
+            # No standing pat in check; the evaluation has already scored mate
+            moves = list(board.legal_moves)
+            if not moves:
+                return stand_pat
+            best_score = -math.inf if maximizingPlayer else math.inf
+        else:
+            if maximizingPlayer:
+                if stand_pat >= beta:
+                    return stand_pat
+                alpha = max(alpha, stand_pat)
+            else:
+                if stand_pat <= alpha:
+                    return stand_pat
+                beta = min(beta, stand_pat)
+            best_score = stand_pat
+            moves = self._quiescence_moves(board, ply)
+
         for move in moves:
-            score = 0
-            # If move is a capture
-            if board.is_capture(move):
-                captured_piece = board.piece_at(move.to_square)
-                if captured_piece:
-                    score += self.piece_values.get(captured_piece.piece_type, 0)
-            # If move gives check
-            board.push(move)
-            if board.is_check():
-                score += 2
-            board.pop()
-            scored_moves.append((score, move))
-
-        # Sort by score descending
-        scored_moves.sort(key=lambda x: x[0], reverse=True)
-        return [m[1] for m in scored_moves]
+            if self._timed_out:
+                break
+            gain = self._capture_gain(board, move)
+            if not in_check:
+                # Delta pruning: even winning this material cannot reach the window
+                if maximizingPlayer and stand_pat + gain + self.DELTA_MARGIN <= alpha:
+                    continue
+                if not maximizingPlayer and stand_pat - gain - self.DELTA_MARGIN >= beta:
+                    continue
+            # Nodes beyond the horizon; the position searched from was counted by the main search
+            self.quiescence_nodes += 1
+            self._push(board, move)
+            score = self._quiescence(board, alpha, beta, not maximizingPlayer, ply + 1)
+            self._pop(board)
+            if maximizingPlayer:
+                best_score = max(best_score, score)
+                alpha = max(alpha, score)
+            else:
+                best_score = min(best_score, score)
+                beta = min(beta, score)
+            if beta <= alpha:
+                break
+        return best_score
+
+    def _quiescence_moves(self, board: chess.Board, ply: int):
+        """
+        Captures and promotions (plus quiet checks at the first ply if enabled),
+        most valuable victim / least valuable attacker first.
+        """
+        moves = list(board.generate_legal_captures())
+        moves.extend(board.generate_legal_moves(board.pawns, chess.BB_BACKRANKS & ~board.occupied))
+        if self.quiescence_checks and ply == 0:
+            moves.extend(m for m in board.generate_legal_moves(to_mask=chess.BB_ALL & ~board.occupied_co[not board.turn])
+                         if not m.promotion and board.gives_check(m))
+        moves.sort(key=lambda m: self.move_orderer.mvv_lva(board, m), reverse=True)
+        return moves
+
+    def _capture_gain(self, board: chess.Board, move: chess.Move):
+        """Material won by a move: the captured piece plus any promotion gain."""
+        gain = 0.0
+        if board.is_en_passant(move):
+            gain = self.piece_values[chess.PAWN]
+        else:
+            victim = board.piece_type_at(move.to_square)
+            if victim:
+                gain = self.piece_values[victim]
+        if move.promotion:
+            gain += self.piece_values[move.promotion] - self.piece_values[chess.PAWN]
+        return gain
 
     def get_search_statistics(self):
         """
-        Return the number of nodes searched in the last move and potentially other stats.
+        Return the statistics of the last search: nodes searched, the last completed
+        depth, its score and principal variation.
+
+        nodes_searched counts every position the main search visited, including
+        those answered by the transposition table or the bitbases, and
+        quiescence_nodes the positions visited beyond the horizon, so their sum
+        is the number of positions searched. "instrumentation" holds the
+        counters of SearchInstrumentation if the engine has them switched on.
         """
         return {
-            "nodes_searched": self.nodes_searched
+            "nodes_searched": self.nodes_searched,
+            "threads": self.threads,
+            "quiescence_nodes": self.quiescence_nodes,
+            "bitbase_hits": self.bitbase_hits,
+            "tt_probes": self.tt_probes,
+            "tt_hit_rate": self.tt_hits / self.tt_probes if self.tt_probes else 0.0,
+            "eval_cache_probes": self.eval_cache.probes,
+            "eval_cache_hit_rate": self.eval_cache.hit_rate(),
+            "pawn_hash_probes": self.pawn_hash.probes,
+            "pawn_hash_hit_rate": self.pawn_hash.hit_rate(),
+            "depth": self.completed_depth,
+            "score": self.best_score,
+            "principal_variation": [move.uci() for move in self.principal_variation],
+            "instrumentation": self.instrumentation.statistics() if self.instrumentation is not None else None
         }
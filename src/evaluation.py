@@ -0,0 +1,303 @@
+import chess
+import numpy as np
+
+PIECE_VALUES = {
+    chess.PAWN: 1,
+    chess.KNIGHT: 3,
+    chess.BISHOP: 3.25,
+    chess.ROOK: 5,
+    chess.QUEEN: 9,
+    chess.KING: 0
+}
+
+CENTER_SQUARES = [chess.D4, chess.D5, chess.E4, chess.E5]
+BB_CENTER = chess.BB_D4 | chess.BB_D5 | chess.BB_E4 | chess.BB_E5
+
+# Files next to each file
+ADJACENT_FILES = [
+    (chess.BB_FILES[f - 1] if f > 0 else 0) | (chess.BB_FILES[f + 1] if f < 7 else 0)
+    for f in range(8)
+]
+
+
+def _forward_ranks(color, rank):
+    """Mask of all ranks strictly in front of rank from color's point of view."""
+    mask = 0
+    ranks = range(rank + 1, 8) if color == chess.WHITE else range(0, rank)
+    for r in ranks:
+        mask |= chess.BB_RANKS[r]
+    return mask
+
+
+# Squares that must be free of enemy pawns for a pawn to be passed, by [color][square]
+PASSED_PAWN_MASKS = [
+    [_forward_ranks(color, chess.square_rank(sq))
+     & (chess.BB_FILES[chess.square_file(sq)] | ADJACENT_FILES[chess.square_file(sq)])
+     for sq in chess.SQUARES]
+    for color in (chess.BLACK, chess.WHITE)
+]
+
+# The two ranks in front of the king on its own and the adjacent files, by [color][square]
+KING_SHELTER_MASKS = [
+    [_forward_ranks(color, chess.square_rank(sq))
+     & ~_forward_ranks(color, chess.square_rank(sq) + (2 if color == chess.WHITE else -2))
+     & (chess.BB_FILES[chess.square_file(sq)] | ADJACENT_FILES[chess.square_file(sq)])
+     for sq in chess.SQUARES]
+    for color in (chess.BLACK, chess.WHITE)
+]
+
+
+class BitboardEvaluator:
+    """
+    Static evaluation computed from python-chess bitboards with precomputed
+    masks instead of per-square lookups.
+
+    Terms (all from White's point of view, in pawns):
+        - Material
+        - Centre control: pieces standing on and attacks on d4, d5, e4, e5
+        - King shelter: own pawns on the two ranks in front of the king
+        - Pawn structure: doubled, isolated and passed pawns
+
+    Material and centre occupancy use the same values as Engine, so the engine
+    can keep updating them incrementally. During a search it only calls
+    piece_placement_score, and pawn_structure_score on a pawn hash miss (in
+    SMP helper processes too); evaluate is used by Engine.evaluate_board.
+    """
+
+    # Passed pawn bonus by ranks advanced from the pawn's starting side
+    PASSED_PAWN_BONUS = (0.0, 0.1, 0.15, 0.25, 0.4, 0.6, 0.9, 0.0)
+
+    def __init__(self, piece_values=None, center_bonus=0.1, center_attack_bonus=0.02,
+                 king_shelter_bonus=0.05, doubled_pawn_penalty=0.1, isolated_pawn_penalty=0.15):
+        """
+        Args:
+            piece_values (dict): Value of each piece type; PIECE_VALUES if None.
+            center_bonus (float): Bonus per piece standing on a centre square.
+            center_attack_bonus (float): Bonus per attack on a centre square.
+            king_shelter_bonus (float): Bonus per pawn sheltering the king.
+            doubled_pawn_penalty (float): Penalty per extra pawn on a file.
+            isolated_pawn_penalty (float): Penalty per pawn without pawns on adjacent files.
+        """
+        self.piece_values = dict(piece_values) if piece_values else dict(PIECE_VALUES)
+        self.center_squares = list(CENTER_SQUARES)
+        self.center_bonus = center_bonus
+        self.center_attack_bonus = center_attack_bonus
+        self.king_shelter_bonus = king_shelter_bonus
+        self.doubled_pawn_penalty = doubled_pawn_penalty
+        self.isolated_pawn_penalty = isolated_pawn_penalty
+
+    def evaluate(self, board: chess.Board):
+        """Full static evaluation from White's point of view (game end is not detected)."""
+        return (self.material_score(board) + self.center_occupancy_score(board)
+                + self.positional_score(board))
+
+    def positional_score(self, board: chess.Board):
+        """Everything except material and centre occupancy, which Engine can update incrementally."""
+        return self.piece_placement_score(board) + self.pawn_structure_score(board)
+
+    def piece_placement_score(self, board: chess.Board):
+        """The positional terms that depend on more than the pawns."""
+        return self.center_attack_score(board) + self.king_shelter_score(board)
+
+    def material_score(self, board: chess.Board):
+        score = 0.0
+        white = board.occupied_co[chess.WHITE]
+        black = board.occupied_co[chess.BLACK]
+        for piece_type, mask in ((chess.PAWN, board.pawns), (chess.KNIGHT, board.knights),
+                                 (chess.BISHOP, board.bishops), (chess.ROOK, board.rooks),
+                                 (chess.QUEEN, board.queens)):
+            value = self.piece_values[piece_type]
+            score += value * (chess.popcount(mask & white) - chess.popcount(mask & black))
+        return score
+
+    def center_occupancy_score(self, board: chess.Board):
+        return self.center_bonus * (chess.popcount(board.occupied_co[chess.WHITE] & BB_CENTER)
+                                    - chess.popcount(board.occupied_co[chess.BLACK] & BB_CENTER))
+
+    def center_attack_score(self, board: chess.Board):
+        attacks = 0
+        for sq in self.center_squares:
+            attacks += (chess.popcount(board.attackers_mask(chess.WHITE, sq))
+                        - chess.popcount(board.attackers_mask(chess.BLACK, sq)))
+        return self.center_attack_bonus * attacks
+
+    def king_shelter_score(self, board: chess.Board):
+        score = 0.0
+        for color, sign in ((chess.WHITE, 1), (chess.BLACK, -1)):
+            king = board.king(color)
+            if king is None:
+                continue
+            shelter = KING_SHELTER_MASKS[color][king] & board.pawns & board.occupied_co[color]
+            score += sign * self.king_shelter_bonus * chess.popcount(shelter)
+        return score
+
+    def pawn_structure_score(self, board: chess.Board):
+        score = 0.0
+        white_pawns = board.pawns & board.occupied_co[chess.WHITE]
+        black_pawns = board.pawns & board.occupied_co[chess.BLACK]
+        for color, sign, own, enemy in ((chess.WHITE, 1, white_pawns, black_pawns),
+                                        (chess.BLACK, -1, black_pawns, white_pawns)):
+            for f in range(8):
+                count = chess.popcount(own & chess.BB_FILES[f])
+                if count > 1:
+                    score -= sign * self.doubled_pawn_penalty * (count - 1)
+                if count and not own & ADJACENT_FILES[f]:
+                    score -= sign * self.isolated_pawn_penalty * count
+            passed_masks = PASSED_PAWN_MASKS[color]
+            for sq in chess.scan_forward(own):
+                if not passed_masks[sq] & enemy:
+                    rank = chess.square_rank(sq)
+                    advanced = rank if color == chess.WHITE else 7 - rank
+                    score += sign * self.PASSED_PAWN_BONUS[advanced]
+        return score
+
+
+class EvaluationCache:
+    """
+    Small fixed-size, direct-mapped cache of evaluation results.
+
+    Used by Engine as an evaluation hash keyed by the Zobrist key and as a
+    pawn hash keyed by the pawn bitboards. A new entry simply overwrites the
+    one in its slot. Probes and hits are counted for the search statistics.
+    """
+
+    def __init__(self, size=1 << 16):
+        """
+        Args:
+            size (int): Number of entries, rounded down to a power of two.
+        """
+        slots = 1
+        while slots * 2 <= size:
+            slots *= 2
+        self.size = slots
+        self._mask = slots - 1
+        self._keys = [None] * slots
+        self._values = [0.0] * slots
+        self.probes = 0
+        self.hits = 0
+
+    def get(self, key: int):
+        """Return the cached value for key, or None."""
+        self.probes += 1
+        index = hash(key) & self._mask
+        if self._keys[index] == key:
+            self.hits += 1
+            return self._values[index]
+        return None
+
+    def put(self, key: int, value: float):
+        index = hash(key) & self._mask
+        self._keys[index] = key
+        self._values[index] = value
+
+    def hit_rate(self):
+        return self.hits / self.probes if self.probes else 0.0
+
+    def reset_statistics(self):
+        self.probes = 0
+        self.hits = 0
+
+    def clear(self):
+        self._keys = [None] * self.size
+        self.reset_statistics()
+
+
+# Batched evaluation
+#
+# Positions are packed as (N, 12) uint64 arrays of piece bitboards, in the
+# order of PACKED_PIECES, and every term of Engine's built-in evaluation is
+# computed for all N at once. The operations are applied in the same order as
+# the scalar code, so the floating point results are identical.
+
+PACKED_PIECES = [(color, piece_type) for color in (chess.WHITE, chess.BLACK) for piece_type in chess.PIECE_TYPES]
+
+# Squares Engine._king_safety_score looks at around a king: square offsets
+# 1, -1, 8, -8, 7, -7, 9, -9 that stay on the board (without file wrapping checks)
+_KING_NEIGHBORS = np.array([
+    sum(1 << (sq + d) for d in (1, -1, 8, -8, 7, -7, 9, -9) if 0 <= sq + d < 64)
+    for sq in chess.SQUARES
+], dtype=np.uint64)
+_FILES = np.array(chess.BB_FILES, dtype=np.uint64)
+_POPCOUNT8 = np.array([bin(i).count("1") for i in range(256)], dtype=np.int64)
+
+
+def _popcount(x):
+    """Number of set bits of every element of a uint64 array."""
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(x).astype(np.int64)
+    x = np.ascontiguousarray(x, dtype="<u8")
+    return _POPCOUNT8[x.view(np.uint8)].reshape(x.shape + (8,)).sum(axis=-1)
+
+
+def pack_boards(boards):
+    """
+    Pack positions into piece bitboards.
+
+    Args:
+        boards (iterable of chess.Board): The positions.
+
+    Returns:
+        np.ndarray: (N, 12) uint64 array; columns follow PACKED_PIECES.
+    """
+    rows = []
+    for board in boards:
+        black, white = board.occupied_co
+        masks = (board.pawns, board.knights, board.bishops, board.rooks, board.queens, board.kings)
+        rows.append([m & white for m in masks] + [m & black for m in masks])
+    return np.array(rows, dtype=np.uint64).reshape(-1, 12)
+
+
+def evaluate_bitboards(bitboards, piece_values=None, center_squares=None, center_bonus=0.1):
+    """
+    Engine's built-in static evaluation (material, centre control, king safety,
+    doubled pawns) of packed positions, from White's point of view. Game end is
+    not detected.
+
+    Args:
+        bitboards (np.ndarray): (N, 12) uint64 array from pack_boards.
+        piece_values (dict): Value of each piece type; PIECE_VALUES if None.
+        center_squares (list): Centre squares; CENTER_SQUARES if None.
+        center_bonus (float): Bonus per piece standing on a centre square.
+
+    Returns:
+        np.ndarray: (N,) float64 scores.
+    """
+    piece_values = piece_values or PIECE_VALUES
+    center_squares = CENTER_SQUARES if center_squares is None else center_squares
+    bitboards = np.asarray(bitboards, dtype=np.uint64)
+    white_pieces, black_pieces = bitboards[:, :6], bitboards[:, 6:]
+    zero = np.uint64(0)
+
+    # Material (piece values are exact binary fractions, so the order does not matter)
+    counts = _popcount(bitboards)
+    values = np.array([piece_values.get(pt, 0) for pt in chess.PIECE_TYPES], dtype=np.float64)
+    material = counts[:, :6] @ values - counts[:, 6:] @ values
+
+    white = np.bitwise_or.reduce(white_pieces, axis=1)
+    black = np.bitwise_or.reduce(black_pieces, axis=1)
+
+    # Centre control, square by square as in the scalar loop
+    center = np.zeros(len(bitboards))
+    for sq in center_squares:
+        bit = np.uint64(1 << sq)
+        center = center + np.where((white & bit) != zero, center_bonus,
+                                   np.where((black & bit) != zero, -center_bonus, 0.0))
+
+    # King safety: neighbour squares not occupied by the enemy, 0.05 each
+    king_safety = np.zeros(len(bitboards))
+    for king, enemy, sign in ((white_pieces[:, 5], black, 1), (black_pieces[:, 5], white, -1)):
+        has_king = king != zero
+        king_square = np.log2(np.where(has_king, king, np.uint64(1)).astype(np.float64)).astype(np.int64)
+        safe = _popcount(_KING_NEIGHBORS[king_square] & ~enemy)
+        term = np.where(has_king, safe * 0.05, 0.0)
+        king_safety = king_safety + term if sign > 0 else king_safety - term
+
+    # Doubled pawns, file by file
+    pawns = np.zeros(len(bitboards))
+    for f in range(8):
+        w_count = _popcount(white_pieces[:, 0] & _FILES[f])
+        b_count = _popcount(black_pieces[:, 0] & _FILES[f])
+        pawns = pawns - np.where(w_count > 1, 0.1 * (w_count - 1), 0.0)
+        pawns = pawns + np.where(b_count > 1, 0.1 * (b_count - 1), 0.0)
+
+    return material + center + king_safety + pawns
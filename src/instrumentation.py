@@ -0,0 +1,169 @@
+import cProfile
+import pstats
+import time
+
+# Phases the search time is split into; "search" is everything not in another phase
+PHASES = ("search", "movegen", "ordering", "evaluation")
+# Beta cutoffs by the index of the move that caused them; the last bucket holds all later moves
+CUTOFF_BUCKETS = 16
+# Functions listed in the profile of a search
+PROFILE_ENTRIES = 20
+
+
+class SearchInstrumentation:
+    """
+    Counters and phase timers for one search of the Engine, switched on with
+    Engine(instrument=True).
+
+    The engine's hot functions are not changed: while a search runs, the
+    move generation of its board, the move picker and the evaluation are
+    shadowed by instance attributes that time each call with
+    time.perf_counter_ns and hand the time to their phase. Nested calls (move
+    generation inside the move picker) are counted exclusively, so the phase
+    times add up to the search time. With instrumentation off none of this is
+    installed and the search runs its plain methods.
+
+    With profile=True the search also runs under cProfile, and the functions
+    with the most internal time are reported.
+    """
+
+    def __init__(self, profile=False):
+        """
+        Args:
+            profile (bool): Also profile every search with cProfile.
+        """
+        self.profile = profile
+        self.attached = False
+        self.reset()
+
+    def reset(self):
+        """Clear all counters before a new search."""
+        self.tt_cutoffs = 0
+        self.beta_cutoffs = [0] * CUTOFF_BUCKETS
+        self.calls = dict.fromkeys(PHASES[1:], 0)
+        self.phase_ns = dict.fromkeys(PHASES, 0)
+        self.iterations = []
+        self.profile_entries = []
+        self._phase = "search"
+        self._phase_stack = []
+        self._mark = time.perf_counter_ns()
+        self._profiler = None
+
+    def record_tt_cutoff(self):
+        self.tt_cutoffs += 1
+
+    def record_beta_cutoff(self, index: int):
+        """A beta cutoff by the move at this index of the node's move order."""
+        self.beta_cutoffs[min(index, CUTOFF_BUCKETS - 1)] += 1
+
+    def record_iteration(self, depth: int, seconds: float, nodes: int):
+        """A completed iteration of the iterative deepening."""
+        self.iterations.append({"depth": depth, "time": seconds, "nodes": nodes})
+
+    def _enter(self, phase: str):
+        now = time.perf_counter_ns()
+        self.phase_ns[self._phase] += now - self._mark
+        self._phase_stack.append(self._phase)
+        self._phase = phase
+        self._mark = now
+
+    def _leave(self):
+        now = time.perf_counter_ns()
+        self.phase_ns[self._phase] += now - self._mark
+        self._phase = self._phase_stack.pop()
+        self._mark = now
+
+    def timed(self, phase: str, function):
+        """Wrap a function so that its calls count, and their time goes, to phase."""
+        enter, leave, calls = self._enter, self._leave, self.calls
+
+        def wrapper(*args, **kwargs):
+            calls[phase] += 1
+            enter(phase)
+            try:
+                return function(*args, **kwargs)
+            finally:
+                leave()
+        return wrapper
+
+    def timed_generator(self, phase: str, function):
+        """As timed, for a generator function: the time of producing each item goes to phase."""
+        enter, leave, calls = self._enter, self._leave, self.calls
+
+        def wrapper(*args, **kwargs):
+            calls[phase] += 1
+            iterator = function(*args, **kwargs)
+            while True:
+                enter(phase)
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+                finally:
+                    leave()
+                yield item
+        return wrapper
+
+    def instrument_board(self, board):
+        """Time the legal move generation of a search board (the board's own methods are shadowed)."""
+        for name in ("generate_legal_moves", "generate_legal_captures"):
+            setattr(board, name, self.timed_generator("movegen", getattr(board, name)))
+        board.is_legal = self.timed("movegen", board.is_legal)
+        return board
+
+    def attach(self, engine, board):
+        """
+        Start counting a search: reset the counters and install the timers on
+        the engine.
+
+        Returns:
+            chess.Board: A copy of board with timed move generation, to search instead.
+        """
+        self.reset()
+        engine._evaluate_incremental = self.timed("evaluation", engine._evaluate_incremental)
+        engine._quiescence_moves = self.timed("ordering", engine._quiescence_moves)
+        engine.move_orderer.pick_moves = self.timed_generator("ordering", engine.move_orderer.pick_moves)
+        self.attached = True
+        if self.profile:
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        return self.instrument_board(board.copy())
+
+    def detach(self, engine):
+        """End the search: remove the timers, so the engine runs its plain methods again."""
+        del engine._evaluate_incremental
+        del engine._quiescence_moves
+        del engine.move_orderer.pick_moves
+        self.attached = False
+        now = time.perf_counter_ns()
+        self.phase_ns[self._phase] += now - self._mark
+        self._mark = now
+        if self._profiler is not None:
+            self._profiler.disable()
+            stats = pstats.Stats(self._profiler)
+            entries = sorted(stats.stats.items(), key=lambda item: item[1][2], reverse=True)
+            self.profile_entries = [
+                {"function": "%s:%d(%s)" % function, "calls": total_calls,
+                 "time": internal_time, "cumulative_time": cumulative_time}
+                for function, (_, total_calls, internal_time, cumulative_time, _) in entries[:PROFILE_ENTRIES]]
+            self._profiler = None
+
+    def statistics(self):
+        """
+        Returns:
+            dict: The counters: "tt_cutoffs", "beta_cutoffs" (by move index),
+            "first_move_cutoff_rate", "calls" and "time" (seconds) per phase,
+            "iterations" and, when profiling, "profile".
+        """
+        total_cutoffs = sum(self.beta_cutoffs)
+        statistics = {
+            "tt_cutoffs": self.tt_cutoffs,
+            "beta_cutoffs": list(self.beta_cutoffs),
+            "first_move_cutoff_rate": self.beta_cutoffs[0] / total_cutoffs if total_cutoffs else 0.0,
+            "calls": dict(self.calls),
+            "time": {phase: ns / 1e9 for phase, ns in self.phase_ns.items()},
+            "iterations": list(self.iterations),
+        }
+        if self.profile:
+            statistics["profile"] = list(self.profile_entries)
+        return statistics
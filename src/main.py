@@ -0,0 +1,251 @@
+import sys
+import threading
+import chess
+from src.engine import Engine
+from src.time_manager import TimeManager
+
+ENGINE_NAME = "Chess Bot"
+ENGINE_AUTHOR = "Chess Bot Project"
+
+
+class UCIServer:
+    """
+    UCI protocol front-end for the Engine.
+
+    Commands are read line by line on the calling thread, while "go" searches
+    run on a worker thread, so "stop", "isready" and "ponderhit" are answered
+    at once. Every completed iteration is reported as an "info" line.
+
+    The engine is created for White and never changes colour, so its scores
+    are from White's view; they are turned to the side to move's view for
+    output.
+    """
+
+    DEFAULT_HASH_MB = 16
+    MAX_HASH_MB = 4096
+    MAX_THREADS = 64
+    # Depth used when "go" does not limit it
+    MAX_DEPTH = 64
+
+    def __init__(self, input_stream=None, output_stream=None):
+        """
+        Args:
+            input_stream (file): Where commands come from (stdin by default).
+            output_stream (file): Where responses go (stdout by default).
+        """
+        self.input_stream = input_stream or sys.stdin
+        self.output_stream = output_stream or sys.stdout
+        self.hash_mb = self.DEFAULT_HASH_MB
+        self.threads = 1
+        self.engine = None
+        self.board = chess.Board()
+        self._output_lock = threading.Lock()
+        self._search_thread = None
+        self._search_board = None
+        self._time_manager = None
+        self._clock = None
+        # Set when the GUI allows the result of an infinite or ponder search to be sent
+        self._release = threading.Event()
+
+    def send(self, line: str):
+        with self._output_lock:
+            self.output_stream.write(line + "\n")
+            self.output_stream.flush()
+
+    def _engine(self):
+        if self.engine is None:
+            self.engine = Engine(color_is_white=True, hash_mb=self.hash_mb, threads=self.threads)
+            self.engine.info_callback = self._send_info
+        return self.engine
+
+    def _close_engine(self):
+        self._stop_search()
+        if self.engine is not None:
+            self.engine.close()
+            self.engine = None
+
+    def run(self):
+        """Read and handle commands until "quit" or the end of the input."""
+        for line in self.input_stream:
+            if not self.handle(line):
+                break
+        self._close_engine()
+
+    def handle(self, line: str):
+        """
+        Handle one command line.
+
+        Returns:
+            bool: False once the server should exit.
+        """
+        tokens = line.split()
+        if not tokens:
+            return True
+        command, args = tokens[0], tokens[1:]
+        if command == "uci":
+            self.send("id name %s" % ENGINE_NAME)
+            self.send("id author %s" % ENGINE_AUTHOR)
+            self.send("option name Hash type spin default %d min 1 max %d" % (self.DEFAULT_HASH_MB, self.MAX_HASH_MB))
+            self.send("option name Threads type spin default 1 min 1 max %d" % self.MAX_THREADS)
+            self.send("option name Ponder type check default false")
+            self.send("uciok")
+        elif command == "isready":
+            self.send("readyok")
+        elif command == "setoption":
+            self._set_option(args)
+        elif command == "ucinewgame":
+            self._stop_search()
+            if self.engine is not None:
+                self.engine.transposition_table.clear()
+            self.board = chess.Board()
+        elif command == "position":
+            self._stop_search()
+            self._set_position(args)
+        elif command == "go":
+            self._stop_search()
+            self._go(args)
+        elif command == "stop":
+            self._stop_search()
+        elif command == "ponderhit":
+            self._ponder_hit()
+        elif command == "quit":
+            return False
+        return True
+
+    def _set_option(self, args):
+        """setoption name <name> value <value>"""
+        if "name" not in args:
+            return
+        value_index = args.index("value") if "value" in args else len(args)
+        name = " ".join(args[args.index("name") + 1:value_index]).lower()
+        value = " ".join(args[value_index + 1:])
+        try:
+            if name == "hash":
+                self.hash_mb = min(max(1, int(value)), self.MAX_HASH_MB)
+                self._close_engine()
+            elif name == "threads":
+                self.threads = min(max(1, int(value)), self.MAX_THREADS)
+                self._close_engine()
+        except ValueError:
+            self.send("info string invalid value for %s: %s" % (name, value))
+
+    def _set_position(self, args):
+        """position [startpos | fen <fen>] [moves <move>...]"""
+        moves_index = args.index("moves") if "moves" in args else len(args)
+        try:
+            if args and args[0] == "fen":
+                board = chess.Board(" ".join(args[1:moves_index]))
+            else:
+                board = chess.Board()
+            for uci in args[moves_index + 1:]:
+                board.push_uci(uci)
+        except ValueError as error:
+            self.send("info string invalid position: %s" % error)
+            return
+        self.board = board
+
+    def _go(self, args):
+        """go [wtime/btime/winc/binc/movestogo/movetime/depth/nodes <n>] [infinite] [ponder]"""
+        options = {}
+        flags = set()
+        index = 0
+        while index < len(args):
+            if args[index] in ("infinite", "ponder"):
+                flags.add(args[index])
+                index += 1
+            elif index + 1 < len(args):
+                try:
+                    options[args[index]] = int(args[index + 1])
+                except ValueError:
+                    pass
+                index += 2
+            else:
+                index += 1
+
+        if self.board.turn == chess.WHITE:
+            time_left, increment = options.get("wtime"), options.get("winc", 0)
+        else:
+            time_left, increment = options.get("btime"), options.get("binc", 0)
+        if "movetime" in options:
+            self._clock = {"move_time": options["movetime"] / 1000.0}
+        elif time_left is not None:
+            self._clock = {"time_left": time_left / 1000.0, "increment": increment / 1000.0,
+                           "moves_to_go": options.get("movestogo")}
+        else:
+            self._clock = {}
+
+        self._time_manager = TimeManager()
+        if flags:
+            # No limit until "stop", or "ponderhit" brings in the clock
+            self._time_manager.start()
+            self._release.clear()
+        else:
+            self._time_manager.start(**self._clock)
+            self._release.set()
+        self._search_board = self.board.copy()
+        self._search_thread = threading.Thread(
+            target=self._search, args=(self._engine(), self._search_board, options.get("depth", self.MAX_DEPTH),
+                                       options.get("nodes"), self._time_manager),
+            daemon=True)
+        self._search_thread.start()
+
+    def _search(self, engine: Engine, board: chess.Board, depth: int, node_limit, time_manager: TimeManager):
+        """Worker thread: search, then send the best move once the GUI allows it."""
+        move, _, _ = engine.find_best_move_with_stats(board, depth, time_manager=time_manager,
+                                                      node_limit=node_limit)
+        # UCI: the result of an infinite or ponder search waits for "stop" or "ponderhit"
+        self._release.wait()
+        if move is None:
+            self.send("bestmove 0000")
+            return
+        pv = engine.principal_variation
+        if len(pv) > 1 and pv[0] == move:
+            self.send("bestmove %s ponder %s" % (move.uci(), pv[1].uci()))
+        else:
+            self.send("bestmove %s" % move.uci())
+
+    def _stop_search(self):
+        """Stop a running search and wait until its best move has been sent."""
+        if self._search_thread is None:
+            return
+        # The stop signal may be reset if the search is only starting; the
+        # time manager's zero budget stops it regardless
+        self._time_manager.restart(move_time=0.0)
+        if self.engine is not None:
+            self.engine.stop()
+        self._release.set()
+        self._search_thread.join()
+        self._search_thread = None
+
+    def _ponder_hit(self):
+        """The expected move was played: the ponder search continues with the real clock."""
+        if self._search_thread is None:
+            return
+        self._time_manager.restart(**self._clock)
+        self._release.set()
+
+    def _send_info(self, stats, seconds):
+        """Report a completed iteration."""
+        nodes = stats["nodes_searched"] + stats["quiescence_nodes"]
+        board = self._search_board
+        # Engine scores are from White's view
+        score = stats["score"] if board.turn == chess.WHITE else -stats["score"]
+        pv = stats["principal_variation"]
+        if abs(score) >= Engine.MATE_BOUND:
+            # The score holds the distance to mate in plies; UCI counts moves
+            mate = (Engine.MATE_SCORE - round(abs(score)) + 1) // 2
+            score_text = "mate %d" % (mate if score > 0 else -mate)
+        else:
+            score_text = "cp %d" % round(score * 100)
+        self.send("info depth %d score %s nodes %d nps %d time %d pv %s"
+                  % (stats["depth"], score_text, nodes, nodes / seconds if seconds > 0 else 0,
+                     seconds * 1000, " ".join(pv)))
+
+
+def main():
+    """Run the UCI server on stdin and stdout: python -m src.main"""
+    UCIServer().run()
+
+
+if __name__ == "__main__":
+    main()
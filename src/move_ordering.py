@@ -0,0 +1,148 @@
+import chess
+
+
+# Rough piece values used to tell winning from losing captures
+_EXCHANGE_VALUES = (0, 100, 300, 325, 500, 900, 10000)
+
+
+class MoveOrderer:
+    """
+    Move ordering for the alpha-beta search.
+
+    pick_moves tries moves in this order:
+        - The transposition table / principal variation move
+        - Winning captures and promotions, most valuable victim / least valuable attacker first
+        - The two killer moves of the current ply (quiet moves that caused a cutoff)
+        - Quiet checks
+        - Other quiet moves by their butterfly history score
+        - Losing captures
+
+    Each group of moves is only generated when the previous ones have been
+    searched without a cutoff.
+    """
+
+    CHECK_SCORE = 1 << 26
+    MAX_PLY = 128
+
+    def __init__(self):
+        self.killers = [[None, None] for _ in range(self.MAX_PLY)]
+        # Butterfly history indexed by [color][from_square * 64 + to_square]
+        self.history = [[0] * 4096, [0] * 4096]
+
+    def new_search(self):
+        """Forget killers and age the history scores before a new search."""
+        for slots in self.killers:
+            slots[0] = slots[1] = None
+        for table in self.history:
+            for i in range(4096):
+                table[i] >>= 1
+
+    def mvv_lva(self, board: chess.Board, move: chess.Move):
+        """
+        Score a capture or promotion: victim value first, then cheaper attackers.
+        Piece types are used as values (pawn=1 ... queen=5).
+        """
+        if board.is_en_passant(move):
+            victim = chess.PAWN
+        else:
+            victim = board.piece_type_at(move.to_square) or 0
+        score = victim * 8 - board.piece_type_at(move.from_square)
+        if move.promotion:
+            score += move.promotion * 8
+        return score
+
+    def is_losing_capture(self, board: chess.Board, move: chess.Move):
+        """
+        A capture loses material if the attacker is worth more than the victim
+        and the target square is defended.
+        """
+        if move.promotion:
+            return False
+        victim = chess.PAWN if board.is_en_passant(move) else board.piece_type_at(move.to_square)
+        attacker = board.piece_type_at(move.from_square)
+        if _EXCHANGE_VALUES[victim] >= _EXCHANGE_VALUES[attacker]:
+            return False
+        return board.is_attacked_by(not board.turn, move.to_square)
+
+    def pick_moves(self, board: chess.Board, ply: int, tt_move=None):
+        """
+        Yield the legal moves of a position lazily, in stages:
+        TT move, winning captures and promotions, killers, quiet moves by
+        history, losing captures. A stage is only generated once the search
+        asks for a move past the previous one, so nodes that cut off early
+        never generate or sort the quiet moves.
+
+        The board must be in the same position whenever the next move is requested.
+
+        Args:
+            board (chess.Board): The position.
+            ply (int): Distance from the root, used for the killer slots.
+            tt_move (chess.Move): Best move from the transposition table, if any.
+
+        Yields:
+            chess.Move: Legal moves, most promising first.
+        """
+        if tt_move is not None and board.is_legal(tt_move):
+            yield tt_move
+        else:
+            tt_move = None
+
+        # Captures (including en passant) and promotions
+        captures = list(board.generate_legal_captures())
+        captures.extend(board.generate_legal_moves(board.pawns, chess.BB_BACKRANKS & ~board.occupied))
+        winning, losing = [], []
+        for move in captures:
+            if move == tt_move:
+                continue
+            if self.is_losing_capture(board, move):
+                losing.append((self.mvv_lva(board, move), move))
+            else:
+                winning.append((self.mvv_lva(board, move), move))
+        winning.sort(key=lambda x: x[0], reverse=True)
+        for _, move in winning:
+            yield move
+
+        killers = self.killers[ply] if ply < self.MAX_PLY else (None, None)
+        for killer in killers:
+            if (killer is not None and killer != tt_move and not killer.promotion
+                    and not board.is_capture(killer) and board.is_legal(killer)):
+                yield killer
+
+        history = self.history[board.turn]
+        ep_square = board.ep_square
+        quiets = []
+        for move in board.generate_legal_moves(chess.BB_ALL, chess.BB_ALL & ~board.occupied_co[not board.turn]):
+            if (move.promotion or move == tt_move or move == killers[0] or move == killers[1]
+                    or (move.to_square == ep_square and board.is_en_passant(move))):
+                continue
+            score = history[move.from_square * 64 + move.to_square]
+            if board.gives_check(move):
+                score += self.CHECK_SCORE
+            quiets.append((score, move))
+        quiets.sort(key=lambda x: x[0], reverse=True)
+        for _, move in quiets:
+            yield move
+
+        losing.sort(key=lambda x: x[0], reverse=True)
+        for _, move in losing:
+            yield move
+
+    def record_cutoff(self, board: chess.Board, move: chess.Move, ply: int, depth: int):
+        """
+        Update killers and history after a move caused a beta cutoff.
+        Captures and promotions are already ordered well and are not recorded.
+        """
+        if move.promotion or board.is_capture(move):
+            return
+        if ply < self.MAX_PLY:
+            killers = self.killers[ply]
+            if killers[0] != move:
+                killers[1] = killers[0]
+                killers[0] = move
+        table = self.history[board.turn]
+        index = move.from_square * 64 + move.to_square
+        table[index] += depth * depth
+        if table[index] >= self.CHECK_SCORE:
+            # Keep history below the check bonus
+            for i in range(4096):
+                table[i] >>= 1
@@ -1,6 +1,8 @@
 import time
 from src.rules import Rules
+from src.book import OpeningBook
 from src.engine import Engine
+from src.time_manager import TimeManager
 
 class Player:
     """
@@ -10,7 +12,11 @@ class Player:
     It also manages time and stores search statistics.
     """
 
-    def __init__(self, name, player_type, color, rules=None, time_limit=600.0):
+    # Depth cap for bot moves; the time manager normally stops the search first
+    MAX_SEARCH_DEPTH = 64
+
+    def __init__(self, name, player_type, color, rules=None, time_limit=600.0, hash_mb=16,
+                 increment=0.0, moves_to_go=None, ponder=False, book_path=None, book_mode="weighted"):
         """
         Initialize a Player instance.
 
@@ -20,6 +26,13 @@ class Player:
             color (str): "white" or "black".
             rules (Rules): A Rules object managing the board. If None, a new one is created.
             time_limit (float): The initial time in seconds for this player.
+            hash_mb (float): Transposition table size in megabytes for a bot's engine.
+            increment (float): Seconds added to the clock after each move.
+            moves_to_go (int): Moves per time control period (e.g. 40 for "40 moves in
+                2 hours"), or None for sudden death.
+            ponder (bool): Whether a bot keeps searching the expected reply on the opponent's time.
+            book_path (str): Polyglot opening book for a bot, consulted before searching.
+            book_mode (str): "weighted" (random in proportion to the weights) or "best".
         """
         self.name = name
         self.player_type = player_type
@@ -27,47 +40,53 @@ class Player:
         self.rules = rules if rules else Rules()
         self.moves_history = []
         self.time_left = time_limit
+        self.increment = increment
+        self.moves_to_go = moves_to_go
+        self.ponder = ponder
         self._timer_start = None
 
         if self.player_type == "bot":
             color_is_white = (self.color == "white")
-            self.engine = Engine(color_is_white=color_is_white)
+            self.engine = Engine(color_is_white=color_is_white, hash_mb=hash_mb)
+            self.time_manager = TimeManager()
+            self.book = OpeningBook(book_path) if book_path else None
         else:
             self.engine = None
+            self.time_manager = None
+            self.book = None
+        self.book_mode = book_mode
 
-        # Store move statistics: list of dicts with "move", "time_taken", "depth", "nodes_searched"
+        # Store move statistics: list of dicts with "move", "time_taken", "depth_used", "nodes_searched", "ponder_hit", "book_move"
         self.move_statistics = []
 
     def start_timer(self):
         """Start timing the current move."""
         self._timer_start = time.time()
 
-    def stop_timer(self):
-        """Stop timing and update remaining time."""
+    def stop_timer(self, add_increment=False):
+        """
+        Stop timing and update remaining time.
+
+        Args:
+            add_increment (bool): Whether a move was completed, so the increment is added.
+
+        Returns:
+            float: The seconds elapsed since start_timer.
+        """
+        elapsed = 0.0
         if self._timer_start is not None:
             elapsed = time.time() - self._timer_start
             self.time_left -= elapsed
             self._timer_start = None
+            if add_increment:
+                self.time_left += self.increment
+        return elapsed
 
-    def _choose_depth_based_on_time(self):
-        """
-        Choose search depth based on remaining time:
-            - time < 5s => depth = 1
-            - 5s <= time <= 30s => depth = 2
-            - 30s < time <= 100s => depth = 3
-            - time > 100s => depth = 4
-
-        Returns:
-            int: The chosen depth.
-        """
-        if self.time_left < 5:
-            return 1
-        elif self.time_left <= 30:
-            return 2
-        elif self.time_left <= 100:
-            return 3
-        else:
-            return 4
+    def _moves_until_time_control(self):
+        """Moves left in the current time control period, or None for sudden death."""
+        if not self.moves_to_go:
+            return None
+        return self.moves_to_go - len(self.moves_history) % self.moves_to_go
 
     def make_move(self, move_uci=None):
         """
@@ -92,15 +111,36 @@ class Player:
             success = self.rules.apply_move(move_uci)
             if success:
                 self.moves_history.append(move_uci)
-            self.stop_timer()
+            self.stop_timer(add_increment=success)
             return success
         else:
-            # Bot player
-            depth = self._choose_depth_based_on_time()
-            # We'll allow engine the remaining time for iterative deepening
-            time_for_move = self.time_left  # Engine can use all remaining time for this move if needed
-
-            best_move, nodes, search_time = self.engine.find_best_move_with_stats(self.rules.board, depth, time_for_move)
+            book_move = self.book.choose_move(self.rules.board, self.book_mode) if self.book else None
+            if book_move is not None:
+                # Book moves cost no search time; a ponder search on this position is useless
+                self.engine.stop_pondering()
+                self.rules.board.push(book_move)
+                self.moves_history.append(book_move.uci())
+                move_time = self.stop_timer(add_increment=True)
+                self.move_statistics.append({
+                    "move": book_move.uci(),
+                    "time_taken": move_time,
+                    "depth_used": 0,
+                    "nodes_searched": 0,
+                    "ponder_hit": False,
+                    "book_move": True
+                })
+                return True
+
+            # Bot player: the time manager splits the clock into a budget for this move
+            moves_to_go = self._moves_until_time_control()
+            ponder_hit = self.engine.is_ponder_hit(self.rules.board)
+            if ponder_hit:
+                # The background search already ran on the opponent's time
+                best_move, nodes, _ = self.engine.ponder_hit(self.time_left, self.increment, moves_to_go)
+            else:
+                self.time_manager.start(self.time_left, self.increment, moves_to_go)
+                best_move, nodes, _ = self.engine.find_best_move_with_stats(
+                    self.rules.board, self.MAX_SEARCH_DEPTH, time_manager=self.time_manager)
 
             if best_move is None:
                 # No moves found or game over
@@ -109,32 +149,37 @@ class Player:
 
             self.rules.board.push(best_move)
             self.moves_history.append(best_move.uci())
-
-            # Store stats: time taken for this move is (start->stop_timer), nodes searched, depth used
-            elapsed = (time.time() - (time.time() - self.time_left)) if self._timer_start is None else 0.0
-            # Actually, we have better approach:
-            # We know stop_timer will recalc time_left, so let's just measure after stop_timer
-            self.stop_timer()
-            move_time = self.time_left if self._timer_start is None else 0.0
-            # Actually, to get the exact move_time, we should do:
-            # We started timer at self._timer_start, we can do:
-            move_time = 0.0
-            if self._timer_start is not None:
-                elapsed_now = time.time() - self._timer_start
-                move_time = elapsed_now
-            else:
-                # If we ended timer above, we must recalculate
-                move_time = search_time
+            move_time = self.stop_timer(add_increment=True)
 
             self.move_statistics.append({
                 "move": best_move.uci(),
                 "time_taken": move_time,
-                "depth_used": depth,
-                "nodes_searched": nodes
+                "depth_used": self.engine.completed_depth,
+                "nodes_searched": nodes,
+                "ponder_hit": ponder_hit,
+                "book_move": False
             })
 
+            principal_variation = self.engine.principal_variation
+            if (self.ponder and len(principal_variation) > 1 and principal_variation[0] == best_move
+                    and self.rules.board.is_legal(principal_variation[1])):
+                self.engine.start_pondering(self.rules.board, principal_variation[1], self.MAX_SEARCH_DEPTH)
+
             return True
 
+    def stop_pondering(self):
+        """Stop a bot's background search, e.g. when the game ends."""
+        if self.engine is not None:
+            self.engine.stop_pondering()
+
+    def close(self):
+        """Stop pondering and release the engine's resources and the opening book."""
+        if self.engine is not None:
+            self.engine.close()
+        if self.book is not None:
+            self.book.close()
+            self.book = None
+
     def get_moves_history(self):
         """Return the moves made by this player."""
         return self.moves_history
@@ -145,5 +190,6 @@ class Player:
         - Time taken per move
         - Depth used
         - Nodes searched
+        - Whether the move came from a ponder hit or the opening book
         """
         return self.move_statistics
@@ -0,0 +1,121 @@
+import multiprocessing
+import queue
+import chess
+from src.time_manager import TimeManager
+from src.transposition import TranspositionTable
+
+
+def _helper_main(index, options, table_name, hash_mb, stop_signal, jobs, results):
+    """
+    Entry point of a helper process: wait for root positions and search them
+    with the shared transposition table until told to stop.
+    """
+    from src.engine import Engine
+
+    table = TranspositionTable.attach_shared(table_name, hash_mb)
+    engine = Engine(transposition_table=table, **options)
+    engine._stop_signal = stop_signal
+    try:
+        while True:
+            job = jobs.get()
+            if job is None:
+                break
+            search_id, fen, moves, max_depth, time_limit, generation = job
+            board = chess.Board(fen)
+            for uci in moves:
+                board.push_uci(uci)
+            table.generation = generation
+            time_manager = TimeManager()
+            time_manager.start(move_time=time_limit)
+            # Odd helpers aim one ply deeper so the processes diverge
+            _, nodes, _ = engine._iterative_deepening(board, max_depth + index % 2, time_manager, new_generation=False)
+            pv = [move.uci() for move in engine.principal_variation]
+            results.put((search_id, engine.completed_depth, engine.best_score, pv, nodes))
+    finally:
+        table.close()
+
+
+class HelperPool:
+    """
+    Helper processes for Lazy SMP. Each helper owns an Engine attached to the
+    main engine's shared transposition table; all of them watch one shared
+    stop flag.
+    """
+
+    def __init__(self, engine, count):
+        """
+        Args:
+            engine (Engine): The main engine; its options and shared table are used.
+            count (int): Number of helper processes.
+        """
+        options = {
+            "color_is_white": engine.color_is_white,
+            "quiescence_checks": engine.quiescence_checks,
+            "null_move": engine.null_move,
+            "late_move_reductions": engine.late_move_reductions,
+            "futility_pruning": engine.futility_pruning,
+            "razoring": engine.razoring,
+            # Helpers must score positions like the main process, since they share its table
+            "evaluator": engine.evaluator,
+            "bitbases": engine.bitbases.copy() if engine.bitbases is not None else None,
+        }
+        table = engine.transposition_table
+        if table.shared_name is None:
+            raise ValueError("Parallel search needs a shared transposition table.")
+        # Sent to every helper process, so everything in it must be picklable
+        self.options = options
+
+        self.stop_signal = multiprocessing.RawArray('b', 1)
+        self._results = multiprocessing.Queue()
+        self._jobs = []
+        self._processes = []
+        self._search_id = 0
+        for index in range(1, count + 1):
+            jobs = multiprocessing.Queue()
+            process = multiprocessing.Process(
+                target=_helper_main,
+                args=(index, options, table.shared_name, table.hash_mb, self.stop_signal, jobs, self._results),
+                daemon=True,
+            )
+            process.start()
+            self._jobs.append(jobs)
+            self._processes.append(process)
+
+    def start(self, board: chess.Board, max_depth: int, time_limit: float, generation: int):
+        """Send the root position to every helper."""
+        self._search_id += 1
+        root = board.root()
+        moves = [move.uci() for move in board.move_stack]
+        job = (self._search_id, root.fen(), moves, max_depth, time_limit, generation)
+        for jobs in self._jobs:
+            jobs.put(job)
+
+    def collect(self, timeout=5.0):
+        """
+        Wait for the helpers to report after the stop flag has been set.
+
+        Returns:
+            list: (completed_depth, score, principal_variation, nodes) per helper.
+        """
+        collected = []
+        while len(collected) < len(self._jobs):
+            try:
+                search_id, depth, score, pv, nodes = self._results.get(timeout=timeout)
+            except queue.Empty:
+                break
+            # Late reports from an earlier search are dropped
+            if search_id == self._search_id:
+                collected.append((depth, score, pv, nodes))
+        return collected
+
+    def close(self):
+        """Stop and join the helper processes."""
+        self.stop_signal[0] = 1
+        for jobs in self._jobs:
+            jobs.put(None)
+        for process in self._processes:
+            process.join(timeout=5.0)
+            if process.is_alive():
+                process.terminate()
+        self._jobs = []
+        self._processes = []
@@ -0,0 +1,94 @@
+import json
+import multiprocessing.pool
+import os
+import tempfile
+import unittest
+from unittest import mock
+from src.analysis import read_positions, analyse_file
+from src.engine import Engine
+
+POSITIONS = """\
+# A comment line
+6k1/5ppp/8/8/8/8/5PPP/3R2K1 w - - id "back rank";
+r1bqkb1r/pppp1ppp/2n2n2/4p3/2B1P3/5N2/PPPP1PPP/RNBQK2R w KQkq - 4 4
+7k/5Q2/6K1/8/8/8/8/8 b - - 0 1
+not a position
+rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR b KQkq - 0 1
+"""
+
+
+class TestAnalysis(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.input = os.path.join(self.directory.name, "positions.epd")
+        self.output = os.path.join(self.directory.name, "results.jsonl")
+        with open(self.input, "w") as f:
+            f.write(POSITIONS)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def results(self):
+        with open(self.output) as f:
+            return {result["id"]: result for result in map(json.loads, f)}
+
+    def test_read_positions(self):
+        positions = list(read_positions(self.input))
+        self.assertEqual([position_id for position_id, _ in positions], ["back rank", "3", "4", "5", "6"])
+        self.assertIsNone(positions[3][1])
+        self.assertTrue(positions[1][1].endswith("w KQkq - 4 4"))
+
+    def test_analyse_file(self):
+        self.assertEqual(analyse_file(self.input, self.output, processes=2, depth=2), 5)
+        results = self.results()
+        self.assertEqual(results["back rank"]["bestmove"], "d1d8")
+        self.assertGreater(results["back rank"]["score"], 100)
+        # Stalemate: no move, and the score is from the side to move's view
+        self.assertIsNone(results["4"]["bestmove"])
+        self.assertEqual(results["4"]["score"], 0)
+        self.assertEqual(results["5"]["error"], "invalid position")
+        for key in ("depth", "nodes", "time", "pv"):
+            self.assertIn(key, results["3"])
+
+    def test_failing_position(self):
+        search = Engine.find_best_move_with_stats
+
+        def failing_search(engine, board, *args, **kwargs):
+            if board.fullmove_number == 4:
+                raise RuntimeError("search failed")
+            return search(engine, board, *args, **kwargs)
+
+        # The workers are forked with the failing search
+        with mock.patch.object(Engine, "find_best_move_with_stats", failing_search):
+            self.assertEqual(analyse_file(self.input, self.output, processes=2, depth=1), 5)
+        results = self.results()
+        self.assertEqual(results["3"], {"id": "3", "error": "RuntimeError: search failed"})
+        self.assertEqual(results["back rank"]["bestmove"], "d1d8")
+
+    def test_failing_results_do_not_hang(self):
+        imap_unordered = multiprocessing.pool.Pool.imap_unordered
+
+        def failing_results(pool, function, iterable):
+            results = imap_unordered(pool, function, iterable)
+            next(results)
+            raise OSError("disk full")
+            yield
+
+        # The pool's task handler is waiting for a free slot when reading the results fails
+        with mock.patch.object(multiprocessing.pool.Pool, "imap_unordered", failing_results):
+            with self.assertRaises(OSError):
+                analyse_file(self.input, self.output, processes=2, depth=1, max_pending=1)
+
+    def test_resume(self):
+        with open(self.output, "w") as f:
+            f.write(json.dumps({"id": "3", "bestmove": "e1g1"}) + "\n")
+            f.write('{"id": "6", "best')
+        self.assertEqual(analyse_file(self.input, self.output, processes=1, node_limit=200, resume=True), 4)
+        # The unfinished line is replaced, the finished one kept
+        results = self.results()
+        self.assertEqual(sorted(results), ["3", "4", "5", "6", "back rank"])
+        self.assertEqual(results["3"], {"id": "3", "bestmove": "e1g1"})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+import random
+import unittest
+import chess
+import numpy as np
+from src.batch_moves import (
+    positions_from_fens,
+    piece_bitboards,
+    attack_maps,
+    in_check,
+    move_masks,
+    mobility,
+    SQUARE_BITS
+)
+from src.board_utils import parse_square, KING, BLACK
+
+def _random_fens(count, seed):
+    rng = random.Random(seed)
+    fens = []
+    board = chess.Board()
+    while len(fens) < count:
+        moves = list(board.legal_moves)
+        if not moves or board.ply() > 120:
+            board = chess.Board()
+            continue
+        board.push(rng.choice(moves))
+        fens.append(board.fen())
+    return fens
+
+def _board_utils_square(square):
+    """board_utils index of a python-chess square."""
+    return (7 - chess.square_rank(square)) * 8 + chess.square_file(square)
+
+class TestBatchMoves(unittest.TestCase):
+
+    def test_start_position(self):
+        positions, white_to_move = positions_from_fens([chess.STARTING_FEN])
+        self.assertEqual(positions.shape, (1, 64))
+        self.assertEqual(positions.dtype, np.int8)
+        self.assertTrue(white_to_move[0])
+        bitboards = piece_bitboards(positions)
+        self.assertEqual(int(bitboards[0, KING]), 1 << parse_square("e1"))
+        self.assertEqual(int(bitboards[0, BLACK | KING]), 1 << parse_square("e8"))
+
+        self.assertEqual(mobility(positions, True)[0], 20)
+        self.assertEqual(mobility(positions, False)[0], 20)
+        masks = move_masks(positions, True)
+        e2 = parse_square("e2")
+        self.assertEqual(int(masks[0, e2]), (1 << parse_square("e3")) | (1 << parse_square("e4")))
+        self.assertEqual(int(masks[0, parse_square("e7")]), 0)
+
+    def test_moves_match_python_chess(self):
+        fens = _random_fens(300, seed=11)
+        # Checks, double checks and pins, which random games rarely reach
+        fens += ["4k3/8/8/8/1b6/8/3N4/r3K3 w - - 0 1", "4k3/4r3/8/8/8/5n2/8/4K3 w - - 0 1",
+                 "4k3/8/8/8/8/8/8/R3K2q w - - 0 1", "8/8/8/1k6/8/3q4/2P5/1K5R w - - 0 1"]
+        positions, white_to_move = positions_from_fens(fens)
+        counts = mobility(positions, white_to_move, chunk_size=64)
+        masks = move_masks(positions, white_to_move)
+        for index, fen in enumerate(fens):
+            board = chess.Board(fen)
+            # The batch has no castling or en passant, and promotions count once
+            moves = {(_board_utils_square(move.from_square), _board_utils_square(move.to_square))
+                     for move in board.legal_moves if not board.is_castling(move) and not board.is_en_passant(move)}
+            self.assertEqual(counts[index], len(moves), fen)
+            expected = np.zeros(64, dtype=np.uint64)
+            for start, end in moves:
+                expected[start] |= SQUARE_BITS[end]
+            np.testing.assert_array_equal(masks[index], expected, fen)
+
+    def test_mobility_counts_legal_moves(self):
+        # Without castling, en passant and promotions the count is board.legal_moves.count()
+        fens = [fen for fen in _random_fens(300, seed=3)
+                if not any(board.is_castling(move) or board.is_en_passant(move) or move.promotion
+                           for board in [chess.Board(fen)] for move in board.legal_moves)]
+        positions, white_to_move = positions_from_fens(fens)
+        counts = mobility(positions, white_to_move)
+        self.assertEqual(list(counts), [chess.Board(fen).legal_moves.count() for fen in fens])
+
+    def test_attacks_and_checks_match_python_chess(self):
+        fens = _random_fens(100, seed=5)
+        positions, white_to_move = positions_from_fens(fens)
+        attacks = attack_maps(positions)
+        checks = in_check(positions, white_to_move)
+        for index, fen in enumerate(fens):
+            board = chess.Board(fen)
+            for column, color in enumerate((chess.WHITE, chess.BLACK)):
+                expected = 0
+                for square in chess.SQUARES:
+                    if board.is_attacked_by(color, square):
+                        expected |= 1 << _board_utils_square(square)
+                self.assertEqual(int(attacks[index, column]), expected, fen)
+            self.assertEqual(checks[index], board.is_check(), fen)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+import unittest
+import chess
+from src.bench import (
+    PERFT_POSITIONS,
+    SEARCH_POSITIONS,
+    perft,
+    board_utils_perft,
+    compact_perft,
+    _fen_to_grid,
+    run_perft,
+    run_search,
+    compare_results
+)
+from src.board_utils import generate_initial_board, to_compact
+
+class TestBench(unittest.TestCase):
+
+    def test_perft_counts(self):
+        # Shallow depths of the known counts, for every reference position
+        for name, fen, counts in PERFT_POSITIONS:
+            self.assertEqual(perft(chess.Board(fen), 2), counts[1], name)
+        results = run_perft(2)
+        self.assertEqual(results["python-chess"]["mismatches"], [])
+        self.assertEqual(results["board_utils_legal"]["mismatches"], [])
+
+    def test_board_utils_perft(self):
+        grid, player = _fen_to_grid(chess.STARTING_FEN)
+        self.assertEqual(grid, generate_initial_board())
+        self.assertEqual(player, "white")
+        self.assertEqual(board_utils_perft(grid, player, 2), 400)
+        # Moves are taken back
+        self.assertEqual(grid, generate_initial_board())
+
+        name, fen, _ = PERFT_POSITIONS[1]
+        grid, player = _fen_to_grid(fen)
+        squares = to_compact(grid)
+        self.assertEqual(compact_perft(squares, player, 3), board_utils_perft(grid, player, 3))
+        self.assertEqual(squares, to_compact(grid))
+
+    def test_search_positions_are_valid(self):
+        self.assertEqual(len(SEARCH_POSITIONS), 50)
+        for fen in SEARCH_POSITIONS:
+            self.assertTrue(chess.Board(fen).is_valid(), fen)
+
+    def test_run_search(self):
+        results = run_search(SEARCH_POSITIONS[:2], depth=2)
+        self.assertEqual(results["positions"], 2)
+        self.assertGreater(results["nodes"], 0)
+        self.assertEqual(set(results["time_to_depth"]), {"1", "2"})
+        self.assertLessEqual(results["time_to_depth"]["1"], results["time_to_depth"]["2"])
+        # Reproducible: the table is cleared before every position
+        self.assertEqual(run_search(SEARCH_POSITIONS[:2], depth=2)["nodes"], results["nodes"])
+
+    def test_compare_results(self):
+        baseline = {"perft": {"python-chess": {"nps": 1000.0}, "board_utils": {"nps": 1000.0}},
+                    "search": {"depth": 3, "nps": 100.0, "nodes": 5000, "tt_hit_rate": 0.3}}
+        current = {"perft": {"python-chess": {"nps": 990.0}, "board_utils": {"nps": 800.0}},
+                   "search": {"depth": 3, "nps": 120.0, "nodes": 4000, "tt_hit_rate": 0.3}}
+        comparison = {entry["metric"]: entry for entry in compare_results(current, baseline, threshold=0.05)}
+        self.assertFalse(comparison["perft.python-chess.nps"]["regression"])
+        self.assertTrue(comparison["perft.board_utils.nps"]["regression"])
+        self.assertFalse(comparison["search.nps"]["regression"])
+        # Fewer nodes is a change in the search, not a slowdown
+        self.assertAlmostEqual(comparison["search.nodes"]["change"], -0.2)
+        self.assertFalse(comparison["search.nodes"]["regression"])
+
+        # Searches to different depths are not compared
+        current["search"]["depth"] = 4
+        metrics = [entry["metric"] for entry in compare_results(current, baseline)]
+        self.assertEqual(metrics, ["perft.python-chess.nps", "perft.board_utils.nps"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+import os
+import random
+import tempfile
+import unittest
+import chess
+from src.bitbase import Bitbases, ENDGAMES, FILE_SIZE
+from src.engine import Engine
+
+class TestBitbase(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.TemporaryDirectory()
+        cls.bitbases = Bitbases(cls.directory.name)
+        # The first probe generates all the files
+        cls.bitbases.probe(chess.Board("8/8/8/8/8/8/1Q6/K6k w - - 0 1"))
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.bitbases.close()
+        cls.directory.cleanup()
+
+    def test_files(self):
+        for endgame in ENDGAMES:
+            self.assertEqual(os.path.getsize(os.path.join(self.directory.name, endgame + ".bb")), FILE_SIZE)
+        self.assertIsNone(Bitbases(tempfile.gettempdir() + "/missing", generate_missing=False).probe(
+            chess.Board("8/8/8/8/8/8/1Q6/K6k w - - 0 1")))
+
+    def test_known_results(self):
+        probe = self.bitbases.probe
+        # Checkmated and stalemated
+        self.assertEqual(probe(chess.Board("7k/7Q/6K1/8/8/8/8/8 b - - 0 1")), -1)
+        self.assertEqual(probe(chess.Board("7k/5Q2/6K1/8/8/8/8/8 b - - 0 1")), 0)
+        # A hanging rook is taken
+        self.assertEqual(probe(chess.Board("8/8/8/8/8/3k4/1r6/K7 w - - 0 1")), 0)
+        self.assertEqual(probe(chess.Board("8/8/8/8/8/3k4/1r6/K7 b - - 0 1")), 1)
+        # Rook pawn with the defending king in the corner
+        self.assertEqual(probe(chess.Board("k7/8/1K6/P7/8/8/8/8 w - - 0 1")), 0)
+        # King on a key square, either side to move
+        self.assertEqual(probe(chess.Board("4k3/8/4K3/8/4P3/8/8/8 w - - 0 1")), 1)
+        self.assertEqual(probe(chess.Board("4k3/8/4K3/8/4P3/8/8/8 b - - 0 1")), -1)
+        self.assertIsNone(probe(chess.Board()))
+
+    def test_consistent_with_legal_moves(self):
+        # Every sampled position's value must follow from its children's
+        rng = random.Random(0)
+        for piece_type in (chess.QUEEN, chess.ROOK, chess.PAWN):
+            checked = 0
+            while checked < 200:
+                board = chess.Board(None)
+                strong = rng.choice(chess.COLORS)
+                squares = rng.sample(chess.SQUARES, 3)
+                board.set_piece_at(squares[0], chess.Piece(chess.KING, strong))
+                board.set_piece_at(squares[1], chess.Piece(chess.KING, not strong))
+                board.set_piece_at(squares[2], chess.Piece(piece_type, strong))
+                board.turn = rng.choice(chess.COLORS)
+                if not board.is_valid():
+                    continue
+                checked += 1
+                if board.is_checkmate():
+                    expected = -1
+                else:
+                    expected = 0 if board.is_stalemate() else -1
+                    for move in board.legal_moves:
+                        board.push(move)
+                        if board.is_checkmate():
+                            value = -1
+                        elif board.is_stalemate() or board.is_insufficient_material():
+                            value = 0
+                        else:
+                            value = self.bitbases.probe(board)
+                        board.pop()
+                        expected = max(expected, -value)
+                self.assertEqual(self.bitbases.probe(board), expected, board.fen())
+
+    def test_engine_uses_bitbases(self):
+        # Only Kb3 wins
+        board = chess.Board("8/8/8/8/3k4/8/1PK5/8 w - - 0 1")
+        engine = Engine(bitbases=self.bitbases)
+        move, _, _ = engine.find_best_move_with_stats(board, 2, 60)
+        self.assertEqual(move.uci(), "c2b3")
+        stats = engine.get_search_statistics()
+        self.assertGreater(stats["bitbase_hits"], 0)
+        self.assertGreater(stats["score"], Engine.BITBASE_WIN_SCORE)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,9 +1,27 @@
+import random
 import unittest
+import chess
 from src.board_utils import (
     generate_initial_board,
     print_board,
     generate_legal_moves,
-    make_move
+    generate_pseudo_legal_moves,
+    generate_knight_moves,
+    generate_queen_moves,
+    make_move,
+    to_compact,
+    from_compact,
+    generate_compact_moves,
+    KNIGHT_TARGETS,
+    QUEEN_RAYS,
+    PIECE_CODES,
+    BLACK,
+    ROOK,
+    QUEEN,
+    Position,
+    is_move_legal,
+    apply_move,
+    parse_square
 )
 
 class TestBoard(unittest.TestCase):
@@ -50,5 +68,96 @@ class TestBoard(unittest.TestCase):
         self.assertEqual(updated_board[4][0], 'P')
         self.assertEqual(updated_board[6][0], '.')
 
+    def test_compact_board_round_trip(self):
+        squares = to_compact(self.board)
+        self.assertEqual(len(squares), 64)
+        self.assertEqual(squares[0], BLACK | ROOK)
+        self.assertEqual(squares[63], PIECE_CODES['R'])
+        self.assertEqual(from_compact(squares), self.board)
+
+    def test_precomputed_tables(self):
+        # Corner knight (a8) and a centre queen (d4) on an empty board
+        self.assertEqual(sorted(KNIGHT_TARGETS[0]), [10, 17])
+        self.assertEqual(sum(len(ray) for ray in QUEEN_RAYS[4 * 8 + 3]), 27)
+        empty = [['.'] * 8 for _ in range(8)]
+        self.assertEqual(len(generate_queen_moves(empty, (4, 3), "white")), 27)
+        self.assertEqual(sorted(generate_knight_moves(self.board, (7, 1), "white")), [(5, 0), (5, 2)])
+
+    def test_compact_moves_match_list_moves(self):
+        board = [row[:] for row in self.board]
+        make_move(board, (6, 4), (4, 4))
+        make_move(board, (1, 3), (3, 3))
+        for player in ("white", "black"):
+            compact = [((start >> 3, start & 7), (end >> 3, end & 7))
+                       for start, end in generate_compact_moves(to_compact(board), player)]
+            self.assertEqual(compact, generate_pseudo_legal_moves(board, player))
+        # The e4 pawn can take on d5
+        self.assertIn(((4, 4), (3, 3)), generate_legal_moves(board, "white"))
+        self.assertEqual(len(generate_legal_moves(self.board, "white")), 20)
+
+    def test_position_perft(self):
+        # Known counts: start position, "Kiwipete" (castling, pins, en passant) and
+        # positions 3 to 5 of the Chess Programming Wiki perft suite
+        cases = [
+            (chess.STARTING_FEN, 3, 8902),
+            ("r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1", 2, 2039),
+            ("8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1", 3, 2812),
+            ("r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1", 3, 9467),
+            ("rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8", 2, 1486),
+        ]
+        for fen, depth, nodes in cases:
+            position = Position.from_fen(fen)
+            self.assertEqual(position.perft(depth), nodes, fen)
+            # Unmaking every move restores the position
+            self.assertEqual(position.fen(), fen)
+
+    def test_position_matches_python_chess(self):
+        rng = random.Random(7)
+
+        def python_chess_square(square):
+            return (7 - (square >> 3)) * 8 + (square & 7)
+
+        for _ in range(20):
+            board = chess.Board()
+            position = Position()
+            for _ in range(60):
+                expected = sorted((move.from_square, move.to_square, move.promotion or 0)
+                                  for move in board.legal_moves)
+                moves = position.legal_moves()
+                self.assertEqual(sorted((python_chess_square(start), python_chess_square(end), promotion)
+                                        for start, end, promotion in moves), expected, board.fen())
+                self.assertEqual(position.in_check(), board.is_check())
+                if not moves:
+                    break
+                move = rng.choice(moves)
+                position.make_move(move)
+                board.push(chess.Move(python_chess_square(move[0]), python_chess_square(move[1]),
+                                      move[2] or None))
+
+    def test_list_board_rules(self):
+        # The e2 knight is pinned by the e8 rook
+        board = [['.'] * 8 for _ in range(8)]
+        board[0][4] = 'r'
+        board[0][0] = 'k'
+        board[6][4] = 'N'
+        board[7][4] = 'K'
+        board[1][7] = 'P'
+        self.assertFalse(is_move_legal(board, ((6, 4), (4, 5)), "white"))
+        self.assertTrue(is_move_legal(board, ((7, 4), (7, 3)), "white"))
+        # The pinned knight has no legal move, and both APIs agree on every move
+        moves = generate_legal_moves(board, "white")
+        self.assertIn(((6, 4), (4, 5)), generate_pseudo_legal_moves(board, "white"))
+        self.assertFalse(any(start == (6, 4) for start, _ in moves))
+        for move in generate_pseudo_legal_moves(board, "white"):
+            self.assertEqual(move in moves, is_move_legal(board, move, "white"), move)
+        apply_move(board, ((1, 7), (0, 7)), "white")
+        self.assertEqual(board[0][7], 'Q')
+        self.assertEqual(board[1][7], '.')
+
+        position = Position.from_board(board, "black")
+        self.assertEqual(position.to_board(), board)
+        self.assertIn((parse_square("a8"), parse_square("a7"), 0), position.legal_moves())
+        self.assertEqual(position.squares[parse_square("h8")], QUEEN)
+
 if __name__ == '__main__':
     unittest.main()
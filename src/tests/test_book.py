@@ -0,0 +1,65 @@
+import os
+import random
+import tempfile
+import time
+import unittest
+import chess
+import chess.polyglot
+from src.book import OpeningBook, write_book, encode_polyglot_move, decode_polyglot_move
+from src.player import Player
+
+class TestBook(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "book.bin")
+        start = chess.Board()
+        after_e4 = chess.Board()
+        after_e4.push_uci("e2e4")
+        castling = chess.Board("r3k2r/8/8/8/8/8/8/R3K2R w KQkq - 0 1")
+        entries = [
+            (chess.polyglot.zobrist_hash(start), encode_polyglot_move(start, chess.Move.from_uci("e2e4")), 10, 0),
+            (chess.polyglot.zobrist_hash(start), encode_polyglot_move(start, chess.Move.from_uci("d2d4")), 30, 0),
+            (chess.polyglot.zobrist_hash(after_e4), encode_polyglot_move(after_e4, chess.Move.from_uci("c7c5")), 1, 0),
+            (chess.polyglot.zobrist_hash(castling), encode_polyglot_move(castling, chess.Move.from_uci("e1g1")), 5, 0),
+        ]
+        # Filler positions around the real ones for the binary search
+        entries.extend((random.getrandbits(64), 0, 1, 0) for _ in range(500))
+        write_book(self.path, entries)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_matches_python_chess_reader(self):
+        with OpeningBook(self.path) as book, chess.polyglot.open_reader(self.path) as reader:
+            for board in (chess.Board(), chess.Board("r3k2r/8/8/8/8/8/8/R3K2R w KQkq - 0 1")):
+                expected = sorted((entry.move.uci(), entry.weight) for entry in reader.find_all(board))
+                found = sorted((move.uci(), weight) for move, weight in book.find_all(board))
+                self.assertEqual(found, expected)
+            self.assertEqual(book.find_all(chess.Board("8/8/8/8/8/8/8/K6k w - - 0 1")), [])
+
+    def test_castling_encoding(self):
+        board = chess.Board("r3k2r/8/8/8/8/8/8/R3K2R w KQkq - 0 1")
+        for uci in ("e1g1", "e1c1"):
+            move = chess.Move.from_uci(uci)
+            self.assertEqual(decode_polyglot_move(board, encode_polyglot_move(board, move)), move)
+
+    def test_choose_move(self):
+        with OpeningBook(self.path) as book:
+            self.assertEqual(book.choose_move(chess.Board(), "best").uci(), "d2d4")
+            picks = {book.choose_move(chess.Board(), rng=random.Random(seed)).uci() for seed in range(50)}
+            self.assertEqual(picks, {"e2e4", "d2d4"})
+
+    def test_bot_plays_book_move(self):
+        bot = Player("Bot", "bot", "white", book_path=self.path, book_mode="best")
+        start = time.time()
+        self.assertTrue(bot.make_move())
+        self.assertLess(time.time() - start, 0.1)
+        stats = bot.get_move_statistics()[0]
+        self.assertEqual(stats["move"], "d2d4")
+        self.assertTrue(stats["book_move"])
+        self.assertEqual(stats["nodes_searched"], 0)
+        bot.close()
+
+if __name__ == '__main__':
+    unittest.main()
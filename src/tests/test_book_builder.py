@@ -0,0 +1,83 @@
+import io
+import os
+import tempfile
+import unittest
+import chess
+import chess.pgn
+import chess.polyglot
+from src.book import OpeningBook
+from src.book_builder import build_book
+
+GAMES = [
+    ("1-0", "e2e4 e7e5 g1f3 b8c6 f1b5 a7a6"),
+    ("0-1", "e2e4 c7c5 g1f3 d7d6"),
+    ("1/2-1/2", "d2d4 d7d5 c2c4 e7e6"),
+    ("1-0", "e2e4 e7e5 g1f3 g8f6"),
+    ("*", "e2e4 e7e5"),
+]
+
+
+def make_pgn(games):
+    text = io.StringIO()
+    for index, (result, moves) in enumerate(games):
+        game = chess.pgn.Game()
+        game.headers["Event"] = "Test %d" % index
+        game.headers["Result"] = result
+        node = game
+        for uci in moves.split():
+            node = node.add_variation(chess.Move.from_uci(uci))
+        # A side line, which the builder must ignore
+        game.add_variation(chess.Move.from_uci("h2h4"))
+        print(game, file=text, end="\n\n")
+    return text.getvalue()
+
+
+class TestBookBuilder(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.pgn = os.path.join(self.directory.name, "games.pgn")
+        with open(self.pgn, "w") as f:
+            f.write(make_pgn(GAMES * 20))
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def build(self, **options):
+        book = os.path.join(self.directory.name, "book.bin")
+        stats = build_book(self.pgn, book, **options)
+        return book, stats
+
+    def test_counts_and_weights(self):
+        book, stats = self.build(processes=1)
+        # Unfinished games are left out
+        self.assertEqual(stats["games"], 80)
+        with OpeningBook(book) as opening_book:
+            weights = {move.uci(): weight for move, weight in opening_book.find_all(chess.Board())}
+            # Two points per win and one per draw: e2e4 won 40 and lost 20 games, d2d4 drew 20
+            self.assertEqual(weights, {"e2e4": 80, "d2d4": 20})
+            board = chess.Board()
+            board.push_uci("e2e4")
+            self.assertEqual(opening_book.choose_move(board, "best").uci(), "c7c5")
+        with chess.polyglot.open_reader(book) as reader:
+            self.assertEqual(len(list(reader.find_all(chess.Board()))), 2)
+
+    def test_shards_and_spills_give_same_book(self):
+        single, _ = self.build(processes=1)
+        with open(single, "rb") as f:
+            expected = f.read()
+        # Tiny chunks cut games in the middle, and tiny runs force many spills
+        sharded, stats = self.build(processes=2, chunk_mb=0.001, max_entries=5)
+        self.assertGreater(stats["runs"], 2)
+        self.assertEqual(stats["games"], 80)
+        with open(sharded, "rb") as f:
+            self.assertEqual(f.read(), expected)
+
+    def test_max_ply_and_min_games(self):
+        book, _ = self.build(processes=1, max_ply=1, min_games=21)
+        with OpeningBook(book) as opening_book:
+            self.assertEqual(len(opening_book), 1)
+            self.assertEqual(opening_book.choose_move(chess.Board(), "best").uci(), "e2e4")
+
+if __name__ == '__main__':
+    unittest.main()
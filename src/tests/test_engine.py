@@ -1,6 +1,10 @@
+import pickle
+import time
 import unittest
+from unittest import mock
 import chess
 from src.engine import Engine
+from src.evaluation import BitboardEvaluator
 
 class TestEngine(unittest.TestCase):
 
@@ -39,5 +43,201 @@ class TestEngine(unittest.TestCase):
         self.assertIsNotNone(move)
         self.assertIn(move, board.legal_moves)
 
+    def test_quiescence_sees_recapture(self):
+        # Qxd5 wins a pawn but loses the queen to cxd5, which only the quiescence search sees at depth 1
+        fen = "4k3/8/2p5/3p4/8/8/8/3QK3 w - - 0 1"
+        board = chess.Board(fen=fen)
+        engine = Engine(color_is_white=True)
+        move = engine.find_best_move(board, depth=1)
+        self.assertNotEqual(move.uci(), "d1d5")
+        self.assertGreater(engine.get_search_statistics()["quiescence_nodes"], 0)
+
+    def test_quiescence_respects_node_limit(self):
+        # Kiwipete at depth 1 runs thousands of quiescence nodes, which count toward the limit
+        board = chess.Board("r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1")
+        engine = Engine(color_is_white=True)
+        move, _, _ = engine.find_best_move_with_stats(board, 1, node_limit=300)
+        self.assertIn(move, board.legal_moves)
+        stats = engine.get_search_statistics()
+        self.assertLessEqual(stats["nodes_searched"] + stats["quiescence_nodes"], 301)
+
+    def test_principal_variation(self):
+        board = chess.Board()
+        engine = Engine(color_is_white=True)
+        move, nodes, _ = engine.find_best_move_with_stats(board, 3, 60)
+        stats = engine.get_search_statistics()
+        self.assertEqual(stats["depth"], 3)
+        pv = stats["principal_variation"]
+        self.assertEqual(pv[0], move.uci())
+        # The line is playable from the root
+        for uci in pv:
+            board.push_uci(uci)
+
+    def test_aspiration_agrees_with_full_window(self):
+        fen = "r1bqkb1r/pppp1ppp/2n2n2/4p3/2B1P3/5N2/PPPP1PPP/RNBQK2R w KQkq - 4 4"
+        engine = Engine(color_is_white=True)
+        engine.find_best_move_with_stats(chess.Board(fen), 3, 60)
+        fixed = Engine(color_is_white=True)
+        fixed.find_best_move(chess.Board(fen), 3)
+        self.assertAlmostEqual(engine.best_score, fixed.best_score)
+
+    def test_selective_search_options(self):
+        # Back-rank mate is found with and without the selective search features
+        fen = "6k1/5ppp/8/8/8/8/5PPP/3R2K1 w - - 0 1"
+        for enabled in (True, False):
+            engine = Engine(color_is_white=True, null_move=enabled, late_move_reductions=enabled,
+                            futility_pruning=enabled, razoring=enabled)
+            self.assertEqual(engine.find_best_move(chess.Board(fen), depth=3).uci(), "d1d8")
+
+    def test_selective_search_reduces_nodes(self):
+        full = Engine(color_is_white=True, null_move=False, late_move_reductions=False,
+                      futility_pruning=False, razoring=False)
+        full.find_best_move(chess.Board(), depth=4)
+        selective = Engine(color_is_white=True)
+        selective.find_best_move(chess.Board(), depth=4)
+        self.assertLess(selective.nodes_searched, full.nodes_searched)
+
+    def test_no_null_move_in_pawn_endings(self):
+        engine = Engine(color_is_white=True)
+        board = chess.Board("8/8/4k3/4p3/4P3/4K3/8/8 w - - 0 1")
+        self.assertFalse(engine._has_non_pawn_material(board, chess.WHITE))
+        board = chess.Board("8/8/4k3/4p3/4P3/4K3/8/6N1 w - - 0 1")
+        self.assertTrue(engine._has_non_pawn_material(board, chess.WHITE))
+
+    def test_parallel_search(self):
+        engine = Engine(color_is_white=True, threads=2, hash_mb=4)
+        try:
+            board = chess.Board()
+            board.push_uci("e2e4")
+            board.push_uci("e7e5")
+            move, nodes, _ = engine.find_best_move_with_stats(board, 3, 60)
+            self.assertIn(move, board.legal_moves)
+            stats = engine.get_search_statistics()
+            self.assertEqual(stats["threads"], 2)
+            self.assertGreaterEqual(stats["depth"], 3)
+            self.assertGreater(nodes, 0)
+        finally:
+            engine.close()
+
+    def test_parallel_search_with_evaluator(self):
+        # Helpers share the table, so they must score positions with the same evaluator
+        evaluator = BitboardEvaluator(center_attack_bonus=0.05)
+        engine = Engine(color_is_white=True, threads=2, hash_mb=4, evaluator=evaluator)
+        try:
+            move, _, _ = engine.find_best_move_with_stats(chess.Board(), 2, 60)
+            self.assertIn(move, chess.Board().legal_moves)
+            helper_evaluator = pickle.loads(pickle.dumps(engine._helpers.options["evaluator"]))
+            self.assertIsInstance(helper_evaluator, BitboardEvaluator)
+            self.assertEqual(vars(helper_evaluator), vars(evaluator))
+        finally:
+            engine.close()
+
+    def test_incremental_evaluation_matches_full(self):
+        # Castling, en passant, captures and promotion along the way
+        board = chess.Board("r3k2r/1P4p1/8/2pP4/8/8/6P1/R3K2R w KQkq c6 0 1")
+        engine = Engine(color_is_white=False)
+        engine._start_search(board)
+        for uci in ["d5c6", "g7g5", "e1g1", "e8c8", "b7b8q", "d8d1", "f1d1", "g5g4", "g2g3"]:
+            engine._push(board, chess.Move.from_uci(uci))
+            self.assertAlmostEqual(engine._evaluate_incremental(board), engine.evaluate_board(board))
+        for _ in range(9):
+            engine._pop(board)
+        self.assertEqual(len(engine._material_stack), 1)
+
+    def test_evaluation_hashes(self):
+        board = chess.Board("r1bqkb1r/pppp1ppp/2n2n2/4p3/2B1P3/5N2/PPPP1PPP/RNBQK2R w KQkq - 4 4")
+        engine = Engine()
+        engine._start_search(board)
+        first = engine._evaluate_incremental(board)
+        # The second lookup comes from the evaluation hash
+        self.assertEqual(engine._evaluate_incremental(board), first)
+        self.assertEqual(engine.eval_cache.hits, 1)
+        self.assertAlmostEqual(first, engine.evaluate_board(board))
+
+        # A piece move keeps the pawn structure, so the pawn hash hits
+        engine._push(board, chess.Move.from_uci("b1c3"))
+        self.assertAlmostEqual(engine._evaluate_incremental(board), engine.evaluate_board(board))
+        self.assertEqual(engine.pawn_hash.hits, 1)
+
+        engine._pop(board)
+        engine.find_best_move_with_stats(board, 3, 100)
+        stats = engine.get_search_statistics()
+        self.assertGreater(stats["eval_cache_probes"], 0)
+        self.assertGreater(stats["pawn_hash_hit_rate"], 0)
+        self.assertLessEqual(stats["eval_cache_hit_rate"], 1)
+
+    def test_ponder_hit_continues_search(self):
+        board = chess.Board("r1bqkb1r/pppp1ppp/2n2n2/4p3/2B1P3/5N2/PPPP1PPP/RNBQK2R w KQkq - 4 4")
+        engine = Engine(color_is_white=False)
+        engine.start_pondering(board, chess.Move.from_uci("e1g1"))
+        self.assertTrue(engine.pondering)
+        time.sleep(0.3)
+        board.push_uci("e1g1")
+        self.assertTrue(engine.is_ponder_hit(board))
+        move, nodes, _ = engine.ponder_hit(move_time=0.2)
+        self.assertFalse(engine.pondering)
+        self.assertTrue(board.is_legal(move))
+        self.assertGreater(nodes, 0)
+        self.assertGreaterEqual(engine.completed_depth, 1)
+
+    def test_ponder_miss(self):
+        board = chess.Board()
+        engine = Engine(color_is_white=False)
+        board.push_uci("e2e4")
+        engine.start_pondering(board, chess.Move.from_uci("e7e5"))
+        board.push_uci("c7c5")
+        self.assertFalse(engine.is_ponder_hit(board))
+        # A normal search abandons the ponder search
+        move, _, _ = engine.find_best_move_with_stats(board, 2, 10)
+        self.assertFalse(engine.pondering)
+        self.assertTrue(board.is_legal(move))
+
+    def test_ponder_hit_after_failed_ponder_search(self):
+        board = chess.Board()
+        engine = Engine(color_is_white=False)
+        search = engine._search
+        calls = []
+
+        def search_failing_once(*args):
+            calls.append(args)
+            if len(calls) == 1:
+                raise RuntimeError("ponder search failed")
+            return search(*args)
+
+        # The failing ponder thread's traceback is not printed
+        with mock.patch.object(engine, "_search", search_failing_once), mock.patch("threading.excepthook"):
+            engine.start_pondering(board, chess.Move.from_uci("e2e4"))
+            engine._ponder_thread.join()
+            board.push_uci("e2e4")
+            # The position is searched again instead of returning nothing
+            move, nodes, _ = engine.ponder_hit(move_time=0.2)
+        self.assertEqual(len(calls), 2)
+        self.assertTrue(board.is_legal(move))
+        self.assertGreater(nodes, 0)
+        self.assertFalse(engine.pondering)
+
+    def test_instrumentation(self):
+        board = chess.Board("r1bqkb1r/pppp1ppp/2n2n2/4p3/2B1P3/5N2/PPPP1PPP/RNBQK2R w KQkq - 4 4")
+        plain = Engine(color_is_white=True)
+        instrumented = Engine(color_is_white=True, instrument=True)
+        self.assertIsNone(plain.get_search_statistics()["instrumentation"])
+        move, nodes, search_time = instrumented.find_best_move_with_stats(board, 3)
+        # Counting does not change the search
+        self.assertEqual(plain.find_best_move_with_stats(board, 3)[:2], (move, nodes))
+
+        counters = instrumented.get_search_statistics()["instrumentation"]
+        self.assertEqual([iteration["depth"] for iteration in counters["iterations"]], [1, 2, 3])
+        self.assertGreater(sum(counters["beta_cutoffs"]), 0)
+        self.assertGreater(counters["calls"]["evaluation"], 0)
+        self.assertGreater(counters["calls"]["movegen"], 0)
+        self.assertLessEqual(sum(counters["time"].values()), search_time + 0.05)
+        # The timers are removed after the search
+        self.assertNotIn("_evaluate_incremental", vars(instrumented))
+        self.assertNotIn("pick_moves", vars(instrumented.move_orderer))
+
+        profiled = Engine(color_is_white=True, profile=True)
+        profiled.find_best_move_with_stats(board, 2)
+        self.assertTrue(profiled.get_search_statistics()["instrumentation"]["profile"])
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,86 @@
+import unittest
+import chess
+from src.engine import Engine
+from src.evaluation import BitboardEvaluator, EvaluationCache, pack_boards, evaluate_bitboards
+
+class TestEvaluation(unittest.TestCase):
+
+    def setUp(self):
+        self.evaluator = BitboardEvaluator()
+
+    def test_initial_position_is_balanced(self):
+        self.assertAlmostEqual(self.evaluator.evaluate(chess.Board()), 0.0)
+
+    def test_material_matches_engine(self):
+        board = chess.Board("r1bqkb1r/pppp1ppp/2n2n2/4p3/2B1P3/5N2/PPPP1PPP/RNBQK2R w KQkq - 4 4")
+        board.remove_piece_at(chess.D8)
+        engine = Engine()
+        self.assertAlmostEqual(self.evaluator.material_score(board), engine._material_score(board))
+        self.assertAlmostEqual(self.evaluator.center_occupancy_score(board), engine._center_control_score(board))
+
+    def test_pawn_structure(self):
+        # White: doubled, isolated and passed c-pawns; Black: isolated passed a-pawn on a3
+        board = chess.Board("4k3/8/8/8/2P5/p1P5/8/4K3 w - - 0 1")
+        e = self.evaluator
+        white = -e.doubled_pawn_penalty - 2 * e.isolated_pawn_penalty + e.PASSED_PAWN_BONUS[2] + e.PASSED_PAWN_BONUS[3]
+        black = -e.isolated_pawn_penalty + e.PASSED_PAWN_BONUS[5]
+        expected = white - black
+        self.assertAlmostEqual(e.pawn_structure_score(board), expected)
+
+    def test_king_shelter(self):
+        sheltered = chess.Board("6k1/8/8/8/8/8/5PPP/6K1 w - - 0 1")
+        exposed = chess.Board("6k1/8/8/8/5PPP/8/8/6K1 w - - 0 1")
+        self.assertGreater(self.evaluator.king_shelter_score(sheltered),
+                           self.evaluator.king_shelter_score(exposed))
+
+    def test_engine_with_evaluator(self):
+        board = chess.Board("r3k2r/1P4p1/8/2pP4/8/8/6P1/R3K2R w KQkq c6 0 1")
+        engine = Engine(color_is_white=False, evaluator=self.evaluator)
+        self.assertAlmostEqual(engine.evaluate_board(board), -self.evaluator.evaluate(board))
+        engine._start_search(board)
+        for uci in ["d5c6", "g7g5", "e1g1", "e8c8", "b7b8q"]:
+            engine._push(board, chess.Move.from_uci(uci))
+            self.assertAlmostEqual(engine._evaluate_incremental(board), engine.evaluate_board(board))
+        move = engine.find_best_move(chess.Board("6k1/5ppp/8/8/8/8/5PPP/3R2K1 b - - 0 1"), 2)
+        self.assertIsNotNone(move)
+
+    def test_evaluate_many_matches_evaluate_board(self):
+        boards = [
+            chess.Board(),
+            chess.Board("r1bqkb1r/pppp1ppp/2n2n2/4p3/2B1P3/5N2/PPPP1PPP/RNBQK2R w KQkq - 4 4"),
+            chess.Board("4k3/8/8/8/2P5/p1P5/8/4K3 w - - 0 1"),
+            # King on the edge, where the neighbour offsets wrap around files
+            chess.Board("7k/p7/8/8/8/8/P6P/K7 b - - 0 1"),
+            # Checkmate and stalemate
+            chess.Board("r1bqkb1r/pppp1Qpp/2np1n2/4p3/2BP4/8/PPP1PPPP/RNB1K1NR b kq - 1 4"),
+            chess.Board("7k/5Q2/6K1/8/8/8/8/8 b - - 0 1"),
+        ]
+        for color_is_white in (True, False):
+            engine = Engine(color_is_white=color_is_white)
+            scores = engine.evaluate_many(boards)
+            self.assertEqual(list(scores), [engine.evaluate_board(board) for board in boards])
+
+    def test_pack_boards(self):
+        packed = pack_boards([chess.Board()])
+        self.assertEqual(packed.shape, (1, 12))
+        self.assertEqual(int(packed[0, 0]), chess.BB_RANK_2)
+        self.assertEqual(int(packed[0, 11]), chess.BB_E8)
+        self.assertEqual(evaluate_bitboards(packed)[0], 0.0)
+
+    def test_evaluation_cache(self):
+        cache = EvaluationCache(1000)
+        self.assertEqual(cache.size, 512)
+        self.assertIsNone(cache.get(7))
+        cache.put(7, 0.25)
+        self.assertEqual(cache.get(7), 0.25)
+        # A key in the same slot replaces the old entry
+        cache.put(7 + 512, -1.0)
+        self.assertIsNone(cache.get(7))
+        self.assertEqual(cache.get(7 + 512), -1.0)
+        self.assertEqual((cache.hits, cache.probes), (2, 4))
+        self.assertEqual(cache.hit_rate(), 0.5)
+        cache.clear()
+        self.assertIsNone(cache.get(7 + 512))
+
+if __name__ == '__main__':
+    unittest.main()
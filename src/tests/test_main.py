@@ -0,0 +1,96 @@
+import io
+import time
+import unittest
+import chess
+from src.main import UCIServer
+
+class TestUCIServer(unittest.TestCase):
+
+    def setUp(self):
+        self.output = io.StringIO()
+        self.server = UCIServer(input_stream=io.StringIO(), output_stream=self.output)
+
+    def tearDown(self):
+        self.server.handle("quit")
+        self.server._close_engine()
+
+    def lines(self):
+        return self.output.getvalue().splitlines()
+
+    def wait_for_bestmove(self, timeout=10.0):
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            moves = [line for line in self.lines() if line.startswith("bestmove")]
+            if moves:
+                return moves[-1]
+            time.sleep(0.01)
+        self.fail("no bestmove")
+
+    def test_handshake_and_options(self):
+        self.server.handle("uci")
+        self.server.handle("isready")
+        self.assertIn("uciok", self.lines())
+        self.assertEqual(self.lines()[-1], "readyok")
+        self.server.handle("setoption name Hash value 1")
+        self.server.handle("setoption name Threads value 1")
+        self.assertEqual(self.server.hash_mb, 1)
+        self.assertEqual(self.server._engine().transposition_table.hash_mb, 1)
+
+    def test_go_depth_streams_info(self):
+        self.server.handle("position startpos moves e2e4 e7e5")
+        self.server.handle("go depth 3")
+        bestmove = self.wait_for_bestmove()
+        board = chess.Board()
+        board.push_uci("e2e4")
+        board.push_uci("e7e5")
+        self.assertTrue(board.is_legal(chess.Move.from_uci(bestmove.split()[1])))
+        infos = [line for line in self.lines() if line.startswith("info depth")]
+        self.assertEqual([int(line.split()[2]) for line in infos], [1, 2, 3])
+        self.assertIn(" nps ", infos[-1])
+        self.assertIn(" pv ", infos[-1])
+
+    def test_infinite_waits_for_stop(self):
+        self.server.handle("position fen 8/8/8/8/3k4/8/1PK5/8 w - - 0 1")
+        self.server.handle("go infinite")
+        time.sleep(0.3)
+        self.server.handle("isready")
+        # isready is answered during the search, the best move only after stop
+        self.assertIn("readyok", self.lines())
+        self.assertFalse(any(line.startswith("bestmove") for line in self.lines()))
+        start = time.time()
+        self.server.handle("stop")
+        self.assertLess(time.time() - start, 1.0)
+        self.assertTrue(self.lines()[-1].startswith("bestmove"))
+
+    def test_mate_score_for_side_to_move(self):
+        # Black to move mates with Qg2
+        self.server.handle("position fen 8/8/8/8/8/5kq1/8/7K b - - 0 1")
+        self.server.handle("go depth 2")
+        self.wait_for_bestmove()
+        infos = [line for line in self.lines() if line.startswith("info depth")]
+        self.assertIn("score mate 1", infos[-1])
+
+    def test_mate_distance_from_score(self):
+        # Mate in 2 (Kb6 or Rh7, then Rh8#); the principal variation may be cut short by the table
+        self.server.handle("position fen k7/8/2K5/8/8/8/8/7R w - - 0 1")
+        self.server.handle("go depth 5")
+        self.wait_for_bestmove()
+        infos = [line for line in self.lines() if line.startswith("info depth")]
+        self.assertIn("score mate 2", infos[-1])
+        # Getting mated is reported from the losing side's view
+        self.server.handle("position fen k7/8/2K5/8/8/8/8/7R w - - 0 1 moves c6b6")
+        self.server.handle("go depth 4")
+        self.wait_for_bestmove()
+        infos = [line for line in self.lines() if line.startswith("info depth")]
+        self.assertIn("score mate -1", infos[-1])
+
+    def test_ponderhit_uses_clock(self):
+        self.server.handle("position startpos")
+        self.server.handle("go ponder wtime 2000 btime 2000")
+        time.sleep(0.2)
+        self.assertFalse(any(line.startswith("bestmove") for line in self.lines()))
+        self.server.handle("ponderhit")
+        self.wait_for_bestmove(timeout=3.0)
+
+if __name__ == '__main__':
+    unittest.main()
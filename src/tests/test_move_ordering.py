@@ -0,0 +1,50 @@
+import unittest
+import chess
+from src.move_ordering import MoveOrderer
+
+class TestMoveOrdering(unittest.TestCase):
+
+    def setUp(self):
+        # White can take a queen with a pawn or a knight, or a pawn with the queen
+        self.board = chess.Board("4k3/8/8/1p1q4/2P1p3/4N3/8/3QK3 w - - 0 1")
+        self.orderer = MoveOrderer()
+
+    def test_tt_move_first(self):
+        tt_move = chess.Move.from_uci("e1f2")
+        moves = list(self.orderer.pick_moves(self.board, 0, tt_move))
+        self.assertEqual(moves[0], tt_move)
+
+    def test_mvv_lva_captures(self):
+        moves = list(self.orderer.pick_moves(self.board, 0))
+        self.assertEqual([m.uci() for m in moves[:4]], ["c4d5", "e3d5", "d1d5", "c4b5"])
+
+    def test_killers_and_history(self):
+        quiet = chess.Move.from_uci("e1f2")
+        self.orderer.record_cutoff(self.board, quiet, 3, 4)
+        self.assertEqual(self.orderer.killers[3][0], quiet)
+        self.assertEqual(self.orderer.history[chess.WHITE][quiet.from_square * 64 + quiet.to_square], 16)
+        moves = list(self.orderer.pick_moves(self.board, 3))
+        captures = sum(1 for m in self.board.legal_moves if self.board.is_capture(m))
+        self.assertEqual(moves[captures], quiet)
+        # Captures are never stored as killers
+        self.orderer.record_cutoff(self.board, chess.Move.from_uci("c4d5"), 3, 4)
+        self.assertEqual(self.orderer.killers[3][0], quiet)
+
+    def test_pick_moves_yields_every_legal_move_once(self):
+        # Castling, en passant, promotions and captures
+        board = chess.Board("r3k2r/1P4p1/8/2pP4/8/8/6P1/R3K2R w KQkq c6 0 1")
+        tt_move = chess.Move.from_uci("e1c1")
+        self.orderer.killers[0][0] = chess.Move.from_uci("g2g4")
+        picked = list(self.orderer.pick_moves(board, 0, tt_move))
+        self.assertEqual(picked[0], tt_move)
+        self.assertEqual(len(picked), len(set(picked)))
+        self.assertEqual(set(picked), set(board.legal_moves))
+
+    def test_losing_captures_last(self):
+        # Qxd5 is recaptured by the c6 pawn
+        board = chess.Board("4k3/8/2p5/3p4/8/8/8/3QK3 w - - 0 1")
+        picked = list(self.orderer.pick_moves(board, 0))
+        self.assertEqual(picked[-1].uci(), "d1d5")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -49,5 +49,32 @@ class TestPlayer(unittest.TestCase):
         self.assertTrue(rules.is_in_check("black"))
         self.assertFalse(rules.is_checkmate("black"))
 
+    def test_bot_move_with_increment(self):
+        bot = Player("Bot", "bot", "white", time_limit=2.0, increment=1.0)
+        self.assertTrue(bot.make_move())
+        stats = bot.get_move_statistics()[0]
+        self.assertGreaterEqual(stats["depth_used"], 1)
+        self.assertLess(stats["time_taken"], bot.time_manager.hard_limit + 0.5)
+        self.assertAlmostEqual(bot.time_left, 3.0 - stats["time_taken"], places=3)
+
+    def test_moves_until_time_control(self):
+        bot = Player("Bot", "bot", "white", moves_to_go=40)
+        self.assertEqual(bot._moves_until_time_control(), 40)
+        bot.moves_history = ["e2e4"] * 41
+        self.assertEqual(bot._moves_until_time_control(), 39)
+
+    def test_bot_ponders_on_opponent_time(self):
+        rules = Rules()
+        bot = Player("Bot", "bot", "white", rules=rules, time_limit=10.0, ponder=True)
+        human = Player("Alice", "human", "black", rules=rules)
+        self.assertTrue(bot.make_move())
+        self.assertTrue(bot.engine.pondering)
+        ponder_move = bot.engine.ponder_move
+        self.assertTrue(human.make_move(ponder_move.uci()))
+        self.assertTrue(bot.make_move())
+        self.assertTrue(bot.get_move_statistics()[1]["ponder_hit"])
+        bot.stop_pondering()
+        self.assertFalse(bot.engine.pondering)
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,69 @@
+import time
+import unittest
+import chess
+from src.engine import Engine
+from src.time_manager import TimeManager
+
+class TestTimeManager(unittest.TestCase):
+
+    def test_limits_from_clock(self):
+        manager = TimeManager(move_overhead=0.0)
+        soft, hard = manager.start(time_left=60.0)
+        self.assertAlmostEqual(soft, 60.0 / TimeManager.DEFAULT_MOVES_TO_GO)
+        self.assertAlmostEqual(hard, soft * TimeManager.HARD_LIMIT_FACTOR)
+
+        # The increment is added to the budget, moves-to-go divides the clock
+        soft_inc, _ = manager.start(time_left=60.0, increment=2.0, moves_to_go=10)
+        self.assertAlmostEqual(soft_inc, 6.0 + 2.0 * TimeManager.INCREMENT_USAGE)
+
+        # The last move before the time control never uses the whole clock
+        soft, hard = manager.start(time_left=10.0, moves_to_go=1)
+        self.assertLessEqual(hard, 10.0 * TimeManager.MAX_TIME_USAGE)
+        self.assertLessEqual(soft, hard)
+
+    def test_move_time_and_no_limit(self):
+        manager = TimeManager()
+        self.assertEqual(manager.start(move_time=1.5), (1.5, 1.5))
+        self.assertEqual(manager.start(), (None, None))
+        self.assertFalse(manager.out_of_time())
+        self.assertTrue(manager.can_start_iteration())
+
+    def test_clock_checked_every_interval(self):
+        manager = TimeManager(check_interval=4)
+        manager.start(move_time=0.0)
+        results = [manager.out_of_time() for _ in range(4)]
+        self.assertEqual(results, [False, False, False, True])
+
+    def test_branching_factor_stops_iterations(self):
+        manager = TimeManager()
+        manager.start(move_time=10.0)
+        manager._iterations = [(1.0, 1000), (4.0, 6000)]
+        self.assertEqual(manager.branching_factor(), 6.0)
+        # The next iteration would take about 18 more seconds
+        self.assertFalse(manager.can_start_iteration())
+        manager._iterations = [(0.01, 1000), (0.03, 3000)]
+        self.assertTrue(manager.can_start_iteration())
+
+    def test_engine_respects_hard_limit(self):
+        engine = Engine()
+        manager = TimeManager(move_overhead=0.0)
+        manager.start(time_left=6.0, moves_to_go=20)
+        start = time.time()
+        move, _, _ = engine.find_best_move_with_stats(chess.Board(), 64, time_manager=manager)
+        self.assertIsNotNone(move)
+        self.assertLess(time.time() - start, manager.hard_limit + 0.5)
+        self.assertLess(engine.completed_depth, 64)
+
+    def test_tight_move_time_in_tactical_position(self):
+        # Kiwipete: most nodes are in the quiescence search, which must read the clock too
+        board = chess.Board("r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1")
+        engine = Engine()
+        manager = TimeManager()
+        manager.start(move_time=0.05)
+        start = time.time()
+        move, _, _ = engine.find_best_move_with_stats(board, 64, time_manager=manager)
+        self.assertIn(move, board.legal_moves)
+        self.assertLess(time.time() - start, 3 * manager.hard_limit)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,174 @@
+import os
+import tempfile
+import unittest
+import chess
+import chess.polyglot
+from src.engine import Engine
+from src.transposition import (
+    TranspositionTable, zobrist_key, push_with_key, merge_tables, EXACT, LOWERBOUND, UPPERBOUND
+)
+
+class TestTranspositionTable(unittest.TestCase):
+
+    def test_zobrist_key_matches_polyglot(self):
+        board = chess.Board("rnbqkbnr/ppp1p1pp/8/3pPp2/8/8/PPPP1PPP/RNBQKBNR w KQkq f6 0 3")
+        self.assertEqual(zobrist_key(board), chess.polyglot.zobrist_hash(board))
+
+    def test_incremental_key_matches_full_key(self):
+        # Castling, en passant, captures and promotion along the way
+        board = chess.Board("r3k2r/1P4p1/8/2pP4/8/8/6P1/R3K2R w KQkq c6 0 1")
+        key = zobrist_key(board)
+        for uci in ["d5c6", "g7g5", "e1g1", "e8c8", "b7b8q", "d8d1", "f1d1", "g5g4", "g2g3"]:
+            key = push_with_key(board, chess.Move.from_uci(uci), key)
+            self.assertEqual(key, zobrist_key(board), uci)
+        key = push_with_key(board, chess.Move.null(), key)
+        self.assertEqual(key, zobrist_key(board))
+
+    def test_store_and_probe(self):
+        table = TranspositionTable(hash_mb=0.01)
+        move = chess.Move.from_uci("e7e8q")
+        table.store(12345, 3, 0.55, EXACT, move)
+        self.assertEqual(table.probe(12345), (12345, 3, 0.55, EXACT, move))
+        self.assertIsNone(table.probe(54321))
+
+    def test_depth_preferred_replacement(self):
+        table = TranspositionTable(hash_mb=0.01)
+        n = table.num_buckets
+        # Same bucket, different keys
+        table.store(1, 5, 1.0, EXACT, None)
+        table.store(1 + n, 2, 2.0, LOWERBOUND, None)
+        self.assertEqual(table.probe(1)[1], 5)
+        self.assertEqual(table.probe(1 + n)[1], 2)
+        # The shallower newcomer only evicts the always-replace slot
+        table.store(1 + 2 * n, 1, 3.0, EXACT, None)
+        self.assertIsNotNone(table.probe(1))
+        self.assertIsNone(table.probe(1 + n))
+        self.assertIsNotNone(table.probe(1 + 2 * n))
+
+    def test_generation_aging(self):
+        table = TranspositionTable(hash_mb=0.01)
+        n = table.num_buckets
+        table.store(1, 8, 1.0, EXACT, None)
+        table.new_search()
+        # Entries from an earlier search can still be probed...
+        self.assertIsNotNone(table.probe(1))
+        # ...but give way to new results regardless of depth
+        table.store(1 + n, 1, 2.0, EXACT, None)
+        table.store(1 + 2 * n, 1, 3.0, EXACT, None)
+        self.assertIsNone(table.probe(1))
+
+    def test_size_is_fixed(self):
+        table = TranspositionTable(hash_mb=1)
+        size = len(table._data)
+        self.assertLessEqual(size, 1024 * 1024)
+        for key in range(1, 5000):
+            table.store(key * 7919, 1, 0.0, EXACT, None)
+        self.assertEqual(len(table._data), size)
+
+    def test_shared_table(self):
+        table = TranspositionTable.create_shared(hash_mb=0.01)
+        other = TranspositionTable.attach_shared(table.shared_name, hash_mb=0.01)
+        try:
+            move = chess.Move.from_uci("g1f3")
+            table.store(987654321, 4, -1.25, LOWERBOUND, move)
+            self.assertEqual(other.probe(987654321), (987654321, 4, -1.25, LOWERBOUND, move))
+        finally:
+            other.close()
+            table.close()
+
+    def test_torn_entry_is_rejected(self):
+        table = TranspositionTable(hash_mb=0.01)
+        table.store(42, 3, 0.5, EXACT, None)
+        offset = (42 & table._mask) << 5
+        # Corrupt the data word as a concurrent writer would
+        table._data[offset + 8] ^= 0xFF
+        self.assertIsNone(table.probe(42))
+    def test_save_and_load(self):
+        table = TranspositionTable(hash_mb=0.01)
+        move = chess.Move.from_uci("e2e4")
+        table.store(123456789, 6, 0.25, EXACT, move)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "table.tt")
+            table.save(path)
+            loaded = TranspositionTable.load(path)
+            self.assertEqual(loaded.probe(123456789), (123456789, 6, 0.25, EXACT, move))
+            # Copy-on-write: storing does not change the file
+            loaded.store(555, 1, 1.0, UPPERBOUND, None)
+            loaded.close()
+            reloaded = TranspositionTable.load(path)
+            self.assertIsNone(reloaded.probe(555))
+            reloaded.close()
+
+            writable = TranspositionTable.load(path, writable=True)
+            writable.store(555, 1, 1.0, UPPERBOUND, None)
+            writable.flush()
+            writable.close()
+            reloaded = TranspositionTable.load(path)
+            self.assertIsNotNone(reloaded.probe(555))
+            reloaded.close()
+
+    def test_warm_start(self):
+        board = chess.Board("r1bqkb1r/pppp1ppp/2n2n2/4p3/2B1P3/5N2/PPPP1PPP/RNBQK2R w KQkq - 4 4")
+        engine = Engine()
+        engine.find_best_move_with_stats(board, 4, 100)
+        cold_nodes = engine.nodes_searched
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "table.tt")
+            engine.transposition_table.save(path)
+            warm = Engine(transposition_table=TranspositionTable.load(path))
+            warm.find_best_move_with_stats(board, 4, 100)
+            self.assertLess(warm.nodes_searched, cold_nodes)
+            warm.close()
+
+    def test_table_from_the_other_colour(self):
+        # Tables hold White's view, so a Black engine can warm start from a White engine's table
+        board = chess.Board("r1bqkb1r/pppp1ppp/2n2n2/4p3/2B1P3/5N2/PPPP1PPP/RNBQK2R w KQkq - 4 4")
+        white = Engine(color_is_white=True)
+        white.find_best_move_with_stats(board, 4, 100)
+        cold = Engine(color_is_white=False)
+        cold.find_best_move_with_stats(board, 4, 100)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "table.tt")
+            white.transposition_table.save(path)
+            black = Engine(color_is_white=False, transposition_table=TranspositionTable.load(path))
+            black.find_best_move_with_stats(board, 4, 100)
+            self.assertAlmostEqual(black.best_score, cold.best_score)
+            self.assertLess(black.nodes_searched, cold.nodes_searched)
+            black.close()
+
+        # A bound stored by one colour reads back flipped by the other
+        table = TranspositionTable(hash_mb=0.01)
+        white = Engine(color_is_white=True, transposition_table=table)
+        black = Engine(color_is_white=False, transposition_table=table)
+        score, flag = white._to_table(1.5, LOWERBOUND, 0)
+        table.store(99, 3, score, flag, None)
+        _, _, score, flag, _ = table.probe(99)
+        self.assertEqual(black._from_table(score, flag, 0), (-1.5, UPPERBOUND))
+        self.assertEqual(white._from_table(score, flag, 0), (1.5, LOWERBOUND))
+
+    def test_merge_keeps_deeper_entries(self):
+        first = TranspositionTable(hash_mb=0.01)
+        second = TranspositionTable(hash_mb=0.01)
+        n = first.num_buckets
+        first.store(7, 2, 0.5, EXACT, None)
+        second.store(7, 5, 0.75, LOWERBOUND, None)
+        first.store(8, 3, 1.0, EXACT, None)
+        # Three positions competing for one bucket: the two deepest stay
+        second.store(9, 1, 0.0, EXACT, None)
+        second.store(9 + n, 4, 0.0, EXACT, None)
+        first.store(9 + 2 * n, 6, 0.0, EXACT, None)
+        with tempfile.TemporaryDirectory() as directory:
+            paths = [os.path.join(directory, name) for name in ("a.tt", "b.tt", "merged.tt")]
+            first.save(paths[0])
+            second.save(paths[1])
+            self.assertEqual(merge_tables(paths[:2], paths[2]), 4)
+            merged = TranspositionTable.load(paths[2])
+            self.assertEqual(merged.probe(7)[1:3], (5, 0.75))
+            self.assertIsNotNone(merged.probe(8))
+            self.assertIsNone(merged.probe(9))
+            self.assertEqual(merged.probe(9 + n)[1], 4)
+            self.assertEqual(merged.probe(9 + 2 * n)[1], 6)
+            merged.close()
+
+if __name__ == '__main__':
+    unittest.main()
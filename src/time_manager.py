@@ -0,0 +1,141 @@
+import time
+
+
+class TimeManager:
+    """
+    Decides how long the engine may think about one move.
+
+    start() turns the clock situation into two limits:
+        - soft limit: no new iterative deepening iteration is started after it
+        - hard limit: the running search is aborted when it is reached
+
+    Between iterations, can_start_iteration() also refuses to start a depth
+    that is not expected to finish before the hard limit, predicting its
+    duration from the last iteration's time and the measured effective
+    branching factor (nodes of the last iteration / nodes of the one before).
+
+    During the search out_of_time() only reads the clock every check_interval
+    calls, so the hot loop is not slowed down by clock syscalls. The engine
+    calls it at every node of both the main and the quiescence search, so the
+    countdown advances at the rate positions are visited.
+    """
+
+    # Moves assumed to remain when the time control has no moves-to-go
+    DEFAULT_MOVES_TO_GO = 30
+    # Share of the increment added to each move's budget
+    INCREMENT_USAGE = 0.75
+    # The hard limit is at most this many soft limits...
+    HARD_LIMIT_FACTOR = 4.0
+    # ...and never more than this share of the remaining clock
+    MAX_TIME_USAGE = 0.8
+    # Bounds on the measured branching factor used for predictions
+    MIN_BRANCHING_FACTOR = 1.5
+    MAX_BRANCHING_FACTOR = 10.0
+    # A node costs tens of microseconds in Python, so this keeps clock reads
+    # a few milliseconds apart, well below the hard limit of a blitz move
+    CHECK_INTERVAL = 64
+
+    def __init__(self, move_overhead=0.05, check_interval=CHECK_INTERVAL):
+        """
+        Args:
+            move_overhead (float): Seconds kept in reserve per move for communication and bookkeeping.
+            check_interval (int): Number of out_of_time() calls between clock reads.
+        """
+        self.move_overhead = move_overhead
+        self.check_interval = check_interval
+        self.start_time = None
+        self.soft_limit = None
+        self.hard_limit = None
+        self._deadline = None
+        self._countdown = check_interval
+        self._iterations = []
+
+    def start(self, time_left=None, increment=0.0, moves_to_go=None, move_time=None):
+        """
+        Start the clock for a new move and compute its limits.
+
+        Args:
+            time_left (float): Seconds left on the clock, or None for no clock.
+            increment (float): Seconds added to the clock after each move.
+            moves_to_go (int): Moves until the next time control, or None for sudden death.
+            move_time (float): Exact time for this move; overrides the clock if given.
+
+        Returns:
+            (float, float): The (soft, hard) limits in seconds, both None without a limit.
+        """
+        self._iterations = []
+        return self.restart(time_left, increment, moves_to_go, move_time)
+
+    def restart(self, time_left=None, increment=0.0, moves_to_go=None, move_time=None):
+        """
+        Like start, but keeps the iterations recorded so far. Used on a ponder
+        hit: the running search gets a real budget counted from now, and still
+        predicts its next iteration from the ones it already finished.
+        """
+        if move_time is not None:
+            soft_limit = hard_limit = max(0.0, move_time)
+        elif time_left is not None:
+            usable = max(0.0, time_left - self.move_overhead)
+            moves = max(1, moves_to_go or self.DEFAULT_MOVES_TO_GO)
+            budget = usable / moves + increment * self.INCREMENT_USAGE
+            hard_limit = min(budget * self.HARD_LIMIT_FACTOR, usable * self.MAX_TIME_USAGE)
+            soft_limit = min(budget, hard_limit)
+        else:
+            soft_limit = hard_limit = None
+
+        # The limits go in before the deadline, which a searching thread may be reading
+        self.start_time = time.time()
+        self._countdown = self.check_interval
+        self.soft_limit, self.hard_limit = soft_limit, hard_limit
+        self._deadline = None if hard_limit is None else self.start_time + hard_limit
+        return soft_limit, hard_limit
+
+    def elapsed(self):
+        """Seconds since start()."""
+        return time.time() - self.start_time if self.start_time is not None else 0.0
+
+    def remaining(self):
+        """Seconds left until the hard limit, or None without a limit."""
+        if self._deadline is None:
+            return None
+        return max(0.0, self._deadline - time.time())
+
+    def out_of_time(self):
+        """
+        True once the hard limit has passed. The clock is only read every
+        check_interval calls; in between the last answer (False) stands.
+        """
+        if self._deadline is None:
+            return False
+        self._countdown -= 1
+        if self._countdown > 0:
+            return False
+        self._countdown = self.check_interval
+        return time.time() >= self._deadline
+
+    def iteration_finished(self, nodes: int):
+        """Record the finishing time and node count of an iterative deepening iteration."""
+        self._iterations.append((time.time(), nodes))
+
+    def branching_factor(self):
+        """Effective branching factor of the last two iterations, or None if unknown."""
+        if len(self._iterations) < 2 or not self._iterations[-2][1]:
+            return None
+        factor = self._iterations[-1][1] / self._iterations[-2][1]
+        return min(max(factor, self.MIN_BRANCHING_FACTOR), self.MAX_BRANCHING_FACTOR)
+
+    def can_start_iteration(self):
+        """
+        True if another iteration should be started: the soft limit has not
+        passed and the iteration is expected to finish before the hard limit.
+        """
+        if self.hard_limit is None:
+            return True
+        elapsed = self.elapsed()
+        if elapsed >= self.soft_limit:
+            return False
+        factor = self.branching_factor()
+        if factor is None:
+            return True
+        last_time = self._iterations[-1][0] - self._iterations[-2][0]
+        return elapsed + last_time * factor <= self.hard_limit
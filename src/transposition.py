@@ -0,0 +1,431 @@
+import argparse
+import mmap
+import struct
+from multiprocessing import shared_memory
+import chess
+import chess.polyglot
+
+# Bound flags stored with each entry
+EXACT = 0
+LOWERBOUND = 1
+UPPERBOUND = 2
+
+_RANDOM = chess.polyglot.POLYGLOT_RANDOM_ARRAY
+_TURN = _RANDOM[780]
+_CASTLING_CORNERS = ((chess.BB_H1, 768), (chess.BB_A1, 769), (chess.BB_H8, 770), (chess.BB_A8, 771))
+
+# Table files: a 64-byte header (magic, format version, generation, hash_mb,
+# number of buckets) followed by the raw entries exactly as they are in memory.
+# Version 2: scores are from White's point of view (version 1 used the saving engine's)
+FILE_MAGIC = b"CHESSTT\0"
+FILE_VERSION = 2
+_FILE_HEADER = struct.Struct("<8sIIdQ")
+FILE_HEADER_SIZE = 64
+
+
+def _piece_hash(board: chess.Board, squares):
+    """XOR of the Zobrist numbers of the pieces standing on the given squares."""
+    h = 0
+    white = board.occupied_co[chess.WHITE]
+    for sq in squares:
+        piece_type = board.piece_type_at(sq)
+        if piece_type:
+            pivot = 1 if white & chess.BB_SQUARES[sq] else 0
+            h ^= _RANDOM[64 * ((piece_type - 1) * 2 + pivot) + sq]
+    return h
+
+
+def _castling_hash(castling_rights: int):
+    h = 0
+    for corner, index in _CASTLING_CORNERS:
+        if castling_rights & corner:
+            h ^= _RANDOM[index]
+    return h
+
+
+def _ep_hash(board: chess.Board):
+    """
+    Hash in the en passant file, but only if a pawn of the side to move
+    could capture there (the Polyglot convention).
+    """
+    ep_square = board.ep_square
+    if ep_square is None:
+        return 0
+    if board.turn == chess.WHITE:
+        ep_mask = chess.shift_down(chess.BB_SQUARES[ep_square])
+    else:
+        ep_mask = chess.shift_up(chess.BB_SQUARES[ep_square])
+    ep_mask = chess.shift_left(ep_mask) | chess.shift_right(ep_mask)
+    if ep_mask & board.pawns & board.occupied_co[board.turn]:
+        return _RANDOM[772 + chess.square_file(ep_square)]
+    return 0
+
+
+def zobrist_key(board: chess.Board):
+    """
+    Compute the 64-bit Zobrist key of a position from scratch.
+
+    The key uses the Polyglot random numbers, so for ordinary positions it is
+    identical to chess.polyglot.zobrist_hash(board).
+    """
+    key = _piece_hash(board, chess.scan_reversed(board.occupied))
+    key ^= _castling_hash(board.castling_rights)
+    key ^= _ep_hash(board)
+    if board.turn == chess.WHITE:
+        key ^= _TURN
+    return key
+
+
+def push_with_key(board: chess.Board, move: chess.Move, key: int):
+    """
+    Push a move on the board and return the Zobrist key of the new position,
+    updated incrementally from the key of the current position.
+
+    Args:
+        board (chess.Board): The board to push the move on.
+        move (chess.Move): The move (may be chess.Move.null()).
+        key (int): Zobrist key of the board before the move.
+
+    Returns:
+        int: Zobrist key after the move.
+    """
+    if not move:
+        key ^= _ep_hash(board)
+        board.push(move)
+        return key ^ _ep_hash(board) ^ _TURN
+
+    if board.is_castling(move):
+        squares = chess.SQUARES[0:8] if board.turn == chess.WHITE else chess.SQUARES[56:64]
+    elif board.is_en_passant(move):
+        squares = (move.from_square, move.to_square,
+                   chess.square(chess.square_file(move.to_square), chess.square_rank(move.from_square)))
+    else:
+        squares = (move.from_square, move.to_square)
+
+    castling_rights = board.castling_rights
+    key ^= _piece_hash(board, squares) ^ _ep_hash(board)
+    board.push(move)
+    key ^= _piece_hash(board, squares) ^ _ep_hash(board) ^ _TURN
+    if board.castling_rights != castling_rights:
+        key ^= _castling_hash(castling_rights) ^ _castling_hash(board.castling_rights)
+    return key
+
+
+def encode_move(move):
+    """Pack a move into 16 bits: from | to << 6 | promotion << 12 (0 for no move)."""
+    if not move:
+        return 0
+    return move.from_square | (move.to_square << 6) | ((move.promotion or 0) << 12)
+
+
+def decode_move(code: int):
+    """Inverse of encode_move."""
+    if not code:
+        return None
+    return chess.Move(code & 63, (code >> 6) & 63, (code >> 12) or None)
+
+
+def _attach_shared_memory(name: str):
+    """
+    Open an existing shared memory block. Only the creator should unlink it;
+    child processes share their parent's resource tracker, so on Pythons
+    without the track argument the duplicate registration is harmless.
+    """
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        return shared_memory.SharedMemory(name=name)
+
+
+class TranspositionTable:
+    """
+    Fixed-size transposition table keyed on 64-bit Zobrist hashes.
+
+    Entries are packed 16-byte records in a single buffer, so the memory used
+    is fixed by hash_mb and never grows. Each bucket holds two entries: a
+    depth-preferred slot, which is only overwritten by a search of at least
+    the same depth or by any search once its entry is from an older
+    generation, and an always-replace slot that keeps the most recent result.
+
+    An entry is two 64-bit words: the data word (score in millipawns, packed
+    move, depth, bound flag and generation) and the key XORed with the data
+    word. A reader only accepts an entry whose words XOR back to its key, so
+    the table can be shared between processes without locks: an entry torn by
+    a concurrent write simply fails to match.
+    """
+
+    ENTRY_SIZE = 16
+    _ENTRY = struct.Struct("<QQ")
+    SCORE_SCALE = 1000
+    MAX_GENERATION = 64
+
+    def __init__(self, hash_mb=16, buffer=None):
+        """
+        Args:
+            hash_mb (float): Memory for the table in megabytes.
+            buffer (writable buffer): Memory to hold the entries, of size
+                table_bytes(hash_mb). A new bytearray is allocated if None.
+        """
+        size = self.table_bytes(hash_mb) // (2 * self.ENTRY_SIZE)
+        self.hash_mb = hash_mb
+        self.num_buckets = size
+        self._mask = size - 1
+        if buffer is None:
+            buffer = bytearray(2 * size * self.ENTRY_SIZE)
+        elif len(buffer) < 2 * size * self.ENTRY_SIZE:
+            raise ValueError("Buffer is too small for a %s MB table." % hash_mb)
+        self._data = buffer
+        self._shm = None
+        self._owns_shm = False
+        self._mmap = None
+        self.generation = 0
+
+    @classmethod
+    def table_bytes(cls, hash_mb):
+        """Bytes used by a table of hash_mb megabytes (a power of two number of buckets)."""
+        entries = max(2, int(hash_mb * 1024 * 1024) // cls.ENTRY_SIZE)
+        size = 1
+        while size * 4 <= entries:
+            size *= 2
+        return 2 * size * cls.ENTRY_SIZE
+
+    @classmethod
+    def create_shared(cls, hash_mb=16):
+        """Create a table in a new shared memory block that other processes can attach to."""
+        shm = shared_memory.SharedMemory(create=True, size=cls.table_bytes(hash_mb))
+        table = cls(hash_mb, buffer=shm.buf)
+        table._shm = shm
+        table._owns_shm = True
+        table.clear()
+        return table
+
+    @classmethod
+    def attach_shared(cls, name: str, hash_mb=16):
+        """Attach to a table created by create_shared in another process."""
+        shm = _attach_shared_memory(name)
+        table = cls(hash_mb, buffer=shm.buf)
+        table._shm = shm
+        return table
+
+    @property
+    def shared_name(self):
+        """Name of the shared memory block, or None for a private table."""
+        return self._shm.name if self._shm is not None else None
+
+    def save(self, path: str):
+        """
+        Write the table to a file: a small header followed by the entries as
+        they are in memory, so load() can map it back without any parsing.
+        The Engine stores scores from White's point of view, so a file can be
+        loaded or merged by engines of either colour.
+        """
+        header = _FILE_HEADER.pack(FILE_MAGIC, FILE_VERSION, self.generation, self.hash_mb, self.num_buckets)
+        with open(path, "wb") as f:
+            f.write(header.ljust(FILE_HEADER_SIZE, b"\0"))
+            f.write(self._data)
+
+    @classmethod
+    def load(cls, path: str, writable=False):
+        """
+        Map a table saved with save() into memory.
+
+        Args:
+            path (str): The table file.
+            writable (bool): If True, entries stored by the search are written back
+                to the file (call flush() to force it to disk). Otherwise the mapping
+                is copy-on-write and the file is left unchanged.
+
+        Returns:
+            TranspositionTable: The table, backed by the mapped file.
+        """
+        with open(path, "r+b" if writable else "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_WRITE if writable else mmap.ACCESS_COPY)
+        try:
+            magic, version, generation, hash_mb, num_buckets = _FILE_HEADER.unpack_from(mapped, 0)
+            if magic != FILE_MAGIC:
+                raise ValueError("%s is not a transposition table file." % path)
+            if version != FILE_VERSION:
+                raise ValueError("%s has table format version %d, expected %d." % (path, version, FILE_VERSION))
+            if len(mapped) != FILE_HEADER_SIZE + cls.table_bytes(hash_mb):
+                raise ValueError("%s is truncated or has the wrong size." % path)
+            table = cls(hash_mb, buffer=memoryview(mapped)[FILE_HEADER_SIZE:])
+        except Exception:
+            mapped.close()
+            raise
+        if table.num_buckets != num_buckets:
+            table._data.release()
+            mapped.close()
+            raise ValueError("%s has an unexpected number of buckets." % path)
+        table._mmap = mapped
+        table.generation = generation % cls.MAX_GENERATION
+        return table
+
+    def flush(self):
+        """Write the entries of a table loaded with writable=True back to its file."""
+        if self._mmap is not None:
+            _FILE_HEADER.pack_into(self._mmap, 0, FILE_MAGIC, FILE_VERSION, self.generation,
+                                   self.hash_mb, self.num_buckets)
+            self._mmap.flush()
+
+    def close(self):
+        """Release a mapped file or a shared memory block (and destroy the block if this table created it)."""
+        if self._mmap is not None:
+            self._data.release()
+            self._data = bytearray(0)
+            self._mmap.close()
+            self._mmap = None
+        if self._shm is None:
+            return
+        self._data = bytearray(0)
+        self._shm.close()
+        if self._owns_shm:
+            self._shm.unlink()
+        self._shm = None
+
+    def new_search(self):
+        """Advance the generation so entries from earlier searches age out."""
+        self.generation = (self.generation + 1) % self.MAX_GENERATION
+
+    def probe(self, key: int):
+        """
+        Look up a position.
+
+        Returns:
+            tuple or None: (key, depth, score, flag, best_move) if found.
+        """
+        unpack_from = self._ENTRY.unpack_from
+        # Buckets are two 16-byte entries
+        offset = (key & self._mask) << 5
+        for slot_offset in (offset, offset + 16):
+            check, data = unpack_from(self._data, slot_offset)
+            if check ^ data == key:
+                score = data & 0xFFFFFFFF
+                if score & 0x80000000:
+                    score -= 0x100000000
+                return (key, (data >> 48) & 0xFF, score / self.SCORE_SCALE,
+                        (data >> 56) & 3, decode_move((data >> 32) & 0xFFFF))
+        return None
+
+    def store(self, key: int, depth: int, score: float, flag: int, best_move):
+        """
+        Store a search result. Goes to the depth-preferred slot if it is at least
+        as deep as the result already there, or if that result is stale, otherwise
+        to the always-replace slot.
+        """
+        offset = (key & self._mask) << 5
+        check, current = self._ENTRY.unpack_from(self._data, offset)
+        if not (check ^ current == key or depth >= (current >> 48) & 0xFF
+                or current >> 58 != self.generation):
+            offset += 16
+        data = ((round(score * self.SCORE_SCALE) & 0xFFFFFFFF)
+                | (encode_move(best_move) << 32)
+                | (min(depth, 255) << 48)
+                | ((flag | (self.generation << 2)) << 56))
+        self._ENTRY.pack_into(self._data, offset, key ^ data, data)
+
+    def clear(self):
+        """Remove all entries."""
+        self._data[:] = bytes(len(self._data))
+        self.generation = 0
+
+    def hashfull(self):
+        """Permille of the first thousand entries written in the current generation."""
+        sample = min(1000, len(self._data) // self.ENTRY_SIZE)
+        used = 0
+        for i in range(sample):
+            check, data = self._ENTRY.unpack_from(self._data, i * self.ENTRY_SIZE)
+            if check and data >> 58 == self.generation:
+                used += 1
+        return used * 1000 // sample
+
+    def entries(self):
+        """
+        Yield every stored entry as (key, data), data being the packed data word.
+        Empty slots and torn entries are skipped.
+        """
+        unpack_from = self._ENTRY.unpack_from
+        for offset in range(0, 2 * self.num_buckets * self.ENTRY_SIZE, self.ENTRY_SIZE):
+            check, data = unpack_from(self._data, offset)
+            if data and ((check ^ data) & self._mask) == (offset >> 5):
+                yield check ^ data, data
+
+    def merge_entry(self, key: int, data: int):
+        """
+        Insert a packed entry taken from another table, keeping the two deepest
+        positions of each bucket. The entry's generation is reset to this table's.
+        """
+        data = (data & ~(0x3F << 58)) | (self.generation << 58)
+        depth = (data >> 48) & 0xFF
+        offset = (key & self._mask) << 5
+        slots = []
+        for slot_offset in (offset, offset + 16):
+            check, current = self._ENTRY.unpack_from(self._data, slot_offset)
+            if current and check ^ current == key:
+                # Same position: keep the deeper result
+                if depth > (current >> 48) & 0xFF:
+                    self._ENTRY.pack_into(self._data, slot_offset, key ^ data, data)
+                return
+            slots.append((slot_offset, (current >> 48) & 0xFF if current else -1, check, current))
+        (first, first_depth, first_check, first_data), (second, second_depth, _, _) = slots
+        if depth >= first_depth:
+            # The depth-preferred entry moves down to the second slot
+            if first_depth > second_depth:
+                self._ENTRY.pack_into(self._data, second, first_check, first_data)
+            self._ENTRY.pack_into(self._data, first, key ^ data, data)
+        elif depth > second_depth:
+            self._ENTRY.pack_into(self._data, second, key ^ data, data)
+
+
+def merge_tables(paths, output_path: str, hash_mb=None):
+    """
+    Combine saved tables, e.g. from several analysis workers, into one file.
+
+    Args:
+        paths (list): Table files to merge.
+        output_path (str): File to write the merged table to.
+        hash_mb (float): Size of the merged table; the largest input size if None.
+
+    Returns:
+        int: Number of entries in the merged table.
+    """
+    sources = [TranspositionTable.load(path) for path in paths]
+    try:
+        if hash_mb is None:
+            hash_mb = max(source.hash_mb for source in sources)
+        merged = TranspositionTable(hash_mb)
+        for source in sources:
+            for key, data in source.entries():
+                merged.merge_entry(key, data)
+    finally:
+        for source in sources:
+            source.close()
+    merged.save(output_path)
+    return sum(1 for _ in merged.entries())
+
+
+def main(argv=None):
+    """Command line tool for saved transposition tables."""
+    parser = argparse.ArgumentParser(description="Inspect and merge saved transposition tables.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    info = commands.add_parser("info", help="Show the size and number of entries of table files.")
+    info.add_argument("paths", nargs="+")
+    merge = commands.add_parser("merge", help="Merge table files into one.")
+    merge.add_argument("output")
+    merge.add_argument("paths", nargs="+")
+    merge.add_argument("--hash-mb", type=float, default=None, help="Size of the merged table (default: largest input).")
+    args = parser.parse_args(argv)
+
+    if args.command == "info":
+        for path in args.paths:
+            table = TranspositionTable.load(path)
+            used = sum(1 for _ in table.entries())
+            print("%s: %s MB, %d buckets, %d entries, generation %d"
+                  % (path, table.hash_mb, table.num_buckets, used, table.generation))
+            table.close()
+    else:
+        count = merge_tables(args.paths, args.output, args.hash_mb)
+        print("%s: %d entries from %d tables" % (args.output, count, len(args.paths)))
+
+
+if __name__ == "__main__":
+    main()